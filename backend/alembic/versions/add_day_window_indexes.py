@@ -0,0 +1,34 @@
+"""add (user_id, created_at) indexes for per-user day-window lookups
+
+Revision ID: add_day_window_indexes
+Revises: add_jobs_tables
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+
+revision = "add_day_window_indexes"
+down_revision = "add_jobs_tables"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_lesson_user_created", "lesson"),
+    ("ix_daily_situation_user_created", "daily_situation"),
+    ("ix_roleplay_user_created", "roleplay"),
+    ("ix_writing_model_user_created", "writing_model"),
+)
+
+
+def upgrade() -> None:
+    # CONCURRENTLY so the hot tables stay writable while the indexes build.
+    with op.get_context().autocommit_block():
+        for name, table in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} (user_id, created_at)")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
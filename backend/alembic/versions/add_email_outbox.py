@@ -0,0 +1,40 @@
+"""add email_outbox table
+
+Revision ID: add_email_outbox
+Revises: add_stripe_events
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+
+revision = "add_email_outbox"
+down_revision = "add_stripe_events"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id SERIAL PRIMARY KEY,
+            recipient VARCHAR NOT NULL,
+            subject VARCHAR NOT NULL,
+            html TEXT NOT NULL,
+            status VARCHAR NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+            locked_at TIMESTAMPTZ,
+            created_at TIMESTAMPTZ DEFAULT now(),
+            sent_at TIMESTAMPTZ
+        )
+        """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_email_outbox_id ON email_outbox (id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_email_outbox_status_run_after ON email_outbox (status, run_after)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS email_outbox")
@@ -0,0 +1,55 @@
+"""add graph_checkpoints and graph_checkpoint_writes tables for resumable lesson generation
+
+Revision ID: add_graph_checkpoints
+Revises: add_keyset_page_indexes
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+
+revision = "add_graph_checkpoints"
+down_revision = "add_keyset_page_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS graph_checkpoints (
+            thread_id VARCHAR NOT NULL,
+            checkpoint_ns VARCHAR NOT NULL DEFAULT '',
+            checkpoint_id VARCHAR NOT NULL,
+            parent_checkpoint_id VARCHAR,
+            type VARCHAR NOT NULL,
+            checkpoint BYTEA NOT NULL,
+            metadata_type VARCHAR NOT NULL,
+            metadata BYTEA NOT NULL,
+            created_at TIMESTAMPTZ DEFAULT now(),
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+        )
+        """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_graph_checkpoints_created_at ON graph_checkpoints (created_at)")
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS graph_checkpoint_writes (
+            thread_id VARCHAR NOT NULL,
+            checkpoint_ns VARCHAR NOT NULL DEFAULT '',
+            checkpoint_id VARCHAR NOT NULL,
+            task_id VARCHAR NOT NULL,
+            idx INTEGER NOT NULL,
+            channel VARCHAR NOT NULL,
+            type VARCHAR NOT NULL,
+            value BYTEA NOT NULL,
+            task_path VARCHAR NOT NULL DEFAULT '',
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS graph_checkpoint_writes")
+    op.execute("DROP TABLE IF EXISTS graph_checkpoints")
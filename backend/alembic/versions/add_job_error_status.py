@@ -0,0 +1,23 @@
+"""add error_status to jobs
+
+Revision ID: add_job_error_status
+Revises: add_email_outbox
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "add_job_error_status"
+down_revision = "add_email_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("error_status", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("jobs", "error_status")
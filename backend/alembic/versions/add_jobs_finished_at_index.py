@@ -0,0 +1,27 @@
+"""add a partial index on jobs.finished_at for the retention sweep
+
+Revision ID: add_jobs_finished_at_index
+Revises: add_job_error_status
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+
+revision = "add_jobs_finished_at_index"
+down_revision = "add_job_error_status"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobs_finished_at ON jobs (finished_at) "
+            "WHERE finished_at IS NOT NULL"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_jobs_finished_at")
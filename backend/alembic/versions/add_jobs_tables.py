@@ -0,0 +1,58 @@
+"""add jobs and job_events tables
+
+Revision ID: add_jobs_tables
+Revises: fix_user_sub_cols
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+
+revision = "add_jobs_tables"
+down_revision = "fix_user_sub_cols"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id SERIAL PRIMARY KEY,
+            kind VARCHAR NOT NULL,
+            user_id INTEGER REFERENCES users (id),
+            idempotency_key VARCHAR UNIQUE,
+            status VARCHAR NOT NULL DEFAULT 'queued',
+            payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+            result JSONB,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+            locked_by VARCHAR,
+            heartbeat_at TIMESTAMPTZ,
+            created_at TIMESTAMPTZ DEFAULT now(),
+            updated_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ
+        )
+        """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_jobs_id ON jobs (id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs (status, run_after)")
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_events (
+            id BIGSERIAL PRIMARY KEY,
+            job_id INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+            type VARCHAR NOT NULL,
+            data JSONB NOT NULL DEFAULT '{}'::jsonb,
+            created_at TIMESTAMPTZ DEFAULT now()
+        )
+        """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_job_events_job_id_id ON job_events (job_id, id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS job_events")
+    op.execute("DROP TABLE IF EXISTS jobs")
@@ -0,0 +1,78 @@
+"""add covering (owner, created_at, id) indexes for keyset-paginated history endpoints
+
+Revision ID: add_keyset_page_indexes
+Revises: add_day_window_indexes
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "add_keyset_page_indexes"
+down_revision = "add_day_window_indexes"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 5000
+
+# (new index, table, definition, index it supersedes, definition of the superseded index)
+INDEXES = (
+    (
+        "ix_writing_model_user_created_id", "writing_model",
+        "(user_id, created_at, id) INCLUDE (goal, completed)",
+        "ix_writing_model_user_created", "(user_id, created_at)",
+    ),
+    (
+        "ix_lesson_user_created_id", "lesson",
+        "(user_id, created_at, id) INCLUDE (title, score, completed)",
+        "ix_lesson_user_created", "(user_id, created_at)",
+    ),
+    (
+        "ix_roleplay_user_created_id", "roleplay",
+        "(user_id, created_at, id) INCLUDE (score, completed)",
+        "ix_roleplay_user_created", "(user_id, created_at)",
+    ),
+    (
+        "ix_roleplay_messages_roleplay_created_id", "roleplay_messages",
+        "(roleplay_id, created_at, id)",
+        "ix_roleplay_messages_roleplay_created", "(roleplay_id, created_at)",
+    ),
+    (
+        "ix_teacher_messages_conversation_created_id", "teacher_messages",
+        "(conversation_id, created_at, id)",
+        "ix_teacher_messages_conversation_created", "(conversation_id, created_at)",
+    ),
+    (
+        "ix_teacher_conversations_user_created_id", "teacher_conversations",
+        "(user_id, created_at, id)",
+        None, None,
+    ),
+)
+
+
+def upgrade() -> None:
+    # Lets the writing history list be answered from the index without reading user_input. A plain
+    # nullable column is a catalog-only change; the app sets it whenever it writes user_input.
+    op.add_column("writing_model", sa.Column("completed", sa.Boolean(), nullable=True))
+    with op.get_context().autocommit_block():
+        # Backfill in short batches, each its own transaction, so writers are never blocked for long.
+        backfill = sa.text(
+            "UPDATE writing_model SET completed = coalesce(btrim(user_input), '') <> '' "
+            "WHERE id IN (SELECT id FROM writing_model WHERE completed IS NULL LIMIT :batch)"
+        )
+        while op.get_bind().execute(backfill, {"batch": BACKFILL_BATCH}).rowcount:
+            pass
+        for name, table, definition, old_name, _ in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+            if old_name:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {old_name}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, old_name, old_definition in INDEXES:
+            if old_name:
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {old_name} ON {table} {old_definition}")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.drop_column("writing_model", "completed")
@@ -0,0 +1,42 @@
+"""add stripe_events table and the user's Stripe event watermark
+
+Revision ID: add_stripe_events
+Revises: add_writing_evaluation
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "add_stripe_events"
+down_revision = "add_writing_evaluation"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stripe_events (
+            id VARCHAR PRIMARY KEY,
+            type VARCHAR NOT NULL,
+            created TIMESTAMPTZ NOT NULL,
+            payload JSONB NOT NULL,
+            deliveries INTEGER NOT NULL DEFAULT 1,
+            outcome VARCHAR,
+            error TEXT,
+            received_at TIMESTAMPTZ DEFAULT now(),
+            processed_at TIMESTAMPTZ
+        )
+        """
+    )
+    columns = {col["name"] for col in inspect(op.get_bind()).get_columns("users")}
+    if "stripe_event_at" not in columns:
+        op.add_column("users", sa.Column("stripe_event_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("users", "stripe_event_at")
+    op.execute("DROP TABLE IF EXISTS stripe_events")
@@ -0,0 +1,30 @@
+"""store the writing evaluation and a hash of the evaluated text
+
+Revision ID: add_writing_evaluation
+Revises: add_graph_checkpoints
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+
+revision = "add_writing_evaluation"
+down_revision = "add_graph_checkpoints"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {col["name"] for col in inspect(op.get_bind()).get_columns("writing_model")}
+    if "evaluation" not in columns:
+        op.add_column("writing_model", sa.Column("evaluation", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    if "input_hash" not in columns:
+        op.add_column("writing_model", sa.Column("input_hash", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("writing_model", "input_hash")
+    op.drop_column("writing_model", "evaluation")
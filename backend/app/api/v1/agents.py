@@ -1,26 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException,status,Query
+from fastapi import APIRouter, Depends, Header, HTTPException,status,Query
 from fastapi.responses import StreamingResponse, Response
-from app.core.llm import LLMClient, MODEL_NAME
 from app.api.v1.auth import get_current_user
 from app.api.deps import require_premium
 from app.models.user_model import User
 from app.core.database import get_db
+from app.core.pagination import Page, finish_page, keyset, page_params
 from app.models.daily_situation_model import DailySituation
 from datetime import timedelta,datetime,date,timezone
-from app.core.utils import open_yaml
+from app.core.config import settings
 from sqlalchemy.orm import Session
 from app.schemas.agents_schema import EvaluateLessonOutput, EvaluateLessonRequest, UpdateProgressRequest
 import json
 import httpx
 from urllib.parse import quote
 from app.models.lesson_model import Lesson
-from app.workflows.lesson_workflow import build_workflow
-from app.api.v1.stats import update_user_stats
+from app.services.daily_bundle_service import bundle_payload
+from app.services.lesson_service import lesson_to_payload, public_questions
+from app.api.v1.jobs import SSE_HEADERS, parse_last_event_id, prefers_async, run_job, stream_job
+from app.jobs.handlers import DAILY_BUNDLE, LESSON, LESSON_EVALUATION
+from app.jobs.queue import enqueue
 
 router  = APIRouter()
 
 @router.get("/create_lesson")
-async def make_lesson(current_user: User = Depends(require_premium), db:Session = Depends(get_db)): 
+async def make_lesson(
+    current_user: User = Depends(require_premium),
+    db: Session = Depends(get_db),
+    last_event_id: str | None = Header(None),
+):
     today = date.today()
     start = datetime.combine(today, datetime.min.time(), tzinfo=timezone.utc)
     end = start + timedelta(days=1) 
@@ -32,25 +39,7 @@ async def make_lesson(current_user: User = Depends(require_premium), db:Session
     ).first()
 
     if lesson_exists:
-        existing_data = {
-            'lesson': {
-                'id': lesson_exists.id,
-                'user_id': lesson_exists.user_id,
-                'title': lesson_exists.title,
-                'paragraphs': lesson_exists.paragraphs
-            },
-            'vocabs': lesson_exists.vocab,
-            'grammar': lesson_exists.grammar or [],
-            'questions': lesson_exists.questions,
-            'progress': lesson_exists.progress or {},
-            'completed': lesson_exists.completed,
-            'evaluation': {
-                'score': lesson_exists.score,
-                'summary': lesson_exists.summary,
-                'focus_areas': lesson_exists.focus_areas,
-                'per_question': lesson_exists.per_question or []
-            } if lesson_exists.score is not None else None
-        }
+        existing_data = lesson_to_payload(lesson_exists)
         
         async def existing_lesson_generator():
             yield f"data: {json.dumps({'type': 'complete', 'data': existing_data}, ensure_ascii=False)}\n\n"
@@ -70,86 +59,53 @@ async def make_lesson(current_user: User = Depends(require_premium), db:Session
     if not daily_situation:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No daily situation found")
 
-    situation_text = daily_situation.daily_situation
-    user_id = current_user.id
-    user_profile = current_user.profile
-
-    async def event_generator():
-        try:
-            yield f"data: {json.dumps({'type': 'progress', 'step': 'started', 'message': 'Starting lesson creation...'})}\n\n"
-
-            initial_state = {
-                "db": db,
-                "current_user": current_user,
-                "daily_situation": situation_text,
-                "user_profile": user_profile,
-            } 
-
-            app = build_workflow()
-            final_state = {}
-
-            async for event in app.astream(initial_state, stream_mode="updates"):
-                for node_name, node_output in event.items():
-                    final_state.update(node_output)
-                    
-                    if node_name == "lesson_maker":
-                        yield f"data: {json.dumps({'type': 'progress', 'step': 'lesson', 'message': 'Article generated!'})}\n\n"
-                    elif node_name == "vocab_maker":
-                        yield f"data: {json.dumps({'type': 'progress', 'step': 'vocab', 'message': 'Vocabulary generated!'})}\n\n"
-                    elif node_name == "grammar_maker":
-                        yield f"data: {json.dumps({'type': 'progress', 'step': 'grammar', 'message': 'Grammar extracted!'})}\n\n"
-                    elif node_name == "question_maker":
-                        yield f"data: {json.dumps({'type': 'progress', 'step': 'questions', 'message': 'Questions generated!'})}\n\n"
-
-            # Check if all required data is present
-            if 'lesson' not in final_state or 'vocabs' not in final_state or 'grammar' not in final_state or 'questions' not in final_state:
-                error_msg = "Lesson creation incomplete. Missing required data."
-                yield f"data: {json.dumps({'type': 'error', 'message': error_msg})}\n\n"
-                return
-
-            lesson = Lesson(
-                user_id=user_id,
-                vocab=[v.model_dump() for v in final_state['vocabs']],
-                paragraphs=list(final_state['lesson'].paragraphs),
-                grammar=[g.model_dump() for g in final_state['grammar']],
-                questions=[q.model_dump() for q in final_state['questions']],
-                title=final_state['lesson'].title,
-            )
-            db.add(lesson)
-            db.commit()
-
-            complete_data = {
-                'lesson': final_state['lesson'].model_dump(),
-                'vocabs': [v.model_dump() for v in final_state['vocabs']],
-                'grammar': [g.model_dump() for g in final_state['grammar']],
-                'questions': [q.model_dump() for q in final_state['questions']]
-            }
-            yield f"data: {json.dumps({'type': 'complete', 'data': complete_data}, ensure_ascii=False)}\n\n"
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error creating lesson: {e}", exc_info=True)
-            
-            # Extract meaningful error message
-            error_message = str(e)
-            if "OPENROUTER_API_KEY" in error_message or "OpenRouter" in error_message or "401" in error_message or "Authentication" in error_message:
-                error_message = "OpenRouter API authentication failed. Please check your API key configuration."
-            elif "User not found" in error_message:
-                error_message = "OpenRouter API authentication failed. Please verify your API key is valid and has credits."
-            
-            yield f"data: {json.dumps({'type': 'error', 'message': error_message})}\n\n"
+    if not current_user.profile:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User profile not found. Please complete your profile first.")
+
+    # Generation runs in a job worker; this stream only tails the job's events, so a client that
+    # disconnects can reconnect with Last-Event-ID and pick up where it left off.
+    job = enqueue(
+        db,
+        LESSON,
+        {"user_id": current_user.id, "date": today.isoformat()},
+        user_id=current_user.id,
+        idempotency_key=f"lesson:{current_user.id}:{today.isoformat()}",
+    )
+    return stream_job(job.id, parse_last_event_id(last_event_id))
+
+@router.get("/daily_bundle")
+async def make_daily_bundle(
+    current_user: User = Depends(require_premium),
+    db: Session = Depends(get_db),
+    last_event_id: str | None = Header(None),
+):
+    """Today's situation, lesson, roleplay goal and writing goal, generated together if missing."""
+    today = date.today()
+    existing_data = bundle_payload(db, current_user.id, today)
+    if existing_data:
+        async def existing_bundle_generator():
+            yield f"data: {json.dumps({'type': 'complete', 'data': existing_data}, ensure_ascii=False)}\n\n"
+
+        return StreamingResponse(existing_bundle_generator(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    if not current_user.profile:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User profile not found. Please complete your profile first.")
 
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
+    job = enqueue(
+        db,
+        DAILY_BUNDLE,
+        {"user_id": current_user.id, "date": today.isoformat()},
+        user_id=current_user.id,
+        idempotency_key=f"daily_bundle:{current_user.id}:{today.isoformat()}",
     )
+    return stream_job(job.id, parse_last_event_id(last_event_id))
 
 @router.post("/evaluate_lesson", response_model=EvaluateLessonOutput)
 async def evaluate_lesson(
     request: EvaluateLessonRequest,
     current_user: User = Depends(require_premium), 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    respond_async: bool = Depends(prefers_async),
 ):
     db_lesson = db.query(Lesson).filter(Lesson.user_id==current_user.id).order_by(Lesson.created_at.desc()).first()
 
@@ -163,37 +119,15 @@ async def evaluate_lesson(
     db_lesson.answers = answers_dict
     db.commit()
 
-    yaml_prompts = open_yaml("app/workflows/prompts.yaml")
-    prompt = yaml_prompts['evaluate_lesson_prompt']
-
-    prompt = prompt.replace("{{ article }}", json.dumps(db_lesson.paragraphs, ensure_ascii=False))
-    prompt = prompt.replace("{{ answers }}", json.dumps(answers_dict, ensure_ascii=False))
-    prompt = prompt.replace("{{ vocab }}", json.dumps(db_lesson.vocab, ensure_ascii=False))
-    prompt = prompt.replace("{{ questions }}", json.dumps(db_lesson.questions, ensure_ascii=False))
-
-    messages = [
-        {
-            "role": "system",
-            "content": prompt
-        }
-    ]
-
-    llm = LLMClient()
-    chat = llm.get_client(MODEL_NAME)
-
-    result = await chat.with_structured_output(EvaluateLessonOutput).ainvoke(messages)
-    
-    db_lesson.score = result.score
-    db_lesson.summary = result.summary
-    db_lesson.focus_areas = result.focus_areas
-    db_lesson.per_question = [q.model_dump() for q in result.per_question]
-    db_lesson.completed = True
-    db.commit()
-    
-    points_earned = result.score + 10
-    update_user_stats(db, current_user.id, points_earned, "lesson", db_lesson.id)
-    
-    return result
+    result = await run_job(
+        db,
+        LESSON_EVALUATION,
+        {"lesson_id": db_lesson.id},
+        user_id=current_user.id,
+        idempotency_key=f"lesson_evaluation:{db_lesson.id}",
+        respond_async=respond_async,
+    )
+    return EvaluateLessonOutput(**result)
 
 @router.get("/tts")
 async def text_to_speech(
@@ -220,7 +154,7 @@ async def text_to_speech(
     async with httpx.AsyncClient(timeout=30.0) as client:
         for chunk in chunks:
             encoded_text = quote(chunk)
-            url = f"https://translate.google.com/translate_tts?ie=UTF-8&tl={lang}&client=tw-ob&q={encoded_text}"
+            url = f"{settings.TTS_URL}?ie=UTF-8&tl={lang}&client=tw-ob&q={encoded_text}"
             
             response = await client.get(
                 url,
@@ -249,7 +183,7 @@ async def explain_text(
 ):
     async with httpx.AsyncClient(timeout=10.0) as client:
         encoded = quote(text)
-        url = f"https://translate.googleapis.com/translate_a/single?client=gtx&sl=de&tl=en&dt=t&q={encoded}"
+        url = f"{settings.TRANSLATE_URL}?client=gtx&sl=de&tl=en&dt=t&q={encoded}"
         
         response = await client.get(url, headers={
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
@@ -295,12 +229,15 @@ async def update_progress(
 
 @router.get("/lessons")
 async def get_lessons_history(
+    response: Response,
+    page: Page = Depends(page_params()),
     current_user: User = Depends(require_premium),
     db: Session = Depends(get_db)
 ):
-    lessons = db.query(Lesson).filter(
+    query = db.query(Lesson.id, Lesson.title, Lesson.score, Lesson.completed, Lesson.created_at).filter(
         Lesson.user_id == current_user.id
-    ).order_by(Lesson.created_at.desc()).limit(30).all()
+    )
+    lessons = finish_page(keyset(query, Lesson.created_at, Lesson.id, page).all(), page, response)
 
     return [
         {
@@ -341,7 +278,7 @@ async def get_lesson_by_id(
         },
         'vocabs': lesson.vocab,
         'grammar': lesson.grammar or [],
-        'questions': lesson.questions,
+        'questions': public_questions(lesson.questions),
         'progress': lesson.progress or {},
         'completed': lesson.completed,
         'is_today': is_today,
@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.security import verify_password, get_password_hash, create_access_token, generate_verification_token, verify_token
 from app.core.config import settings
-from app.core.email import send_verification_email
+from app.core.email import queue_verification_email, wake_sender
 from app.models.user_model import User
 from app.schemas.auth_schema import SignupRequest, ResendVerificationRequest
 from app.schemas.user_schema import Token, UserResponse
@@ -30,16 +30,11 @@ async def signup(request: SignupRequest, db: Session = Depends(get_db)):
         email_verified=False
     )
     db.add(user)
+    verification_token = generate_verification_token(request.email)
+    queue_verification_email(db, request.email, verification_token, request.full_name)
     db.commit()
     db.refresh(user)
-    
-    verification_token = generate_verification_token(request.email)
-    try:
-        await send_verification_email(request.email, verification_token, request.full_name)
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Failed to send verification email to {request.email}: {e}")
+    wake_sender()
     
     return UserResponse.model_validate(user)
 
@@ -193,14 +188,10 @@ async def resend_verification(request: ResendVerificationRequest, db: Session =
         )
     
     verification_token = generate_verification_token(request.email)
-    try:
-        await send_verification_email(request.email, verification_token, user.full_name)
-        return {"message": "Verification email sent successfully"}
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to send verification email: {str(e)}"
-        )
+    queue_verification_email(db, request.email, verification_token, user.full_name)
+    db.commit()
+    wake_sender()
+    return {"message": "Verification email sent successfully"}
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
@@ -0,0 +1,97 @@
+import json
+from typing import Any, AsyncIterator
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.api.v1.auth import get_current_user
+from app.core.config import settings
+from app.core.database import get_db
+from app.jobs.queue import FAILED, SUCCEEDED, JobSnapshot, enqueue, tail_events, wait_for_job
+from app.models.job_model import Job
+from app.models.user_model import User
+from app.schemas.job_schema import JobResponse
+
+router = APIRouter()
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
+RESPOND_ASYNC = "respond-async"
+
+
+class JobPending(Exception):
+    """The job did not finish within JOBS_WAIT_TIMEOUT_S; answered with 202 and the job URL."""
+
+    def __init__(self, job: JobSnapshot) -> None:
+        self.job = job
+
+
+async def job_event_stream(job_id: int, last_event_id: int = 0) -> AsyncIterator[str]:
+    async for event_id, type, data in tail_events(job_id, last_event_id):
+        yield f"id: {event_id}\ndata: {json.dumps({'type': type, **data}, ensure_ascii=False)}\n\n"
+
+
+def stream_job(job_id: int, last_event_id: int = 0) -> StreamingResponse:
+    return StreamingResponse(job_event_stream(job_id, last_event_id), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def prefers_async(prefer: str | None = Header(None)) -> bool:
+    """``Prefer: respond-async`` (RFC 7240): answer 202 with the job handle instead of waiting for it."""
+    return prefer is not None and RESPOND_ASYNC in prefer.lower()
+
+
+def parse_last_event_id(value: str | None) -> int:
+    try:
+        return max(int(value), 0) if value else 0
+    except ValueError:
+        return 0
+
+
+async def run_job(
+    db: Session,
+    kind: str,
+    payload: dict,
+    user_id: int,
+    idempotency_key: str,
+    respond_async: bool = False,
+) -> Any:
+    """
+    Enqueue (or join) a job and wait for its result; raises JobPending if it takes
+    too long, or right away with ``respond_async`` unless the job already finished.
+    """
+    job = enqueue(db, kind, payload, user_id=user_id, idempotency_key=idempotency_key)
+    # Don't hold a pooled connection while waiting on the worker.
+    db.commit()
+    snapshot = job if respond_async else await wait_for_job(job.id, settings.JOBS_WAIT_TIMEOUT_S)
+    if snapshot.status == SUCCEEDED:
+        return snapshot.result
+    if snapshot.status == FAILED:
+        # The status the handler failed with, e.g. 404 for a missing row; 500 for crashes.
+        raise HTTPException(
+            status_code=snapshot.error_status or status.HTTP_500_INTERNAL_SERVER_ERROR, detail=snapshot.error
+        )
+    raise JobPending(snapshot)
+
+
+def _get_own_job(db: Session, job_id: int, current_user: User) -> Job:
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == current_user.id).first()
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    return JobResponse.model_validate(_get_own_job(db, job_id, current_user), from_attributes=True)
+
+
+@router.get("/{job_id}/events")
+def get_job_events(
+    job_id: int,
+    last_event_id: str | None = Header(None),
+    after: int | None = Query(None, description="Resume after this event id (for clients that cannot set Last-Event-ID)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    _get_own_job(db, job_id, current_user)
+    return stream_job(job_id, after if after is not None else parse_last_event_id(last_event_id))
@@ -1,15 +1,14 @@
 from app.core.database import get_db 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from app.core.lazy import lazy_module
+from app.core.pagination import Page, finish_page, keyset, page_params
+from fastapi import APIRouter, Depends, HTTPException, Response, status, BackgroundTasks
 from app.api.v1.auth import get_current_user
 from app.api.deps import require_premium
 from app.models.lesson_model import Lesson
 from app.models.user_model import User
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from datetime import datetime, date, timedelta, timezone
-import json
-import re
-from app.core.utils import open_yaml
-from app.core.llm import LLMClient, MODEL_NAME
 from app.schemas.roleplay_schema import (
     Goal, 
     ChatMessage, 
@@ -20,22 +19,70 @@ from app.schemas.roleplay_schema import (
     RoleplayHistoryResponse,
     FinishSessionResponse
 )
-from app.schemas.agents_schema import Vocabs
-from app.api.v1.stats import update_user_stats, refresh_leaderboard_cache
+from app.api.v1.stats import update_user_stats
 from app.models.goal_model import Roleplay
 from app.models.roleplay_message_model import RoleplayMessage
 from typing import List
-from app.workflows.roleplay_workflow import build_workflow
 from app.workflows.nodes.roleplay import build_system_prompt
-from app.workflows.nodes.roleplay_evaluation_node import evaluate_roleplay
+from app.api.v1.jobs import prefers_async, run_job
+from app.jobs.handlers import LESSON, ROLEPLAY_EVALUATION, schedule_leaderboard_refresh
+from app.models.daily_situation_model import DailySituation
 from app.services.roleplay_service import (
     check_end_in_background_task,
-    get_or_create_today_lesson,
+    generate_roleplay_goal,
     normalize_roleplay_evaluation,
 )
 
+roleplay_workflow = lazy_module("app.workflows.roleplay_workflow")
+
 router = APIRouter()
 
+
+async def get_or_create_today_lesson(
+    *,
+    current_user: User,
+    db: Session,
+    start: datetime,
+    end: datetime,
+) -> Lesson:
+    """
+    Get today's lesson. If none exists, generate it from today's DailySituation
+    with the same LESSON job as /agents/create_lesson, so a lesson is never
+    generated twice (or on one checkpoint thread by two runs) at once.
+    """
+    lesson = db.query(Lesson).filter(
+        Lesson.user_id == current_user.id,
+        Lesson.created_at >= start,
+        Lesson.created_at < end
+    ).first()
+    if lesson:
+        return lesson
+
+    daily_situation = db.query(DailySituation.id).filter(
+        DailySituation.user_id == current_user.id,
+        DailySituation.created_at >= start,
+        DailySituation.created_at < end
+    ).first()
+    if not daily_situation:
+        raise HTTPException(status_code=404, detail="No lesson or daily situation found for today.")
+    if not current_user.profile:
+        raise HTTPException(status_code=400, detail="User profile not found. Please complete your profile first.")
+
+    day = start.date().isoformat()
+    await run_job(
+        db,
+        LESSON,
+        {"user_id": current_user.id, "date": day},
+        user_id=current_user.id,
+        idempotency_key=f"lesson:{current_user.id}:{day}",
+    )
+    return db.query(Lesson).filter(
+        Lesson.user_id == current_user.id,
+        Lesson.created_at >= start,
+        Lesson.created_at < end
+    ).one()
+
+
 @router.get("/session", response_model=SessionResponse)
 async def get_session(
     current_user: User = Depends(require_premium), 
@@ -100,91 +147,13 @@ async def goal_maker(
             ai_role=existing_goal.ai_role
         )
 
-    lesson = await get_or_create_today_lesson(current_user=current_user, db=db, start=start, end=end)
-
-    title = lesson.title
-    text = " ".join(lesson.paragraphs)
-
-    yaml_prompt = open_yaml("app/workflows/prompts.yaml")
-    prompt_block = yaml_prompt["roleplay_goal_generator"]
-
-    system_prompt = prompt_block["system"]
-    human_prompt = prompt_block["human"]
+    await get_or_create_today_lesson(current_user=current_user, db=db, start=start, end=end)
 
-    system_prompt = system_prompt.replace("{{ lesson_title }}", title)
-    system_prompt = system_prompt.replace("{{ lesson_body }}", text)
-
-    human_prompt = human_prompt.replace("{{ lesson_title }}", title)
-    human_prompt = human_prompt.replace("{{ lesson_body }}", text)
-
-    messages = [
-    {
-        "role": "system",
-        "content": system_prompt,
-    },
-    {
-        "role": "user",
-        "content": human_prompt,
-    }
-]
-    
-    goal_llm = LLMClient()
-    goal_chat = goal_llm.get_client(MODEL_NAME)
-    result = await goal_chat.with_structured_output(Goal).ainvoke(messages)
-    
-    vocab_prompt = yaml_prompt.get('vocab_roleplay_prompt', '')
-    vocab_system_prompt = vocab_prompt.replace("{{ goal_text }}", result.goal)
-    vocab_system_prompt = vocab_system_prompt.replace("{{ user_role }}", result.user_role)
-    vocab_system_prompt = vocab_system_prompt.replace("{{ ai_role }}", result.ai_role)
-    
-    vocab_messages = [
-        {
-            "role": "system",
-            "content": vocab_system_prompt
-        }
-    ]
+    # Release the pooled connection before the LLM calls; the goal is saved with its own session.
+    db.commit()
 
-    vocab_items = []
-    try:
-        # Use a separate client instance for structured JSON (LLMClient caches internally)
-        vocab_llm = LLMClient()
-        vocab_chat = vocab_llm.get_client(MODEL_NAME)
-        vocab_result = await vocab_chat.with_structured_output(Vocabs).ainvoke(vocab_messages)
-        vocab_items = vocab_result.vocab
-    except Exception:
-        # Fallback: parse JSON manually (free models can return extra text or truncated JSON)
-        try:
-            vocab_llm = LLMClient()
-            vocab_chat = vocab_llm.get_client(MODEL_NAME)
-            raw = await vocab_chat.ainvoke(vocab_messages)
-            raw_text = raw.content if hasattr(raw, "content") else str(raw)
-            match = re.search(r"\{[\s\S]*\}", raw_text)
-            if match:
-                data = json.loads(match.group(0))
-                vocab_items = Vocabs(**data).vocab
-        except Exception:
-            vocab_items = []
-    
-    suggested_vocab = []
-    for vocab_item in vocab_items[:5]:
-        if getattr(vocab_item, "term", None) and getattr(vocab_item, "meaning", None):
-            suggested_vocab.append({
-                "term": vocab_item.term,
-                "meaning": vocab_item.meaning
-            })
-    
-    res = Roleplay(
-        user_id=current_user.id,
-        goal=result.goal,
-        user_role=result.user_role,
-        ai_role=result.ai_role,
-        suggested_vocab=suggested_vocab
-    )
-    db.add(res)
-    db.commit() 
-    db.refresh(res)
-    
-    return result 
+    result = await generate_roleplay_goal(current_user.id, today)
+    return Goal(**result)
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
@@ -268,7 +237,7 @@ async def chat(
         "goal_id": goal.id
         }
     
-    app = build_workflow()
+    app = roleplay_workflow.build_workflow()
     result = await app.ainvoke(initial_state)
     new_history = result.get("chat_history", chat_history)
     new_messages = new_history[previous_len:]
@@ -309,7 +278,7 @@ async def chat(
         
         points_earned = avg_score + 10
         update_user_stats(db, current_user.id, points_earned, "roleplay", goal.id)
-        refresh_leaderboard_cache(db)
+        schedule_leaderboard_refresh(db)
         
         # Return reply + evaluation in same response
         return ChatResponse(reply=reply, done=True, evaluation=evaluation)
@@ -331,6 +300,8 @@ async def chat(
 
 @router.get("/messages", response_model=List[MessageResponse])
 async def get_messages(
+    response: Response,
+    page: Page = Depends(page_params(default_limit=50, max_limit=200)),
     current_user: User = Depends(require_premium), 
     db: Session = Depends(get_db)
 ):
@@ -338,7 +309,7 @@ async def get_messages(
     start = datetime.combine(today, datetime.min.time(), tzinfo=timezone.utc)
     end = start + timedelta(days=1)
 
-    goal = db.query(Roleplay).filter(
+    goal = db.query(Roleplay.id).filter(
         Roleplay.user_id == current_user.id,
         Roleplay.created_at >= start,
         Roleplay.created_at < end
@@ -347,18 +318,19 @@ async def get_messages(
     if goal is None:
         return []
 
-    messages = (
-        db.query(RoleplayMessage)
-        .filter(
-            RoleplayMessage.roleplay_id == goal.id,
-            RoleplayMessage.role.in_(["user", "assistant"])
-        )
-        .order_by(RoleplayMessage.created_at.asc())
-        .all()
+    # Newest page first through the index; the system prompt is never selected.
+    query = db.query(
+        RoleplayMessage.id, RoleplayMessage.role, RoleplayMessage.content, RoleplayMessage.created_at
+    ).filter(
+        RoleplayMessage.roleplay_id == goal.id,
+        RoleplayMessage.role.in_(["user", "assistant"])
+    )
+    messages = finish_page(
+        keyset(query, RoleplayMessage.created_at, RoleplayMessage.id, page).all(), page, response
     )
 
     result = []
-    for msg in messages:
+    for msg in reversed(messages):
         speaker = "user" if msg.role == "user" else "ai"
         result.append(MessageResponse(
             id=str(msg.id),
@@ -372,42 +344,47 @@ async def get_messages(
 
 @router.get("/history", response_model=List[RoleplayHistoryResponse])
 async def get_roleplay_history(
+    response: Response,
+    page: Page = Depends(page_params()),
     current_user: User = Depends(require_premium), 
     db: Session = Depends(get_db)
 ):
-    goals = (
-        db.query(Roleplay)
-        .filter(Roleplay.user_id == current_user.id)
-        .order_by(Roleplay.created_at.desc())
-        .limit(30)
-        .all()
+    # The day's lesson title is looked up inside the same statement: one index probe per row, no N+1.
+    day_start = func.date_trunc("day", Roleplay.created_at, "UTC")
+    lesson_title = (
+        select(Lesson.title)
+        .where(
+            Lesson.user_id == Roleplay.user_id,
+            Lesson.created_at >= day_start,
+            Lesson.created_at < day_start + timedelta(days=1),
+        )
+        .order_by(Lesson.created_at, Lesson.id)
+        .limit(1)
+        .correlate(Roleplay)
+        .scalar_subquery()
     )
-
-    result = []
-    for goal in goals:
-        lesson = db.query(Lesson).filter(
-            Lesson.user_id == current_user.id,
-            Lesson.created_at >= goal.created_at.replace(hour=0, minute=0, second=0, microsecond=0),
-            Lesson.created_at < (goal.created_at.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1))
-        ).first()
-        
-        title = lesson.title if lesson else "Unknown"
-        
-        has_evaluation = goal.evaluation is not None and goal.evaluation != {}
-        result.append(RoleplayHistoryResponse(
+    query = db.query(
+        Roleplay.id, Roleplay.score, Roleplay.completed, Roleplay.created_at, lesson_title.label("title")
+    ).filter(Roleplay.user_id == current_user.id)
+    goals = finish_page(keyset(query, Roleplay.created_at, Roleplay.id, page).all(), page, response)
+
+    # completed is set together with the evaluation, so the JSONB column is not read here.
+    return [
+        RoleplayHistoryResponse(
             id=goal.id,
-            title=title,
-            completed=has_evaluation,
-            score=goal.score if hasattr(goal, 'score') else None,
+            title=goal.title or "Unknown",
+            completed=bool(goal.completed),
+            score=goal.score,
             created_at=goal.created_at.isoformat() if goal.created_at else None
-        ))
-    
-    return result
+        )
+        for goal in goals
+    ]
 
 @router.post("/finish", response_model=FinishSessionResponse)
 async def finish_session(
     current_user: User = Depends(require_premium), 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    respond_async: bool = Depends(prefers_async),
 ):
     today = date.today()
     start = datetime.combine(today, datetime.min.time(), tzinfo=timezone.utc)
@@ -435,54 +412,21 @@ async def finish_session(
             score=goal.score or 0
         )
 
-    existing_messages = (
-        db.query(RoleplayMessage)
-        .filter(RoleplayMessage.roleplay_id == goal.id)
-        .order_by(RoleplayMessage.created_at.asc())
-        .all()
-    )
-    chat_history = [ChatMessage(role=m.role, content=m.content) for m in existing_messages]
-
-    if not chat_history:
+    has_messages = db.query(RoleplayMessage.id).filter(RoleplayMessage.roleplay_id == goal.id).first()
+    if not has_messages:
         raise HTTPException(status_code=400, detail="No conversation found. Cannot evaluate empty session.")
 
-    initial_state = {
-        "lesson_title": lesson.title,
-        "lesson_body": " ".join(lesson.paragraphs),
-        "goal_text": goal.goal,
-        "user_role": goal.user_role,
-        "ai_role": goal.ai_role,
-        "chat_history": chat_history,
-        "user_input": "",
-        "turn_count": 0,
-        "goal_id": goal.id
-    }
-    
-    evaluation_result = await evaluate_roleplay(initial_state)
-    evaluation = evaluation_result.get("evaluation")
-    
-    if not evaluation:
-        raise HTTPException(status_code=500, detail="Failed to generate evaluation.")
+    result = await run_job(
+        db,
+        ROLEPLAY_EVALUATION,
+        {"goal_id": goal.id, "lesson_id": lesson.id},
+        user_id=current_user.id,
+        idempotency_key=f"roleplay_evaluation:{goal.id}",
+        respond_async=respond_async,
+    )
 
     from app.schemas.roleplay_schema import RoleplayEvaluationOutput
-    evaluation_output = RoleplayEvaluationOutput(**normalize_roleplay_evaluation(evaluation))
-    
-    avg_score = (
-        evaluation.get("grammarScore", 0) + 
-        evaluation.get("clarityScore", 0) + 
-        evaluation.get("naturalnessScore", 0)
-    ) // 3
-    
-    goal.evaluation = evaluation
-    goal.completed = True
-    goal.score = avg_score
-    db.commit()
-    
-    points_earned = avg_score + 10
-    update_user_stats(db, current_user.id, points_earned, "roleplay", goal.id)
-    refresh_leaderboard_cache(db)
-
     return FinishSessionResponse(
-        evaluation=evaluation_output,
-        score=avg_score
+        evaluation=RoleplayEvaluationOutput(**normalize_roleplay_evaluation(result["evaluation"])),
+        score=result["score"]
     )
@@ -1,6 +1,6 @@
+import json
 from datetime import datetime, timezone
 
-import stripe
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
@@ -8,7 +8,10 @@ from sqlalchemy.orm import Session
 from app.api.v1.auth import get_current_user
 from app.core.config import settings
 from app.core.database import get_db
+from app.jobs import queue
+from app.jobs.handlers import STRIPE_EVENT
 from app.models.user_model import User
+from app.services.subscription_service import HANDLED_EVENTS, record_stripe_event, stripe
 
 
 router = APIRouter()
@@ -66,7 +69,7 @@ async def create_checkout_session(
         )
     price_id = data.price_id or settings.STRIPE_PRICE_ID_PREMIUM
     try:
-        session = stripe.checkout.Session.create(
+        session = await stripe.checkout.Session.create_async(
             payment_method_types=["card"],
             mode="subscription",
             line_items=[
@@ -102,7 +105,7 @@ async def cancel_subscription(
             detail="No active subscription to cancel",
         )
     try:
-        stripe.Subscription.delete(user.stripe_subscription_id)
+        await stripe.Subscription.cancel_async(user.stripe_subscription_id)
     except Exception as e:
         message = str(e)
         if "No such subscription" not in message:
@@ -120,6 +123,10 @@ async def cancel_subscription(
 
 @router.post("/webhook")
 async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
+    """
+    Verify and store the event, then acknowledge it; the job worker applies it.
+    Redeliveries are recognised by event id and join the event's job.
+    """
     payload = await request.body()
     sig_header = request.headers.get("stripe-signature")
     if not settings.STRIPE_WEBHOOK_SECRET:
@@ -128,72 +135,22 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
             detail="Webhook secret is not configured",
         )
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
     except Exception:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid payload")
-    event_type = event.get("type")
-    data = event.get("data", {}).get("object", {})
-    if event_type == "checkout.session.completed":
-        subscription_id = data.get("subscription")
-        client_reference_id = data.get("client_reference_id")
-        if subscription_id and client_reference_id:
-            user = (
-                db.query(User)
-                .filter(User.id == int(client_reference_id))
-                .first()
-            )
-            if user:
-                try:
-                    subscription = stripe.Subscription.retrieve(subscription_id)
-                except Exception:
-                    subscription = None
-                if subscription:
-                    status_value = subscription.get("status", "active")
-                    current_period_end = subscription.get("current_period_end")
-                    user.subscription_plan = "premium"
-                    user.subscription_status = status_value
-                    user.stripe_subscription_id = subscription.get("id")
-                    if current_period_end:
-                        user.subscription_current_period_end = datetime.fromtimestamp(
-                            current_period_end, tz=timezone.utc
-                        )
-                    db.commit()
-    elif event_type == "customer.subscription.updated":
-        subscription_id = data.get("id")
-        if subscription_id:
-            user = (
-                db.query(User)
-                .filter(User.stripe_subscription_id == subscription_id)
-                .first()
-            )
-            if user:
-                status_value = data.get("status", "active")
-                current_period_end = data.get("current_period_end")
-                user.subscription_status = status_value
-                if status_value in ["active", "trialing", "past_due"]:
-                    user.subscription_plan = "premium"
-                elif status_value == "canceled":
-                    user.subscription_plan = "free"
-                if current_period_end:
-                    user.subscription_current_period_end = datetime.fromtimestamp(
-                        current_period_end, tz=timezone.utc
-                    )
-                db.commit()
-    elif event_type == "customer.subscription.deleted":
-        subscription_id = data.get("id")
-        if subscription_id:
-            user = (
-                db.query(User)
-                .filter(User.stripe_subscription_id == subscription_id)
-                .first()
-            )
-            if user:
-                user.subscription_plan = "free"
-                user.subscription_status = "free"
-                user.subscription_current_period_end = None
-                user.stripe_subscription_id = None
-                db.commit()
+    event = json.loads(payload)
+    record_stripe_event(db, event)
+    if event["type"] in HANDLED_EVENTS:
+        # Enqueued on every delivery: the key makes repeats join the event's job, and a
+        # redelivery still queues it if storing succeeded but enqueueing failed last time.
+        # Claimed in run_after order, so events are applied in the order Stripe created them.
+        queue.enqueue(
+            db,
+            STRIPE_EVENT,
+            {"event_id": event["id"]},
+            idempotency_key=f"stripe_event:{event['id']}",
+            run_after=datetime.fromtimestamp(event["created"], timezone.utc),
+        )
     return {"status": "ok"}
-
@@ -1,12 +1,13 @@
 from datetime import datetime
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.api.deps import require_premium
 from app.core.database import get_db
+from app.core.pagination import Page, finish_page, keyset, page_params
 from app.core.llm import LLMClient, MODEL_NAME
 from app.core.utils import open_yaml
 from app.models.goal_model import Roleplay
@@ -126,40 +127,46 @@ async def get_conversation(
     return TeacherConversationResponse(id=conversation.id, created_at=created_at.isoformat())
 
 
+def _message_page(
+    db: Session, conversation_id: int, page: Page, response: Response
+) -> List[TeacherMessageResponse]:
+    """Newest messages first through the index, returned oldest-first for display."""
+    query = db.query(
+        TeacherMessage.id, TeacherMessage.role, TeacherMessage.content, TeacherMessage.created_at
+    ).filter(TeacherMessage.conversation_id == conversation_id)
+    rows = finish_page(keyset(query, TeacherMessage.created_at, TeacherMessage.id, page).all(), page, response)
+    return [
+        TeacherMessageResponse(
+            id=row.id,
+            role=row.role,
+            content=row.content,
+            timestamp=(row.created_at or datetime.utcnow()).isoformat(),
+        )
+        for row in reversed(rows)
+    ]
+
+
 @router.get("/messages", response_model=List[TeacherMessageResponse])
 async def get_messages(
+    response: Response,
+    page: Page = Depends(page_params(default_limit=50, max_limit=200)),
     current_user: User = Depends(require_premium),
     db: Session = Depends(get_db),
 ) -> List[TeacherMessageResponse]:
     conversation = get_or_create_conversation(current_user=current_user, db=db)
-    messages = (
-        db.query(TeacherMessage)
-        .filter(TeacherMessage.conversation_id == conversation.id)
-        .order_by(TeacherMessage.created_at.asc())
-        .all()
-    )
-    result: List[TeacherMessageResponse] = []
-    for msg in messages:
-        ts = msg.created_at or datetime.utcnow()
-        result.append(
-            TeacherMessageResponse(
-                id=msg.id,
-                role=msg.role,
-                content=msg.content,
-                timestamp=ts.isoformat(),
-            )
-        )
-    return result
+    return _message_page(db, conversation.id, page, response)
 
 
 @router.get("/messages/{conversation_id}", response_model=List[TeacherMessageResponse])
 async def get_messages_by_conversation(
     conversation_id: int,
+    response: Response,
+    page: Page = Depends(page_params(default_limit=50, max_limit=200)),
     current_user: User = Depends(require_premium),
     db: Session = Depends(get_db),
 ) -> List[TeacherMessageResponse]:
     conversation = (
-        db.query(TeacherConversation)
+        db.query(TeacherConversation.id)
         .filter(
             TeacherConversation.id == conversation_id,
             TeacherConversation.user_id == current_user.id,
@@ -168,24 +175,7 @@ async def get_messages_by_conversation(
     )
     if conversation is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
-    messages = (
-        db.query(TeacherMessage)
-        .filter(TeacherMessage.conversation_id == conversation.id)
-        .order_by(TeacherMessage.created_at.asc())
-        .all()
-    )
-    result: List[TeacherMessageResponse] = []
-    for msg in messages:
-        ts = msg.created_at or datetime.utcnow()
-        result.append(
-            TeacherMessageResponse(
-                id=msg.id,
-                role=msg.role,
-                content=msg.content,
-                timestamp=ts.isoformat(),
-            )
-        )
-    return result
+    return _message_page(db, conversation.id, page, response)
 
 
 @router.get("/context", response_model=TeacherContextResponse)
@@ -250,15 +240,16 @@ async def chat_with_teacher(
 
 @router.get("/history", response_model=List[TeacherHistoryResponse])
 async def get_history(
+    response: Response,
+    page: Page = Depends(page_params()),
     current_user: User = Depends(require_premium),
     db: Session = Depends(get_db),
 ) -> List[TeacherHistoryResponse]:
-    conversations = (
-        db.query(TeacherConversation)
-        .filter(TeacherConversation.user_id == current_user.id)
-        .order_by(TeacherConversation.created_at.desc())
-        .limit(30)
-        .all()
+    query = db.query(TeacherConversation.id, TeacherConversation.created_at).filter(
+        TeacherConversation.user_id == current_user.id
+    )
+    conversations = finish_page(
+        keyset(query, TeacherConversation.created_at, TeacherConversation.id, page).all(), page, response
     )
     if not conversations:
         return []
@@ -0,0 +1,34 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.orm import Session
+
+from app.api.v1.auth import get_current_user
+from app.core.database import get_db
+from app.core.http_cache import etag_for, is_not_modified, not_modified
+from app.models.user_model import User
+from app.schemas.today_schema import TodayResponse
+from app.services.today_service import load_today
+
+router = APIRouter()
+
+
+@router.get("", response_model=TodayResponse)
+def get_today(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Situation, lesson summary, roleplay goal, writing goal, stats and completion
+    for today in one query. Polls send If-None-Match and get a 304 while nothing changed.
+    """
+    today = load_today(db, current_user.id, date.today())
+    etag = etag_for(today.model_dump())
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return today
@@ -8,9 +8,8 @@ from app.schemas.user_schema import UserProfileRequest ,SituationOutput, UserPro
 from app.models.user_profile_model import UserProfile
 from app.models.daily_situation_model import DailySituation
 from datetime import date, datetime, timedelta
-from app.core.llm import LLMClient, MODEL_NAME
-from app.core.utils import open_yaml
-from langchain_core.prompts import ChatPromptTemplate
+from app.api.v1.jobs import run_job
+from app.jobs.handlers import DAILY_SITUATION
 router = APIRouter()
 
 @router.get("/me", response_model=UserResponse)
@@ -97,57 +96,15 @@ async def get_daily_situation(current_user: User = Depends(get_current_user), db
             detail="No user profile"
         )
 
-    seven_days_ago = today - timedelta(days=7)
-    
-    last_seven_days_situations_db = db.query(DailySituation).filter(
-        DailySituation.user_id==current_user.id,
-        DailySituation.created_at>=seven_days_ago,
-        DailySituation.created_at<end
-        ).all()
-    
-    last_seven_days_situations = [situation.daily_situation for situation in last_seven_days_situations_db]
-        
-    llm = LLMClient()
-    llm = llm.get_client(MODEL_NAME)
-
-    yaml_prompts = open_yaml("app/workflows/prompts.yaml")
-    p = yaml_prompts['situation_generate']
-    prompt = ChatPromptTemplate.from_messages([
-    ("system", p["system"]),
-    ("human", p["human"]),
-    ])
-
-    messages = prompt.invoke({
-        "name":current_user.full_name,
-        "speaking": current_user.profile.user_level_speaking,
-        "reading": current_user.profile.user_level_reading,
-        "goal":current_user.profile.user_goal,
-        "region":current_user.profile.user_region,
-        "last_seven_days_situations":last_seven_days_situations
-    })
-
-    print(messages)
-    try:
-        response = await llm.with_structured_output(SituationOutput).ainvoke(messages)
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Failed to generate daily situation: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to generate daily situation: {e}"
-        )
-
-    daily_situation = DailySituation(
-        daily_situation = response.situation,
-        user_id = current_user.id
+    result = await run_job(
+        db,
+        DAILY_SITUATION,
+        {"user_id": current_user.id, "date": today.isoformat()},
+        user_id=current_user.id,
+        idempotency_key=f"daily_situation:{current_user.id}:{today.isoformat()}",
     )
 
-    db.add(daily_situation)
-    db.commit()
-    db.refresh(daily_situation)
-
-    return SituationOutput.model_validate(response)
+    return SituationOutput.model_validate(result)
     
 
 
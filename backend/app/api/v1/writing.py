@@ -1,73 +1,25 @@
 from datetime import date, datetime, timedelta, timezone
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from app.api.v1.auth import get_current_user
 from app.core.database import get_db
-from app.models.daily_situation_model import DailySituation
+from app.core.pagination import Page, finish_page, keyset, page_params
 from app.models.user_model import User
-from app.schemas.writing_schema import Goal, WritingHistoryItem
-from app.core.llm import LLMClient, MODEL_NAME
+from app.schemas.writing_schema import WritingHistoryItem
+from app.models.job_model import Job
 from app.models.writng_model import Writing
-from app.schemas.evaluate_writing_schema import (
-    WritingEvaluation,
-    WritingEvaluationRequest,
-    WritingEvaluationResponse,
-)
-from app.api.v1.stats import update_user_stats
-from app.models.activity_log_model import ActivityLog
+from app.schemas.evaluate_writing_schema import WritingEvaluationRequest, WritingEvaluationResponse
+from app.api.v1.jobs import prefers_async, run_job
+from app.jobs.handlers import WRITING_EVALUATION
+from app.jobs.queue import FAILED, SUCCEEDED
+from app.services.writing_service import WRITING_EVALUATIONS_AVOIDED, generate_writing_goal, writing_input_hash
 
 router = APIRouter()
 
 
-def make_prompt(daily_situation: str) -> str:
-    return f"""
-You are a goal-setting assistant for a German learning app.
-
-Your job is to generate a NEW writing goal based ONLY on the provided daily situation.
-
-IMPORTANT:
-- Do NOT reuse or repeat any of the example goals.
-- Do NOT copy example wording.
-- The output must be completely adapted to the given situation.
-- If the situation is different, the goal must also be different.
-
-The goal must:
-- Be written in English
-- Describe WHAT the user should write
-- Specify WHO it is for (if relevant)
-- Explain WHY it is written
-- Mention the TYPE of text
-- Indicate the TONE
-
-Output rules:
-- Output ONLY the goal
-- 1–2 sentences maximum
-- No explanations
-- No formatting
-- No examples
-
---- EXAMPLES (for structure reference only, DO NOT reuse) ---
-
-Daily situation: I was sick today and missed university.
-Goal: Write a formal email to your professor explaining that you were sick and missed class and politely ask for the materials.
-
-Daily situation: I want to reflect on my first week in Austria.
-Goal: Write a short diary entry about your first week in Austria and describe your feelings and impressions.
-
---- END OF EXAMPLES ---
-
-Now generate a goal based strictly on this situation:
-
-Daily situation:
-{daily_situation}
-""".strip()
-
-
-
-
 @router.get("/create_goal")
 async def writing(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     today = date.today()
@@ -85,104 +37,47 @@ async def writing(current_user: User = Depends(get_current_user), db: Session =
     if existing_goal:
         return {"goal": existing_goal.goal}
 
-    daily_situation = (
-        db.query(DailySituation)
-        .filter(
-            DailySituation.user_id == current_user.id,
-            DailySituation.created_at >= start,
-            DailySituation.created_at < end,
-        )
-        .first()
-    )
-    if not daily_situation:
-        raise HTTPException(status_code=404, detail="Daily situation not found for today")
-
-    system_prompt = make_prompt(daily_situation.daily_situation)
-    messages = [
-        {
-            "role": "system",
-            "content": system_prompt,
-        }
-    ]
-    llm = LLMClient()
-    chat = llm.get_client(MODEL_NAME)
-
-    result = await chat.with_structured_output(Goal).ainvoke(messages)
-    user_id = current_user.id
-
-    goal = Writing(
-        user_id=user_id,
-        goal=result.goal,
-    )
-
-    db.add(goal)
+    # Release the pooled connection before the LLM call; the goal is saved with its own session.
     db.commit()
-    db.refresh(goal)
 
-    return {"goal": result.goal}
+    return await generate_writing_goal(current_user.id, today)
 
 
 @router.get("/history", response_model=List[WritingHistoryItem])
 async def get_writing_history(
+    response: Response,
+    page: Page = Depends(page_params()),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    writings = (
-        db.query(Writing)
-        .filter(Writing.user_id == current_user.id)
-        .order_by(Writing.created_at.desc())
-        .all()
+    # Projected to the covering index; the text itself is served by /history/{writing_id}.
+    query = db.query(Writing.id, Writing.goal, Writing.completed, Writing.created_at).filter(
+        Writing.user_id == current_user.id
     )
+    rows = finish_page(keyset(query, Writing.created_at, Writing.id, page).all(), page, response)
 
-    history: List[WritingHistoryItem] = []
-    for item in writings:
-        history.append(
-            WritingHistoryItem(
-                id=item.id,
-                goal=item.goal,
-                created_at=item.created_at,
-                completed=bool(item.user_input and item.user_input.strip()),
-                user_input=item.user_input,
-            )
-        )
-
-    return history
-
-
-def make_evaluation_prompt(goal: str, user_input: str) -> str:
-    return f"""
-You are a supportive German writing coach in a German learning app.
-
-Your task is to evaluate the learner’s writing based on the given goal.
-
-Evaluate how well the learner’s writing matches the goal.
-
-Focus on:
-- Task completion (Did they fully respond to what the goal asked?)
-- Grammar and sentence structure
-- Clarity and coherence
-- Appropriateness of tone (formal, informal, polite, etc., if required)
-
-Be constructive, encouraging, and specific.
-Highlight what the learner did well before suggesting improvements.
-
-Return your evaluation in the following structured format:
-
-score: integer from 0 to 100  
-strengths: short, positive feedback highlighting what was done well  
-improvements: short, actionable advice explaining how to improve  
-review: 2–4 sentences of friendly overall feedback, motivating the learner to keep improving  
-
-Do NOT rewrite the entire text.
-Do NOT provide a corrected full version unless explicitly asked.
-Keep feedback clear, supportive, and concise.
+    return [
+        WritingHistoryItem(id=row.id, goal=row.goal, created_at=row.created_at, completed=bool(row.completed))
+        for row in rows
+    ]
 
-Goal:
-{goal}
 
-Learner writing:
-{user_input}
-""".strip()
+@router.get("/history/{writing_id}", response_model=WritingHistoryItem)
+async def get_writing(
+    writing_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    item = db.query(Writing).filter(Writing.id == writing_id, Writing.user_id == current_user.id).first()
+    if item is None:
+        raise HTTPException(status_code=404, detail="Writing not found")
+    return WritingHistoryItem(
+        id=item.id,
+        goal=item.goal,
+        created_at=item.created_at,
+        completed=bool(item.completed),
+        user_input=item.user_input,
+    )
 
 
 @router.post("/evaluate", response_model=WritingEvaluationResponse)
@@ -190,6 +85,8 @@ async def evaluate_writing(
     payload: WritingEvaluationRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(None),
+    respond_async: bool = Depends(prefers_async),
 ):
     today = date.today()
     start = datetime.combine(today, datetime.min.time(), tzinfo=timezone.utc)
@@ -208,30 +105,40 @@ async def evaluate_writing(
     if not writing:
         raise HTTPException(status_code=404, detail="No writing goal found for today")
 
-    prompt = make_evaluation_prompt(writing.goal, payload.user_input)
-    messages = [{"role": "system", "content": prompt}]
+    input_hash = writing_input_hash(payload.user_input)
+    if writing.input_hash == input_hash and writing.evaluation:
+        WRITING_EVALUATIONS_AVOIDED.inc(reason="stored")
+        return WritingEvaluationResponse(goal=writing.goal, evaluation=writing.evaluation)
 
-    llm = LLMClient()
-    chat = llm.get_client(MODEL_NAME)
-    evaluation = await chat.with_structured_output(WritingEvaluation).ainvoke(messages)
-
-    writing.user_input = payload.user_input
-    db.commit()
-
-    writing_activity = (
-        db.query(ActivityLog)
-        .filter(
-            ActivityLog.user_id == current_user.id,
-            ActivityLog.activity_type == "writing",
-            ActivityLog.created_at >= start,
-            ActivityLog.created_at < end,
-        )
-        .first()
+    # Identical submissions, or retries with the same Idempotency-Key, join one job and one LLM call.
+    key = (
+        f"writing_evaluation:{current_user.id}:key:{idempotency_key}" if idempotency_key
+        else f"writing_evaluation:{writing.id}:{input_hash}"
     )
-
-    if writing_activity is None:
-        points_earned = evaluation.score + 10
-        update_user_stats(db, current_user.id, points_earned, "writing", writing.id)
-
-    return WritingEvaluationResponse(goal=writing.goal, evaluation=evaluation)
-
+    existing = db.query(Job.payload, Job.status, Job.result).filter(Job.idempotency_key == key).first()
+    if existing is not None:
+        if existing.payload.get("input_hash") != input_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different text",
+            )
+        if existing.status != FAILED:
+            WRITING_EVALUATIONS_AVOIDED.inc(reason="joined")
+        if existing.status == SUCCEEDED:
+            # This text was evaluated before another one replaced it on the row; the
+            # finished job won't run again, so put its evaluation back here.
+            writing.user_input = payload.user_input
+            writing.evaluation = existing.result["evaluation"]
+            writing.input_hash = input_hash
+            db.commit()
+            return WritingEvaluationResponse(**existing.result)
+
+    result = await run_job(
+        db,
+        WRITING_EVALUATION,
+        {"writing_id": writing.id, "user_input": payload.user_input, "input_hash": input_hash},
+        user_id=current_user.id,
+        idempotency_key=key,
+        respond_async=respond_async,
+    )
+    return WritingEvaluationResponse(**result)
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.metrics import REGISTRY
+from app.jobs import queue
+
+logger = logging.getLogger(__name__)
+
+BULK = "bulk"
+INTERACTIVE = "interactive"
+
+ADMISSION_INFLIGHT = REGISTRY.gauge(
+    "admission_inflight_requests", "LLM-backed requests in flight in this worker.", ("class",),
+)
+REQUESTS_SHED = REGISTRY.counter(
+    "http_requests_shed_total", "Requests rejected with 503 by admission control.", ("route", "reason"),
+)
+
+
+def db_pool_usage() -> float:
+    pool = engine.pool
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    return pool.checkedout() / capacity if capacity > 0 else 0.0
+
+
+class AdmissionMiddleware:
+    """
+    Per-worker admission control for LLM-backed endpoints (ADMISSION_ROUTES).
+    Their LLM work runs as jobs on the worker loop or in worker processes, so
+    the in-flight counts here are requests waiting on (or streaming) a job or an
+    interactive reply. Bulk work (lesson generation, evaluations) is rejected
+    with a fast 503 and Retry-After once this worker has ADMISSION_MAX_INFLIGHT
+    such requests open, ADMISSION_MAX_JOB_BACKLOG jobs of ADMISSION_JOB_KINDS
+    are running or due (read from the queue, at most every
+    ADMISSION_JOB_BACKLOG_TTL_S), or the DB pool is nearly exhausted.
+    Interactive routes get extra headroom on the in-flight limit. Every other
+    route is never counted or shed.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        self.inflight = {BULK: 0, INTERACTIVE: 0}
+        self._backlog = 0
+        self._backlog_read_at = float("-inf")
+
+    async def job_backlog(self) -> int:
+        if time.monotonic() - self._backlog_read_at >= settings.ADMISSION_JOB_BACKLOG_TTL_S:
+            # Set first, so requests arriving during the read use the last value instead of reading too.
+            self._backlog_read_at = time.monotonic()
+            try:
+                self._backlog = await asyncio.to_thread(queue.backlog, settings.ADMISSION_JOB_KINDS)
+            except Exception as e:
+                logger.warning(f"Reading the job backlog failed: {e}")
+        return self._backlog
+
+    async def _shed_reason(self, kind: str) -> str | None:
+        limit = settings.ADMISSION_MAX_INFLIGHT
+        if kind == INTERACTIVE:
+            limit = int(limit * settings.ADMISSION_INTERACTIVE_HEADROOM)
+        if sum(self.inflight.values()) >= limit:
+            return "inflight"
+        if kind == BULK:
+            if db_pool_usage() >= settings.ADMISSION_MAX_DB_POOL_USAGE:
+                return "db_pool"
+            if await self.job_backlog() >= settings.ADMISSION_MAX_JOB_BACKLOG:
+                return "job_backlog"
+        return None
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        kind = settings.ADMISSION_ROUTES.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if kind is None or scope["method"] == "OPTIONS" or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await self._shed_reason(kind)
+        if reason is not None:
+            REQUESTS_SHED.inc(route=scope["path"], reason=reason)
+            logger.warning(f"Shedding {scope['method']} {scope['path']}: {reason}")
+            await self._reject(send, reason)
+            return
+
+        self.inflight[kind] += 1
+        ADMISSION_INFLIGHT.set(self.inflight[kind], **{"class": kind})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.inflight[kind] -= 1
+            ADMISSION_INFLIGHT.set(self.inflight[kind], **{"class": kind})
+
+    async def _reject(self, send: Any, reason: str) -> None:
+        retry_after = settings.ADMISSION_RETRY_AFTER_S
+        body = json.dumps({
+            "detail": "Server is busy, please retry shortly.",
+            "reason": reason,
+            "retry_after": retry_after,
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
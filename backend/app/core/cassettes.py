@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+_PII_PATTERNS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"(?<!\w)\+?\d(?:[\s().-]?\d){8,}(?!\w)"), "<number>"),
+    (re.compile(r"(?im)^(\s*-?\s*name:\s*).+$"), r"\1<name>"),
+    (re.compile(r"(?i)\b(Hi|Hallo|Dear|Liebe[rs]?)\s+[A-ZÄÖÜ][\wäöüß-]+"), r"\1 <name>"),
+]
+
+# Request fields that change the model output; everything else (e.g. stream options) is ignored for matching.
+_KEY_FIELDS = ("model", "messages", "response_format", "tools", "tool_choice", "temperature", "max_tokens")
+
+
+class CassetteMiss(Exception):
+    pass
+
+
+def scrub(value: Any) -> Any:
+    """Recursively replace emails, phone/card numbers and names in strings."""
+    if isinstance(value, str):
+        for pattern, replacement in _PII_PATTERNS:
+            value = pattern.sub(replacement, value)
+        return value
+    if isinstance(value, list):
+        return [scrub(v) for v in value]
+    if isinstance(value, dict):
+        return {k: scrub(v) for k, v in value.items()}
+    return value
+
+
+def request_key(payload: dict) -> str:
+    """Hash of the scrubbed, canonicalized request, used to match replays exactly."""
+    relevant = {k: payload[k] for k in _KEY_FIELDS if k in payload}
+    canonical = json.dumps(scrub(relevant), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def request_shape(payload: dict) -> str:
+    """
+    Coarse call signature (structured-output schema or tool name, else plain chat).
+    Replays fall back to it when the exact prompt was never recorded, so traffic for
+    other users/days still gets production-shaped responses and timing.
+    """
+    response_format = payload.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return f"schema:{response_format.get('json_schema', {}).get('name', '')}"
+    tools = payload.get("tools") or []
+    if tools:
+        return f"tool:{tools[0].get('function', {}).get('name', '')}"
+    return "chat"
+
+
+class CassetteStore:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._by_key: dict[str, list[dict]] = defaultdict(list)
+        self._by_shape: dict[str, list[dict]] = defaultdict(list)
+        self._cursors: dict[str, itertools.count] = defaultdict(itertools.count)
+        self._loaded = False
+        self.hits = 0
+
+    def append(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            if self.path.exists():
+                with self.path.open(encoding="utf-8") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        entry = json.loads(line)
+                        self._by_key[entry["key"]].append(entry)
+                        self._by_shape[entry["shape"]].append(entry)
+            self._loaded = True
+            logger.info(f"Loaded {sum(len(v) for v in self._by_key.values())} LLM cassettes from {self.path}")
+
+    def _next(self, index: dict[str, list[dict]], name: str, cursor: str) -> dict | None:
+        entries = index.get(name)
+        if not entries:
+            return None
+        return entries[next(self._cursors[cursor]) % len(entries)]
+
+    def find(self, key: str, shape: str, match: str) -> dict | None:
+        """Return the next recording for ``key`` (cycling through repeats), else for ``shape``."""
+        self._load()
+        entry = self._next(self._by_key, key, f"key:{key}")
+        if entry is None and match == "shape":
+            entry = self._next(self._by_shape, shape, f"shape:{shape}")
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport for the LLM client that records chat completions to an
+    append-only JSONL file, or replays them from it with the recorded latency.
+    Responses are read fully, so this is not suitable for streaming calls.
+    """
+
+    def __init__(
+        self,
+        store: CassetteStore,
+        mode: str,
+        match: str = "shape",
+        time_scale: float = 1.0,
+        wrapped: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.store = store
+        self.mode = mode
+        self.match = match
+        self.time_scale = time_scale
+        self.wrapped = wrapped or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/chat/completions"):
+            return await self.wrapped.handle_async_request(request)
+
+        payload = json.loads(request.content or b"{}")
+        key = request_key(payload)
+        shape = request_shape(payload)
+
+        if self.mode == MODE_REPLAY:
+            return await self._replay(request, key, shape)
+        return await self._record(request, payload, key, shape)
+
+    async def _record(self, request: httpx.Request, payload: dict, key: str, shape: str) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.wrapped.handle_async_request(request)
+        body = await response.aread()
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = {"raw": body.decode("utf-8", errors="replace")}
+
+        if response.status_code == 200:
+            self.store.append({
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+                "key": key,
+                "shape": shape,
+                "model": payload.get("model"),
+                "request": scrub({k: payload[k] for k in _KEY_FIELDS if k in payload}),
+                "status": response.status_code,
+                "response": scrub(data),
+                "usage": data.get("usage"),
+                "latency_ms": round(latency_ms, 1),
+            })
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=[(k, v) for k, v in response.headers.items() if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")],
+            content=body,
+            request=request,
+        )
+
+    async def _replay(self, request: httpx.Request, key: str, shape: str) -> httpx.Response:
+        entry = self.store.find(key, shape, self.match)
+        if entry is None:
+            raise CassetteMiss(f"No LLM cassette for {shape} (key {key[:12]}) in {self.store.path}")
+        if self.time_scale > 0:
+            await asyncio.sleep(entry.get("latency_ms", 0) / 1000 * self.time_scale)
+        return httpx.Response(
+            status_code=entry.get("status", 200),
+            json=entry["response"],
+            headers={"x-llm-cassette": "exact" if entry["key"] == key else "shape"},
+            request=request,
+        )
+
+    async def aclose(self) -> None:
+        await self.wrapped.aclose()
+
+
+_store: CassetteStore | None = None
+
+
+def get_store() -> CassetteStore:
+    global _store
+    if _store is None:
+        _store = CassetteStore(settings.LLM_CASSETTE_PATH)
+    return _store
+
+
+def get_cassette_transport() -> CassetteTransport | None:
+    """Transport for the LLM http client when LLM_CASSETTE_MODE is record/replay, else None."""
+    mode = settings.LLM_CASSETTE_MODE
+    if mode == MODE_OFF:
+        return None
+    if mode not in (MODE_RECORD, MODE_REPLAY):
+        raise ValueError(f"LLM_CASSETTE_MODE must be one of off/record/replay, got {mode!r}")
+    return CassetteTransport(
+        get_store(),
+        mode,
+        match=settings.LLM_CASSETTE_MATCH,
+        time_scale=settings.LLM_CASSETTE_TIME_SCALE,
+    )
@@ -0,0 +1,137 @@
+"""
+The LangChain chat model behind ``LLMClient``. Kept out of app/core/llm.py so
+importing the scheduler, routes and priorities does not load langchain-openai
+and the openai SDK; ``LLMClient.get_client`` imports this module on first use.
+"""
+import asyncio
+import logging
+import time
+from typing import Any
+
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from app.core.llm import (
+    LLM_FALLBACKS,
+    LLM_HEDGE_WINS,
+    LLM_HEDGES,
+    LLM_REQUEST_DEADLINE_EXCEEDED,
+    LLMDeadlineExceeded,
+    LLMRequestDeadlineExceeded,
+    ModelRoute,
+    current_deadline,
+    get_scheduler,
+    latencies,
+    resolve_model_route,
+    resolve_priority,
+)
+from app.core.llm_tracing import current_route, finish_call, resolve_call_site, start_call
+from app.core.structured_output import instrument_structured_output, repairing_structured_output
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI that goes through the LLM scheduler and records latency, tokens,
+    retries and parse failures per call site. The model, sampling settings and
+    timeout come from the call site's LLM_ROUTES entry; a call that errors or
+    times out is retried on the next model of the route's fallback chain, unless
+    the request's deadline (``current_deadline``) has passed. Routes with ``hedge``
+    race a second attempt against slow first ones. Structured output for pydantic
+    schemas is parsed leniently and repaired (app/core/structured_output.py).
+    """
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        metadata = run_manager.metadata if run_manager else None
+        call_site = resolve_call_site(metadata)
+        route = resolve_model_route(call_site, current_route(), self.model_name)
+        deadline = current_deadline()
+        models = route.models
+        for i, model in enumerate(models):
+            until = time.monotonic() + route.timeout_s if route.timeout_s else None
+            if deadline is not None:
+                if deadline <= time.monotonic():
+                    LLM_REQUEST_DEADLINE_EXCEEDED.inc(route=current_route())
+                    raise LLMRequestDeadlineExceeded(current_route())
+                until = deadline if until is None else min(until, deadline)
+            attempt = (messages, stop, run_manager)
+            try:
+                if route.hedge:
+                    return await self._agenerate_hedged(model, route, until, call_site, *attempt, **kwargs)
+                return await self._agenerate_model(model, route, until, *attempt, **kwargs)
+            except LLMDeadlineExceeded:
+                # Every model shares the scheduler, so the next one would not get a slot either.
+                raise
+            except Exception as e:
+                if deadline is not None and deadline <= time.monotonic():
+                    LLM_REQUEST_DEADLINE_EXCEEDED.inc(route=current_route())
+                    raise LLMRequestDeadlineExceeded(current_route()) from e
+                if i == len(models) - 1:
+                    raise
+                reason = "timeout" if isinstance(e, TimeoutError) else type(e).__name__
+                LLM_FALLBACKS.inc(call_site=call_site, model=model, reason=reason)
+                logger.warning(f"LLM call to {model} failed ({reason}), falling back to {models[i + 1]}")
+
+    async def _agenerate_hedged(
+        self, model: str, route: ModelRoute, until: float | None, call_site: str, messages, stop, run_manager, **kwargs: Any
+    ):
+        """
+        Start a second attempt once the first runs past the call site's hedge delay and
+        return whichever answers first; the other is cancelled. No hedge is started while
+        calls are queueing for the scheduler, since it would only add to the backlog.
+        """
+        attempt = (messages, stop, run_manager)
+        primary = asyncio.create_task(self._agenerate_model(model, route, until, *attempt, **kwargs))
+        tasks = {primary: "primary"}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=latencies.hedge_delay(call_site))
+            if done or get_scheduler().queued or (until is not None and until <= time.monotonic()):
+                return await primary
+            hedge_model = route.hedge_model or model
+            LLM_HEDGES.inc(call_site=call_site, model=hedge_model)
+            tasks[asyncio.create_task(self._agenerate_model(hedge_model, route, until, *attempt, **kwargs))] = "hedge"
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        LLM_HEDGE_WINS.inc(call_site=call_site, winner=tasks[task])
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _agenerate_model(
+        self, model: str, route: ModelRoute, until: float | None, messages, stop, run_manager, **kwargs: Any
+    ):
+        call, token = start_call(model, run_manager.metadata if run_manager else None)
+        scheduler = get_scheduler()
+        try:
+            priority = resolve_priority(call)
+            async with scheduler.slot(priority) as waited:
+                call.queue_ms = waited * 1000
+                started = time.perf_counter()
+                timeout = None if until is None else until - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    raise TimeoutError(f"No time left for {model} after queueing")
+                result = await asyncio.wait_for(
+                    super()._agenerate(messages, stop=stop, run_manager=run_manager, **{**kwargs, **route.params(model)}),
+                    timeout=timeout,
+                )
+                latency = time.perf_counter() - started
+                scheduler.on_success(latency, priority)
+                latencies.observe(call.call_site, latency)
+        except BaseException as e:
+            finish_call(call, token, error=e)
+            raise
+        finish_call(call, token, usage=(result.llm_output or {}).get("token_usage"))
+        return result
+
+    def with_structured_output(self, schema=None, **kwargs: Any) -> Runnable:
+        if isinstance(schema, type) and issubclass(schema, BaseModel) and not kwargs.get("include_raw"):
+            return repairing_structured_output(super().with_structured_output(schema, include_raw=True, **kwargs), schema)
+        runnable = super().with_structured_output(schema, **kwargs)
+        return instrument_structured_output(runnable, getattr(schema, "__name__", "schema"))
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Any, Dict, List
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,6 +13,120 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 15
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000","https://jonas-jade.vercel.app"]
     OPENROUTER_API_KEY: str
+    OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
+    TTS_URL: str = "https://translate.google.com/translate_tts"
+    TRANSLATE_URL: str = "https://translate.googleapis.com/translate_a/single"
+
+    DEBUG: bool = False
+    # Default chat model and fallback chain, used by call sites without their own entry in LLM_ROUTES
+    LLM_MODEL: str = "poolside/laguna-xs.2:free"
+    LLM_FALLBACK_MODELS: List[str] = []
+    # Per-attempt deadline (including the client's HTTP retries) before the next fallback model is tried
+    LLM_TIMEOUT_S: float = 120.0
+    # call site or route -> {"model", "fallbacks", "temperature", "max_tokens", "timeout_s"} (all optional)
+    LLM_ROUTES: Dict[str, Dict[str, Any]] = {
+        "end_check": {"temperature": 0, "timeout_s": 15.0},
+        "writing_goal": {"timeout_s": 30.0},
+        "chat": {"timeout_s": 30.0, "hedge": True},
+        "/api/v1/teacher/chat": {"timeout_s": 30.0, "hedge": True},
+    }
+    # Routes with "hedge": true start a second attempt (on "hedge_model" if set) once the first has run longer
+    # than this quantile of the call site's recent latencies, or LLM_HEDGE_DELAY_S until enough are known
+    LLM_HEDGE_QUANTILE: float = 0.9
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_DELAY_S: float = 8.0
+    LLM_HEDGE_MIN_DELAY_S: float = 0.5
+    # route -> seconds all LLM calls of one request may take, across every graph node it runs
+    LLM_REQUEST_DEADLINES_S: Dict[str, float] = {
+        "/api/v1/roleplay/chat": 40.0,
+        "/api/v1/teacher/chat": 40.0,
+    }
+    # Warn (and count db_repeated_queries_total) when a request runs one statement more often than this
+    DB_REPEATED_QUERY_WARN: int = 5
+    # /metrics answers clients in these networks, or anywhere with "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_ALLOWED_NETWORKS: List[str] = ["127.0.0.0/8", "::1/128"]
+    METRICS_TOKEN: str | None = None
+    # model -> [USD per 1M prompt tokens, USD per 1M completion tokens]
+    LLM_PRICES_PER_MTOK: Dict[str, List[float]] = {}
+
+    # Adaptive (AIMD) limit on concurrent OpenRouter calls
+    LLM_CONCURRENCY_INITIAL: int = 16
+    LLM_CONCURRENCY_MIN: int = 2
+    LLM_CONCURRENCY_MAX: int = 128
+    LLM_CONCURRENCY_BACKOFF: float = 0.7
+    LLM_CONCURRENCY_COOLDOWN_S: float = 1.0
+    # A call slower than its class target counts as overload; long generations run as standard/background
+    LLM_LATENCY_TARGETS_S: Dict[str, float] = {"interactive": 20.0, "standard": 90.0, "background": 180.0}
+    # Max share of the limit background calls may hold at once
+    LLM_BACKGROUND_SHARE: float = 0.5
+    # Max time a call may wait for a slot, per priority class
+    LLM_QUEUE_DEADLINES_S: Dict[str, float] = {"interactive": 15.0, "standard": 60.0, "background": 600.0}
+    # call site or route -> priority class (interactive / standard / background)
+    LLM_PRIORITIES: Dict[str, str] = {
+        "chat": "interactive",
+        "/api/v1/teacher/chat": "interactive",
+        "end_check": "background",
+        "evaluate": "background",
+        "/api/v1/agents/evaluate_lesson": "background",
+        "/api/v1/writing/evaluate": "background",
+        "background": "background",
+    }
+
+    # Per-worker load shedding for LLM-backed routes (see app/core/admission.py)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_INFLIGHT: int = 48
+    ADMISSION_INTERACTIVE_HEADROOM: float = 1.5
+    # Bulk requests are shed while this many jobs of ADMISSION_JOB_KINDS are running or due
+    ADMISSION_MAX_JOB_BACKLOG: int = 64
+    ADMISSION_JOB_KINDS: List[str] = [
+        "lesson", "daily_situation", "daily_bundle", "lesson_evaluation", "roleplay_evaluation", "writing_evaluation",
+    ]
+    ADMISSION_JOB_BACKLOG_TTL_S: float = 1.0
+    ADMISSION_MAX_DB_POOL_USAGE: float = 0.8
+    ADMISSION_RETRY_AFTER_S: int = 10
+    # path -> "bulk" (shed first) or "interactive"
+    ADMISSION_ROUTES: Dict[str, str] = {
+        "/api/v1/agents/create_lesson": "bulk",
+        "/api/v1/agents/daily_bundle": "bulk",
+        "/api/v1/users/dailysituation": "bulk",
+        "/api/v1/agents/evaluate_lesson": "bulk",
+        "/api/v1/writing/create_goal": "bulk",
+        "/api/v1/writing/evaluate": "bulk",
+        "/api/v1/roleplay/goal": "bulk",
+        "/api/v1/roleplay/finish": "bulk",
+        "/api/v1/roleplay/chat": "interactive",
+        "/api/v1/teacher/chat": "interactive",
+    }
+
+    # Durable job queue (see app/jobs). Turn JOBS_RUN_IN_API off when separate workers run.
+    JOBS_RUN_IN_API: bool = True
+    JOBS_WORKER_CONCURRENCY: int = 8
+    JOBS_POLL_INTERVAL_S: float = 0.25
+    JOBS_LEASE_S: float = 60.0
+    JOBS_MAX_ATTEMPTS: int = 3
+    JOBS_RETRY_BASE_S: float = 2.0
+    JOBS_RETRY_MAX_S: float = 60.0
+    JOBS_SHUTDOWN_GRACE_S: float = 20.0
+    # How long JSON endpoints wait for their job before answering 202
+    JOBS_WAIT_TIMEOUT_S: float = 120.0
+    # Finished jobs and their events are deleted this long after they finish, JOBS_RETENTION_BATCH at a time
+    JOBS_RETENTION_S: float = 604800.0
+    JOBS_RETENTION_BATCH: int = 1000
+    # Leaderboard rebuilds triggered by new points are batched into one per window.
+    LEADERBOARD_REFRESH_WINDOW_S: float = 30.0
+
+    # Graph checkpoints for resumable generation: "postgres" (shared by all workers) or "memory"
+    GRAPH_CHECKPOINTER: str = "postgres"
+    GRAPH_CHECKPOINT_TTL_S: float = 172800.0
+
+    # Nightly pre-generation (python -m app.jobs.pregenerate)
+    PREGENERATE_ACTIVE_DAYS: int = 7
+    PREGENERATE_CONCURRENCY: int = 4
+
+    LLM_CASSETTE_MODE: str = "off"
+    LLM_CASSETTE_PATH: str = "cassettes/llm.jsonl"
+    LLM_CASSETTE_MATCH: str = "shape"
+    LLM_CASSETTE_TIME_SCALE: float = 1.0
     
     MAIL_USERNAME: str = ""
     MAIL_PASSWORD: str = ""
@@ -24,6 +138,19 @@ class Settings(BaseSettings):
     MAIL_SSL_TLS: bool = False
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
+    # Outbox sender (see app/core/email.py); runs wherever the job worker runs
+    EMAIL_BATCH_SIZE: int = 20
+    EMAIL_POLL_INTERVAL_S: float = 1.0
+    EMAIL_SMTP_POOL_SIZE: int = 2
+    EMAIL_SMTP_IDLE_S: float = 60.0
+    EMAIL_SMTP_TIMEOUT_S: float = 30.0
+    EMAIL_MAX_ATTEMPTS: int = 6
+    EMAIL_RETRY_BASE_S: float = 30.0
+    EMAIL_RETRY_MAX_S: float = 3600.0
+    EMAIL_LEASE_S: float = 300.0
+    # Import langchain/langgraph and compile the workflow graphs in the background
+    # after startup instead of on the first request that needs them (app/core/lazy.py)
+    WARM_UP_ON_STARTUP: bool = True
     
     FRONTEND_URL: str = "http://localhost:3000"
     
@@ -31,6 +158,8 @@ class Settings(BaseSettings):
     STRIPE_PUBLISHABLE_KEY: str = ""
     STRIPE_WEBHOOK_SECRET: str = ""
     STRIPE_PRICE_ID_PREMIUM: str = ""
+    # Overrides https://api.stripe.com, e.g. with the fake in benchmarks/ when replaying webhooks
+    STRIPE_API_BASE: str = ""
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,118 @@
+import logging
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+QUERIES_HEADER = "X-DB-Queries"
+QUERY_TIME_HEADER = "X-DB-Time-Ms"
+REPEATED_HEADER = "X-DB-Repeated"
+
+DB_QUERIES = REGISTRY.histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request.", ("route",),
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+DB_TIME = REGISTRY.histogram(
+    "db_time_per_request_seconds", "Time spent executing SQL per HTTP request.", ("route",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+DB_REPEATED = REGISTRY.counter(
+    "db_repeated_queries_total",
+    "Requests that ran one parameterized statement more than DB_REPEATED_QUERY_WARN times.", ("route",),
+)
+
+_queries: ContextVar["RequestQueries | None"] = ContextVar("db_queries", default=None)
+
+
+@dataclass
+class RequestQueries:
+    count: int = 0
+    seconds: float = 0.0
+    statements: StatementCounter = field(default_factory=StatementCounter)
+
+    def most_repeated(self) -> tuple[str, int]:
+        if not self.statements:
+            return "", 0
+        return self.statements.most_common(1)[0]
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _queries.get() is not None and context is not None:
+        context.query_started = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    queries = _queries.get()
+    started = getattr(context, "query_started", None)
+    if queries is None or started is None:
+        return
+    # Sync endpoints and dependencies run in the threadpool with a copy of the request
+    # context, which still points at the request's RequestQueries.
+    queries.count += 1
+    queries.seconds += time.perf_counter() - started
+    queries.statements[statement] += 1
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attribute every statement run on ``engine`` to the HTTP request whose context runs it."""
+    if not event.contains(engine, "before_cursor_execute", _before_execute):
+        event.listen(engine, "before_cursor_execute", _before_execute)
+        event.listen(engine, "after_cursor_execute", _after_execute)
+
+
+class DBQueryMiddleware:
+    """
+    Counts the SQL statements, DB time and repeated identical statements of each
+    request. Exported per route on /metrics; when DEBUG is on also returned as
+    X-DB-* and Server-Timing headers. Warns when a request runs the same
+    parameterized statement more than DB_REPEATED_QUERY_WARN times (an N+1).
+    Streaming responses send their headers first, so only metrics and logs see them.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        token = _queries.set(queries)
+
+        async def send_wrapper(message: dict) -> None:
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                _, repeated = queries.most_repeated()
+                headers = list(message.get("headers", []))
+                headers.append((QUERIES_HEADER.lower().encode(), str(queries.count).encode()))
+                headers.append((QUERY_TIME_HEADER.lower().encode(), f"{queries.seconds * 1000:.1f}".encode()))
+                headers.append((REPEATED_HEADER.lower().encode(), str(repeated).encode()))
+                headers.append(
+                    (b"server-timing", f'db;dur={queries.seconds * 1000:.1f};desc="{queries.count} queries"'.encode())
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _queries.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            DB_QUERIES.observe(queries.count, route=route)
+            DB_TIME.observe(queries.seconds, route=route)
+            statement, repeated = queries.most_repeated()
+            if repeated > settings.DB_REPEATED_QUERY_WARN:
+                DB_REPEATED.inc(route=route)
+                logger.warning(
+                    f"{scope['method']} {route} ran the same statement {repeated} times "
+                    f"({queries.count} queries in total): {' '.join(statement.split())[:200]}"
+                )
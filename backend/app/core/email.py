@@ -1,27 +1,47 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+"""
+Outgoing email through an outbox.
+
+Requests only render the message and add a row to ``email_outbox``; the
+``EmailSender`` (run next to the job worker) claims queued rows in batches and
+sends them over a small pool of SMTP connections that stay open between
+batches. Failed sends are retried with exponential backoff; 5xx replies and
+exhausted attempts leave the row ``failed``.
+"""
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import AsyncIterator
+
+import aiosmtplib
+from jinja2 import Environment
+from sqlalchemy.orm import Session
+
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import REGISTRY
+from app.models.email_outbox_model import EmailOutbox
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
-    MAIL_STARTTLS=settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=settings.USE_CREDENTIALS,
-    VALIDATE_CERTS=settings.VALIDATE_CERTS,
-    TEMPLATE_FOLDER=None,
-)
-
-async def send_verification_email(email: str, token: str, full_name: str):
-    verification_url = f"{settings.FRONTEND_URL}/verify-email?token={token}"
-    
-    message = MessageSchema(
-        subject="Verify your Jonas account",
-        recipients=[email],
-        body=f"""
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+EMAILS_QUEUED = REGISTRY.counter("emails_queued_total", "Emails added to the outbox.", ())
+EMAILS_FINISHED = REGISTRY.counter("emails_finished_total", "Email send attempts by outcome.", ("outcome",))
+SMTP_CONNECTIONS = REGISTRY.counter("smtp_connections_total", "SMTP connections opened by the email sender.", ())
+
+_templates = Environment(autoescape=True)
+
+# Compiled once at import; rendering it per signup is a few microseconds.
+VERIFICATION_TEMPLATE = _templates.from_string("""
         <html>
         <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
             <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
@@ -29,19 +49,19 @@ async def send_verification_email(email: str, token: str, full_name: str):
                     <h1 style="color: #E87A2E; font-size: 32px; margin: 0;">Jonas</h1>
                 </div>
                 <div style="background-color: #FDF6E9; padding: 30px; border-radius: 10px;">
-                    <h2 style="color: #1a1a1a; margin-top: 0;">Hi {full_name}!</h2>
+                    <h2 style="color: #1a1a1a; margin-top: 0;">Hi {{ full_name }}!</h2>
                     <p style="color: #666;">Welcome to Jonas! Please verify your email address to complete your registration.</p>
                     <p style="text-align: center; margin: 30px 0;">
-                        <a href="{verification_url}" 
-                           style="background-color: #E87A2E; color: white; padding: 12px 24px; 
+                        <a href="{{ verification_url }}"
+                           style="background-color: #E87A2E; color: white; padding: 12px 24px;
                                   text-decoration: none; border-radius: 25px; display: inline-block;">
                             Verify Email Address
                         </a>
                     </p>
                     <p style="color: #666; font-size: 14px;">
                         Or copy and paste this link into your browser:<br>
-                        <a href="{verification_url}" style="color: #E87A2E; word-break: break-all;">
-                            {verification_url}
+                        <a href="{{ verification_url }}" style="color: #E87A2E; word-break: break-all;">
+                            {{ verification_url }}
                         </a>
                     </p>
                     <p style="color: #666; font-size: 12px; margin-top: 30px;">
@@ -51,9 +71,241 @@ async def send_verification_email(email: str, token: str, full_name: str):
             </div>
         </body>
         </html>
-        """,
-        subtype="html",
-    )
-    
-    fm = FastMail(conf)
-    await fm.send_message(message)
+""")
+
+
+@dataclass
+class ClaimedEmail:
+    id: int
+    recipient: str
+    subject: str
+    html: str
+    attempts: int
+
+
+_sender_wakeups: list[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def queue_email(db: Session, recipient: str, subject: str, html: str) -> None:
+    """Add an email to the outbox; committed with the caller's transaction."""
+    db.add(EmailOutbox(recipient=recipient, subject=subject, html=html, status=QUEUED, run_after=_now()))
+    EMAILS_QUEUED.inc()
+
+
+def wake_sender() -> None:
+    """Let a sender running in this process pick up new mail without waiting for its next poll."""
+    for loop, event in _sender_wakeups:
+        loop.call_soon_threadsafe(event.set)
+
+
+def queue_verification_email(db: Session, email: str, token: str, full_name: str) -> None:
+    verification_url = f"{settings.FRONTEND_URL}/verify-email?token={token}"
+    html = VERIFICATION_TEMPLATE.render(full_name=full_name, verification_url=verification_url)
+    queue_email(db, email, "Verify your Jonas account", html)
+
+
+def _message(email: ClaimedEmail) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((settings.MAIL_FROM_NAME, settings.MAIL_FROM))
+    message["To"] = email.recipient
+    message["Subject"] = email.subject
+    message.set_content(email.html, subtype="html")
+    return message
+
+
+def claim_emails(limit: int) -> list[ClaimedEmail]:
+    db = SessionLocal()
+    try:
+        emails = (
+            db.query(EmailOutbox)
+            .filter(EmailOutbox.status == QUEUED, EmailOutbox.run_after <= _now())
+            .order_by(EmailOutbox.run_after, EmailOutbox.id)
+            .with_for_update(skip_locked=True)
+            .limit(limit)
+            .all()
+        )
+        claimed = []
+        for email in emails:
+            email.status = SENDING
+            email.attempts += 1
+            email.locked_at = _now()
+            claimed.append(ClaimedEmail(email.id, email.recipient, email.subject, email.html, email.attempts))
+        db.commit()
+        return claimed
+    finally:
+        db.close()
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(settings.EMAIL_RETRY_BASE_S * 2 ** (attempts - 1), settings.EMAIL_RETRY_MAX_S)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def finish_emails(results: list[tuple[ClaimedEmail, BaseException | None]]) -> None:
+    """Record a batch's outcomes in one transaction."""
+    db = SessionLocal()
+    try:
+        for email, error in results:
+            values: dict = {EmailOutbox.locked_at: None}
+            if error is None:
+                values.update({EmailOutbox.status: SENT, EmailOutbox.sent_at: _now(), EmailOutbox.error: None})
+                outcome = SENT
+            else:
+                permanent = (
+                    isinstance(error, aiosmtplib.SMTPResponseException) and error.code >= 500
+                ) or email.attempts >= settings.EMAIL_MAX_ATTEMPTS
+                values[EmailOutbox.error] = str(error) or type(error).__name__
+                if permanent:
+                    values[EmailOutbox.status] = FAILED
+                    outcome = FAILED
+                    logger.error(f"Giving up on email {email.id} to {email.recipient}: {error}")
+                else:
+                    values.update({
+                        EmailOutbox.status: QUEUED,
+                        EmailOutbox.run_after: _now() + timedelta(seconds=retry_delay(email.attempts)),
+                    })
+                    outcome = "retry"
+                    logger.warning(f"Email {email.id} attempt {email.attempts} failed: {error}")
+            db.query(EmailOutbox).filter(EmailOutbox.id == email.id).update(values, synchronize_session=False)
+            EMAILS_FINISHED.inc(outcome=outcome)
+        db.commit()
+    finally:
+        db.close()
+
+
+def requeue_stale_emails() -> int:
+    """Queue again emails claimed by a sender that died before recording the outcome."""
+    cutoff = _now() - timedelta(seconds=settings.EMAIL_LEASE_S)
+    db = SessionLocal()
+    try:
+        count = (
+            db.query(EmailOutbox)
+            .filter(EmailOutbox.status == SENDING, EmailOutbox.locked_at < cutoff)
+            .update({EmailOutbox.status: QUEUED, EmailOutbox.locked_at: None}, synchronize_session=False)
+        )
+        db.commit()
+        if count:
+            logger.warning(f"Requeued {count} stale emails")
+        return count
+    finally:
+        db.close()
+
+
+class SMTPPool:
+    """Up to ``size`` SMTP connections, reused across sends until idle for EMAIL_SMTP_IDLE_S."""
+
+    def __init__(self, size: int) -> None:
+        self._slots = asyncio.Semaphore(size)
+        self._idle: list[tuple[aiosmtplib.SMTP, float]] = []
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.MAIL_SERVER,
+            port=settings.MAIL_PORT,
+            username=settings.MAIL_USERNAME if settings.USE_CREDENTIALS else None,
+            password=settings.MAIL_PASSWORD if settings.USE_CREDENTIALS else None,
+            use_tls=settings.MAIL_SSL_TLS,
+            start_tls=settings.MAIL_STARTTLS,
+            validate_certs=settings.VALIDATE_CERTS,
+            timeout=settings.EMAIL_SMTP_TIMEOUT_S,
+        )
+        await smtp.connect()
+        SMTP_CONNECTIONS.inc()
+        return smtp
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        async with self._slots:
+            smtp = None
+            while self._idle and smtp is None:
+                smtp, last_used = self._idle.pop()
+                if not smtp.is_connected or time.monotonic() - last_used > settings.EMAIL_SMTP_IDLE_S:
+                    await self._quit(smtp)
+                    smtp = None
+            if smtp is None:
+                smtp = await self._connect()
+            try:
+                yield smtp
+            except aiosmtplib.SMTPResponseException:
+                # The server refused the message; the connection itself is still usable.
+                self._idle.append((smtp, time.monotonic()))
+                raise
+            except BaseException:
+                await self._quit(smtp)
+                raise
+            self._idle.append((smtp, time.monotonic()))
+
+    async def send(self, message: EmailMessage) -> None:
+        async with self.connection() as smtp:
+            try:
+                await smtp.send_message(message)
+                return
+            except aiosmtplib.SMTPServerDisconnected:
+                pass
+        # The server closed the pooled connection since its last use; once more on a fresh one.
+        async with self.connection() as smtp:
+            await smtp.send_message(message)
+
+    @staticmethod
+    async def _quit(smtp: aiosmtplib.SMTP) -> None:
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except aiosmtplib.SMTPException:
+            smtp.close()
+
+    async def close(self) -> None:
+        while self._idle:
+            await self._quit(self._idle.pop()[0])
+
+
+class EmailSender:
+    def __init__(self) -> None:
+        self.pool = SMTPPool(settings.EMAIL_SMTP_POOL_SIZE)
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+
+    async def _send(self, email: ClaimedEmail) -> tuple[ClaimedEmail, BaseException | None]:
+        try:
+            await self.pool.send(_message(email))
+            return email, None
+        except Exception as e:
+            return email, e
+
+    async def run(self) -> None:
+        registration = (asyncio.get_running_loop(), self._wakeup)
+        _sender_wakeups.append(registration)
+        logger.info(f"Email sender started (batch {settings.EMAIL_BATCH_SIZE}, pool {settings.EMAIL_SMTP_POOL_SIZE})")
+        last_requeue = 0.0
+        try:
+            while not self._stopping.is_set():
+                batch = []
+                try:
+                    # The outbox queries are blocking; run them off the loop the sends share.
+                    if time.monotonic() - last_requeue > settings.EMAIL_LEASE_S / 2:
+                        await asyncio.to_thread(requeue_stale_emails)
+                        last_requeue = time.monotonic()
+                    batch = await asyncio.to_thread(claim_emails, settings.EMAIL_BATCH_SIZE)
+                    if batch:
+                        results = await asyncio.gather(*(self._send(email) for email in batch))
+                        await asyncio.to_thread(finish_emails, results)
+                except Exception as e:
+                    logger.error(f"Email sender poll failed: {e}", exc_info=True)
+                if len(batch) == settings.EMAIL_BATCH_SIZE:
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.EMAIL_POLL_INTERVAL_S)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+        finally:
+            _sender_wakeups.remove(registration)
+            await self.pool.close()
@@ -0,0 +1,93 @@
+"""
+Deferred imports for the heavy parts of the app.
+
+langchain, langgraph and the openai SDK take seconds to import, and the
+workflow and checkpoint modules pull them in. Routers and services reference
+those modules through ``lazy_module`` so importing the app (worker boot,
+autoscaling, one-off commands) does not load them; the first attribute access
+imports the module. ``warm_up`` imports every registered module and compiles
+the graphs ahead of traffic: from the lifespan hook in the background, or in
+the prefork master before workers are forked.
+"""
+import importlib
+import logging
+import threading
+import time
+from types import ModuleType
+from typing import Any, Callable
+
+from app.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+_registered: dict[str, "LazyModule"] = {}
+_warmers: list[Callable[[], Any]] = []
+_warm_up_lock = threading.Lock()
+
+WARM_UP_SECONDS = REGISTRY.gauge(
+    "app_warm_up_seconds", "Time warm_up took in this process (0 until it has finished).", ()
+)
+
+
+class LazyModule:
+    """Stands in for a module until one of its attributes is used."""
+
+    def __init__(self, name: str, on_load: Callable[[ModuleType], Any] | None = None) -> None:
+        self._name = name
+        self._on_load = on_load
+        self._module: ModuleType | None = None
+        self._lock = threading.Lock()
+
+    def load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    module = importlib.import_module(self._name)
+                    if self._on_load is not None:
+                        self._on_load(module)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name: str, on_load: Callable[[ModuleType], Any] | None = None) -> LazyModule:
+    """``on_load`` runs once with the imported module, e.g. to configure a client library."""
+    if name not in _registered:
+        _registered[name] = LazyModule(name, on_load)
+    return _registered[name]
+
+
+def on_warm_up(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Register work ``warm_up`` runs after the imports, e.g. compiling a graph."""
+    _warmers.append(func)
+    return func
+
+
+def warm_up() -> float:
+    """Import every lazily referenced module and run the warmers. Returns the seconds it took."""
+    with _warm_up_lock:
+        if WARM_UP_SECONDS.value():
+            # Already warm, e.g. in a worker forked from a warmed prefork master.
+            return WARM_UP_SECONDS.value()
+        started = time.perf_counter()
+        loaded: set[str] = set()
+        # Loading a module can register further lazy modules.
+        while pending := [name for name in _registered if name not in loaded]:
+            for name in pending:
+                _registered[name].load()
+                loaded.add(name)
+        for warmer in list(_warmers):
+            try:
+                warmer()
+            except Exception as e:
+                logger.warning(f"Warm-up step {getattr(warmer, '__qualname__', warmer)} failed: {e}")
+        elapsed = time.perf_counter() - started
+        WARM_UP_SECONDS.set(elapsed)
+    logger.info(f"Warmed up {len(_registered)} modules and {len(_warmers)} steps in {elapsed:.2f}s")
+    return elapsed
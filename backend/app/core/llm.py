@@ -1,18 +1,405 @@
-from langchain_openai import ChatOpenAI
+import asyncio
+import heapq
+import itertools
+import time
+import weakref
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterator
+
+import httpx
 from app.core.config import settings
+from app.core.lazy import lazy_module
+from app.core.cassettes import get_cassette_transport
+from app.core.llm_tracing import (
+    LLMCall,
+    current_route,
+    on_http_request,
+    on_http_response,
+    request_started,
+)
+from app.core.metrics import REGISTRY
 import logging
 
+if TYPE_CHECKING:
+    from app.core.chat_model import InstrumentedChatOpenAI
+
 logger = logging.getLogger(__name__)
 
-MODEL_NAME = "poolside/laguna-xs.2:free"
+# langchain-openai and the openai SDK take seconds to import; loaded with the first client.
+chat_model = lazy_module("app.core.chat_model")
+
+MODEL_NAME = settings.LLM_MODEL
+
+INTERACTIVE = "interactive"
+STANDARD = "standard"
+BACKGROUND = "background"
+PRIORITY_RANK = {INTERACTIVE: 0, STANDARD: 1, BACKGROUND: 2}
+
+LLM_LIMIT = REGISTRY.gauge("llm_concurrency_limit", "Current adaptive limit on concurrent LLM calls.")
+LLM_INFLIGHT = REGISTRY.gauge("llm_inflight", "LLM calls currently holding a slot.", ("priority",))
+LLM_QUEUE_DEPTH = REGISTRY.gauge("llm_queue_depth", "LLM calls waiting for a slot.", ("priority",))
+LLM_QUEUE_WAIT = REGISTRY.histogram(
+    "llm_queue_wait_seconds", "Time LLM calls spent waiting for a slot.", ("priority",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+LLM_DEADLINE_EXCEEDED = REGISTRY.counter(
+    "llm_queue_deadline_exceeded_total", "LLM calls dropped after waiting past their class deadline.", ("priority",),
+)
+LLM_RATE_LIMITED = REGISTRY.counter("llm_rate_limited_total", "429 responses from the LLM provider.")
+LLM_LIMIT_CHANGES = REGISTRY.counter(
+    "llm_concurrency_limit_changes_total", "Adaptive limit adjustments.", ("direction", "reason"),
+)
+LLM_FALLBACKS = REGISTRY.counter(
+    "llm_fallbacks_total", "Calls handed to the next model in their fallback chain.", ("call_site", "model", "reason"),
+)
+LLM_HEDGES = REGISTRY.counter(
+    "llm_hedged_requests_total", "Calls that started a second, hedged attempt.", ("call_site", "model"),
+)
+LLM_HEDGE_WINS = REGISTRY.counter(
+    "llm_hedge_wins_total", "Hedged calls by the attempt that answered first.", ("call_site", "winner"),
+)
+LLM_REQUEST_DEADLINE_EXCEEDED = REGISTRY.counter(
+    "llm_request_deadline_exceeded_total", "Requests whose LLM calls ran past LLM_REQUEST_DEADLINES_S.", ("route",),
+)
+
+_priority: ContextVar[str | None] = ContextVar("llm_priority", default=None)
+_deadline: ContextVar[float | None] = ContextVar("llm_deadline", default=None)
+
+_http_client: httpx.AsyncClient | None = None
+# One per event loop: the in-API job worker runs on a loop of its own (app/jobs/worker.py).
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LLMScheduler]" = weakref.WeakKeyDictionary()
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    def __init__(self, priority: str, waited: float) -> None:
+        super().__init__(f"No LLM slot for {priority} call after {waited:.1f}s")
+        self.priority = priority
+        self.waited = waited
+
+
+class LLMRequestDeadlineExceeded(TimeoutError):
+    def __init__(self, route: str) -> None:
+        super().__init__(f"LLM calls for {route} ran past the request deadline")
+        self.route = route
+
+
+@contextmanager
+def llm_deadline(seconds: float) -> Iterator[None]:
+    """Give the LLM calls in this block, including those of graph nodes it runs, ``seconds`` in total."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> float | None:
+    """Earliest of the llm_deadline() block and the request's LLM_REQUEST_DEADLINES_S, as a monotonic time."""
+    deadlines = [_deadline.get()]
+    started = request_started()
+    budget = settings.LLM_REQUEST_DEADLINES_S.get(current_route())
+    if started is not None and budget:
+        deadlines.append(started + budget)
+    deadlines = [d for d in deadlines if d is not None]
+    return min(deadlines) if deadlines else None
+
+
+@contextmanager
+def llm_priority(priority: str) -> Iterator[None]:
+    """Run the LLM calls in this block at the given priority class."""
+    if priority not in PRIORITY_RANK:
+        raise ValueError(f"Unknown LLM priority {priority!r}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def resolve_priority(call: LLMCall) -> str:
+    """Explicit llm_priority() wins, then LLM_PRIORITIES by call site, then by route."""
+    explicit = _priority.get()
+    if explicit:
+        return explicit
+    priorities = settings.LLM_PRIORITIES
+    return priorities.get(call.call_site) or priorities.get(call.route) or STANDARD
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    model: str
+    fallbacks: tuple[str, ...] = ()
+    temperature: float | None = None
+    max_tokens: int | None = None
+    timeout_s: float | None = None
+    hedge: bool = False
+    hedge_model: str | None = None
+
+    @property
+    def models(self) -> list[str]:
+        return [self.model] + [m for m in self.fallbacks if m != self.model]
+
+    def params(self, model: str) -> dict[str, Any]:
+        params: dict[str, Any] = {"model": model}
+        if self.temperature is not None:
+            params["temperature"] = self.temperature
+        if self.max_tokens is not None:
+            params["max_tokens"] = self.max_tokens
+        return params
+
+
+def resolve_model_route(call_site: str, route: str, default_model: str) -> ModelRoute:
+    """LLM_ROUTES entry for the call site, else for the route; unset fields fall back to the defaults."""
+    routes = settings.LLM_ROUTES
+    entry = routes.get(call_site) or routes.get(route) or {}
+    return ModelRoute(
+        model=entry.get("model") or default_model,
+        fallbacks=tuple(entry.get("fallbacks", settings.LLM_FALLBACK_MODELS)),
+        temperature=entry.get("temperature"),
+        max_tokens=entry.get("max_tokens"),
+        timeout_s=entry.get("timeout_s", settings.LLM_TIMEOUT_S),
+        hedge=bool(entry.get("hedge", False)),
+        hedge_model=entry.get("hedge_model"),
+    )
+
+
+class LatencyTracker:
+    """Recent successful call latencies per call site; the hedge delay is a quantile of them."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+
+    def observe(self, call_site: str, seconds: float) -> None:
+        self._samples[call_site].append(seconds)
+
+    def quantile(self, call_site: str, q: float) -> float | None:
+        samples = self._samples.get(call_site)
+        if not samples or len(samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def hedge_delay(self, call_site: str) -> float:
+        delay = self.quantile(call_site, settings.LLM_HEDGE_QUANTILE)
+        if delay is None:
+            delay = settings.LLM_HEDGE_DELAY_S
+        return max(delay, settings.LLM_HEDGE_MIN_DELAY_S)
+
+
+latencies = LatencyTracker()
+
+
+class LLMScheduler:
+    """
+    Central gate in front of OpenRouter. Concurrency is capped by a limit that
+    grows by one slot per window of successful calls and shrinks multiplicatively
+    on 429s or calls slower than their priority class's latency target (AIMD). Waiters are served
+    strictly by priority class, FIFO within a class; background calls may only
+    use part of the limit so a burst of them cannot hold every slot when
+    interactive traffic arrives.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        latency_targets: dict[str, float],
+        backoff: float,
+        cooldown: float,
+        deadlines: dict[str, float],
+        background_share: float,
+    ) -> None:
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_targets = latency_targets
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.deadlines = deadlines
+        self.background_share = background_share
+        self.inflight = {p: 0 for p in PRIORITY_RANK}
+        self._waiters: list[tuple[int, int, asyncio.Future, str]] = []
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        LLM_LIMIT.set(self.limit)
+
+    @property
+    def total_inflight(self) -> int:
+        return sum(self.inflight.values())
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future, _ in self._waiters if not future.done())
+
+    def _has_capacity(self, priority: str) -> bool:
+        if self.total_inflight >= int(self.limit):
+            return False
+        if priority == BACKGROUND:
+            return self.inflight[BACKGROUND] < max(1, int(self.limit * self.background_share))
+        return True
+
+    def _take(self, priority: str) -> None:
+        self.inflight[priority] += 1
+        LLM_INFLIGHT.set(self.inflight[priority], priority=priority)
+
+    def _release(self, priority: str) -> None:
+        self.inflight[priority] -= 1
+        LLM_INFLIGHT.set(self.inflight[priority], priority=priority)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters:
+            _, _, future, priority = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._has_capacity(priority):
+                return
+            heapq.heappop(self._waiters)
+            self._take(priority)
+            future.set_result(None)
+            LLM_QUEUE_DEPTH.dec(priority=priority)
+
+    @asynccontextmanager
+    async def slot(self, priority: str) -> AsyncIterator[float]:
+        """Hold one concurrency slot; yields the seconds spent queueing."""
+        enqueued = time.monotonic()
+        if not self._waiters and self._has_capacity(priority):
+            self._take(priority)
+        else:
+            await self._wait(priority, enqueued)
+        waited = time.monotonic() - enqueued
+        LLM_QUEUE_WAIT.observe(waited, priority=priority)
+        try:
+            yield waited
+        finally:
+            self._release(priority)
+
+    async def _wait(self, priority: str, enqueued: float) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITY_RANK[priority], next(self._seq), future, priority))
+        LLM_QUEUE_DEPTH.inc(priority=priority)
+        try:
+            await asyncio.wait_for(future, timeout=self.deadlines.get(priority))
+        except asyncio.TimeoutError:
+            LLM_QUEUE_DEPTH.dec(priority=priority)
+            LLM_DEADLINE_EXCEEDED.inc(priority=priority)
+            raise LLMDeadlineExceeded(priority, time.monotonic() - enqueued)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(priority)
+            else:
+                LLM_QUEUE_DEPTH.dec(priority=priority)
+            raise
+
+    def on_success(self, latency: float, priority: str) -> None:
+        target = self.latency_targets.get(priority)
+        if target is not None and latency > target:
+            self._decrease("latency")
+            return
+        # Only grow while the limit is actually the bottleneck.
+        if (self._waiters or self.total_inflight >= int(self.limit)) and self.limit < self.maximum:
+            previous = int(self.limit)
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            LLM_LIMIT.set(self.limit)
+            if int(self.limit) > previous:
+                LLM_LIMIT_CHANGES.inc(direction="up", reason="success")
+                self._wake()
+
+    def on_rate_limited(self) -> None:
+        LLM_RATE_LIMITED.inc()
+        self._decrease("rate_limited")
+
+    def _decrease(self, reason: str) -> None:
+        # One cut per cooldown: a burst of 429s from the same overload should not collapse the limit.
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown or self.limit <= self.minimum:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.backoff)
+        LLM_LIMIT.set(self.limit)
+        LLM_LIMIT_CHANGES.inc(direction="down", reason=reason)
+        logger.warning(f"LLM concurrency limit lowered to {int(self.limit)} ({reason})")
+
+
+def get_scheduler() -> LLMScheduler:
+    """
+    The running event loop's scheduler. The job worker thread gets its own limit,
+    as a separate worker process does.
+    """
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _schedulers[loop] = LLMScheduler(
+            initial=settings.LLM_CONCURRENCY_INITIAL,
+            minimum=settings.LLM_CONCURRENCY_MIN,
+            maximum=settings.LLM_CONCURRENCY_MAX,
+            latency_targets=settings.LLM_LATENCY_TARGETS_S,
+            backoff=settings.LLM_CONCURRENCY_BACKOFF,
+            cooldown=settings.LLM_CONCURRENCY_COOLDOWN_S,
+            deadlines=settings.LLM_QUEUE_DEADLINES_S,
+            background_share=settings.LLM_BACKGROUND_SHARE,
+        )
+    return scheduler
+
+
+async def _on_rate_limit(response: httpx.Response) -> None:
+    if response.status_code == 429:
+        get_scheduler().on_rate_limited()
+
+
+class PerLoopTransport(httpx.AsyncBaseTransport):
+    """Pooled connections belong to the event loop that opened them, so keep a transport per loop."""
+
+    def __init__(self) -> None:
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncBaseTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _transport(self) -> httpx.AsyncBaseTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = self._transports[loop] = get_cassette_transport() or httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100),
+            )
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared, pooled http client for every OpenRouter call (hooks feed the LLM call trace)."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            transport=PerLoopTransport(),
+            follow_redirects=True,
+            event_hooks={"request": [on_http_request], "response": [on_http_response, _on_rate_limit]},
+        )
+    return _http_client
+
 
 class LLMClient:
     def __init__(self) -> None:
-        self._client : ChatOpenAI | None = None
+        self._client : "InstrumentedChatOpenAI | None" = None
         self._max_retries: int = 4
 
-    def get_client(self, model) -> ChatOpenAI:
+    def get_client(self, model) -> "InstrumentedChatOpenAI":
         if self._client is None:
+
             api_key = settings.OPENROUTER_API_KEY
             if not api_key:
                 raise ValueError(
@@ -30,15 +417,17 @@ class LLMClient:
             if not api_key.startswith("sk-or-v1-"):
                 logger.warning(f"OpenRouter API key format may be incorrect. Expected to start with 'sk-or-v1-', got: {api_key[:15]}...")
             
-            self._client = ChatOpenAI(
+            self._client = chat_model.InstrumentedChatOpenAI(
                 api_key=api_key,
-                base_url="https://openrouter.ai/api/v1",
+                base_url=settings.OPENROUTER_BASE_URL,
                 model=model,
                 temperature=0,
                 default_headers={
                     "HTTP-Referer": "http://localhost",
                     "X-Title": "jonas agent",
-                }
+                },
+                max_retries=self._max_retries,
+                http_async_client=get_http_client(),
             )
         return self._client
     
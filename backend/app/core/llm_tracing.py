@@ -0,0 +1,225 @@
+import asyncio
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Mapping
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TRACE_HEADER = "X-LLM-Trace"
+MAX_TRACE_ENTRIES = 50
+
+LLM_REQUESTS = REGISTRY.counter(
+    "llm_requests_total", "LLM calls by route, call site, model and outcome.",
+    ("route", "call_site", "model", "outcome"),
+)
+LLM_DURATION = REGISTRY.histogram(
+    "llm_request_duration_seconds", "Total LLM call latency including retries.", ("route", "call_site", "model"),
+)
+LLM_FIRST_BYTE = REGISTRY.histogram(
+    "llm_time_to_first_byte_seconds", "Time until the first response byte of the final attempt.",
+    ("call_site", "model"),
+)
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "llm_prompt_tokens_total", "Prompt tokens consumed.", ("route", "call_site", "model"),
+)
+LLM_COMPLETION_TOKENS = REGISTRY.counter(
+    "llm_completion_tokens_total", "Completion tokens produced.", ("route", "call_site", "model"),
+)
+LLM_COST = REGISTRY.counter(
+    "llm_cost_usd_total", "Estimated LLM spend from LLM_PRICES_PER_MTOK.", ("route", "call_site", "model"),
+)
+LLM_RETRIES = REGISTRY.counter(
+    "llm_retries_total", "HTTP retries made by the OpenAI client.", ("call_site", "model"),
+)
+LLM_PARSE_FAILURES = REGISTRY.counter(
+    "llm_structured_output_failures_total", "Structured-output calls whose response failed to parse.",
+    ("call_site", "schema"),
+)
+
+_scope: ContextVar[dict | None] = ContextVar("llm_scope", default=None)
+_call_site: ContextVar[str | None] = ContextVar("llm_call_site", default=None)
+_trace: ContextVar[list | None] = ContextVar("llm_trace", default=None)
+_current_call: ContextVar["LLMCall | None"] = ContextVar("llm_current_call", default=None)
+_request_started: ContextVar[float | None] = ContextVar("llm_request_started", default=None)
+
+
+@dataclass
+class LLMCall:
+    route: str
+    call_site: str
+    model: str
+    started: float = field(default_factory=time.perf_counter)
+    attempts: int = 0
+    queue_ms: float = 0.0
+    first_byte_ms: float | None = None
+    latency_ms: float | None = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    error: str | None = None
+
+    def to_trace(self) -> dict:
+        entry = {
+            "site": self.call_site,
+            "model": self.model,
+            "ms": round(self.latency_ms or 0, 1),
+            "ttfb_ms": round(self.first_byte_ms, 1) if self.first_byte_ms is not None else None,
+            "pt": self.prompt_tokens,
+            "ct": self.completion_tokens,
+            "retries": max(self.attempts - 1, 0),
+        }
+        if self.queue_ms >= 1:
+            entry["queue_ms"] = round(self.queue_ms, 1)
+        if self.error:
+            entry["error"] = self.error
+        return entry
+
+
+@contextmanager
+def llm_call_site(name: str) -> Iterator[None]:
+    """Name LLM calls made outside a graph node (background tasks, helpers) explicitly."""
+    token = _call_site.set(name)
+    try:
+        yield
+    finally:
+        _call_site.reset(token)
+
+
+def current_route() -> str:
+    """Route template of the request being served (the router fills scope["route"] in place)."""
+    scope = _scope.get()
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def request_started() -> float | None:
+    """``time.monotonic()`` when the request being served arrived (None outside a request)."""
+    return _request_started.get()
+
+
+def resolve_call_site(metadata: Mapping[str, Any] | None = None) -> str:
+    explicit = _call_site.get()
+    if explicit:
+        return explicit
+    node = (metadata or {}).get("langgraph_node")
+    if node:
+        return str(node)
+    return current_route()
+
+
+def start_call(model: str, metadata: Mapping[str, Any] | None = None) -> tuple[LLMCall, Token]:
+    call = LLMCall(route=current_route(), call_site=resolve_call_site(metadata), model=model)
+    return call, _current_call.set(call)
+
+
+def _cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prices = settings.LLM_PRICES_PER_MTOK.get(model)
+    if not prices:
+        return 0.0
+    prompt_price, completion_price = prices[0], prices[-1]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def finish_call(
+    call: LLMCall,
+    token: Token,
+    usage: Mapping[str, Any] | None = None,
+    error: BaseException | None = None,
+) -> None:
+    _current_call.reset(token)
+    call.latency_ms = (time.perf_counter() - call.started) * 1000
+    usage = usage or {}
+    call.prompt_tokens = int(usage.get("prompt_tokens") or 0)
+    call.completion_tokens = int(usage.get("completion_tokens") or 0)
+    if error is not None:
+        call.error = type(error).__name__
+    if error is None:
+        outcome = "ok"
+    elif isinstance(error, asyncio.CancelledError):
+        outcome = "cancelled"
+    else:
+        outcome = "error"
+
+    LLM_REQUESTS.inc(route=call.route, call_site=call.call_site, model=call.model, outcome=outcome)
+    LLM_DURATION.observe(call.latency_ms / 1000, route=call.route, call_site=call.call_site, model=call.model)
+    if call.first_byte_ms is not None:
+        LLM_FIRST_BYTE.observe(call.first_byte_ms / 1000, call_site=call.call_site, model=call.model)
+    if call.attempts > 1:
+        LLM_RETRIES.inc(call.attempts - 1, call_site=call.call_site, model=call.model)
+    labels = {"route": call.route, "call_site": call.call_site, "model": call.model}
+    LLM_PROMPT_TOKENS.inc(call.prompt_tokens, **labels)
+    LLM_COMPLETION_TOKENS.inc(call.completion_tokens, **labels)
+    LLM_COST.inc(_cost(call.model, call.prompt_tokens, call.completion_tokens), **labels)
+
+    trace = _trace.get()
+    if trace is not None and len(trace) < MAX_TRACE_ENTRIES:
+        trace.append(call.to_trace())
+
+
+def record_parse_failure(schema: str, metadata: Mapping[str, Any] | None, error: BaseException) -> None:
+    call_site = resolve_call_site(metadata)
+    LLM_PARSE_FAILURES.inc(call_site=call_site, schema=schema)
+    logger.warning(f"Structured output {schema} failed to parse at {call_site}: {type(error).__name__}")
+
+
+async def on_http_request(request: httpx.Request) -> None:
+    call = _current_call.get()
+    if call is not None:
+        call.attempts += 1
+        call.first_byte_ms = None
+
+
+async def on_http_response(response: httpx.Response) -> None:
+    call = _current_call.get()
+    if call is not None and call.first_byte_ms is None:
+        call.first_byte_ms = (time.perf_counter() - call.started) * 1000
+
+
+class LLMTraceMiddleware:
+    """
+    Tags LLM calls with the matched route and, when DEBUG is on, returns the
+    per-request call trace in the X-LLM-Trace header. Streaming responses send
+    their headers before generation starts, so their trace is only logged.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace: list = []
+        scope_token = _scope.set(scope)
+        trace_token = _trace.set(trace)
+        started_token = _request_started.set(time.monotonic())
+
+        async def send_wrapper(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                if settings.DEBUG and trace:
+                    headers = list(message.get("headers", []))
+                    total_ms = sum(entry["ms"] for entry in trace)
+                    headers.append((TRACE_HEADER.lower().encode(), json.dumps(trace, separators=(",", ":")).encode()))
+                    headers.append((b"server-timing", f'llm;dur={total_ms:.1f};desc="{len(trace)} calls"'.encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if settings.DEBUG and trace:
+                logger.debug(f"LLM trace {scope['method']} {scope['path']}: {json.dumps(trace)}")
+            _request_started.reset(started_token)
+            _trace.reset(trace_token)
+            _scope.reset(scope_token)
@@ -0,0 +1,76 @@
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass(frozen=True)
+class Page:
+    # None: the whole list (a request without ``cursor`` or ``limit``)
+    limit: Optional[int]
+    after: Optional[tuple[datetime, int]] = None
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def page_params(default_limit: int = 30, max_limit: int = 100) -> Callable[..., Page]:
+    """
+    Dependency for ``?cursor=&limit=``; the cursor comes from a previous page's
+    X-Next-Cursor header. Requests with neither get the whole list, as before
+    pagination, so clients that don't page don't lose rows.
+    """
+
+    def dependency(
+        cursor: Optional[str] = Query(None),
+        limit: Optional[int] = Query(None, ge=1, le=max_limit),
+    ) -> Page:
+        if cursor is None and limit is None:
+            return Page(limit=None)
+        return Page(limit=limit or default_limit, after=decode_cursor(cursor) if cursor else None)
+
+    return dependency
+
+
+def keyset(query: Any, created_at: Any, row_id: Any, page: Page, newest_first: bool = True) -> Any:
+    """
+    Order ``query`` by (created_at, id), continue after the page cursor and fetch one
+    extra row so ``finish_page`` can tell whether there is a next page. Both columns
+    must lead the index the query filters on for the page to be an index range scan.
+    """
+    key = tuple_(created_at, row_id)
+    if newest_first:
+        if page.after:
+            query = query.filter(key < tuple_(*page.after))
+        query = query.order_by(created_at.desc(), row_id.desc())
+    else:
+        if page.after:
+            query = query.filter(key > tuple_(*page.after))
+        query = query.order_by(created_at.asc(), row_id.asc())
+    return query if page.limit is None else query.limit(page.limit + 1)
+
+
+def finish_page(rows: Sequence[Any], page: Page, response: Response) -> list[Any]:
+    """Drop the look-ahead row and point X-Next-Cursor at the last row returned."""
+    rows = list(rows)
+    if page.limit is not None and len(rows) > page.limit:
+        rows = rows[: page.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return rows
@@ -0,0 +1,289 @@
+"""
+Lenient parsing for structured LLM output.
+
+Free models often return almost-valid JSON: wrapped in prose or code fences,
+cut off at the token limit, with trailing commas, or with keys spelled
+differently from the schema. ``repairing_structured_output`` parses the first
+response leniently and only when that fails sends a short corrective follow-up
+(the broken reply plus the validation error, not the original prompt).
+"""
+import json
+import logging
+import re
+from typing import Any
+
+import httpx
+import openai
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from pydantic import BaseModel, ValidationError
+
+from app.core.llm_tracing import llm_call_site, record_parse_failure, resolve_call_site
+from app.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PARSE_ERRORS = (
+    OutputParserException,
+    ValidationError,
+    json.JSONDecodeError,
+    openai.LengthFinishReasonError,
+    openai.ContentFilterFinishReasonError,
+)
+
+STRUCTURED_CALLS = REGISTRY.counter(
+    "llm_structured_output_calls_total", "Structured-output calls by schema and how they were parsed.",
+    ("schema", "result"),
+)
+
+# Field name -> other spellings models use for it (see normalize_roleplay_evaluation).
+# An alias may belong to one field only, or the match would depend on field order.
+FIELD_ALIASES: dict[str, tuple[str, ...]] = {
+    "original": ("originalSentence", "wrong", "incorrect", "yourVersion", "student", "studentVersion", "used", "youUsed"),
+    "corrected": ("correctedSentence", "right", "correction"),
+    "improved": ("native", "nativeVersion"),
+    "upgraded": ("alternative", "betterAlternative"),
+    "explanation": ("why", "reason"),
+    "meaning": ("translation", "definition"),
+    "term": ("word", "phrase"),
+    "example": ("exampleSentence", "sample"),
+}
+
+MAX_LIST_TRIMS = 3
+FOLLOWUP_PROMPT = (
+    "Your previous reply did not match the required JSON schema.\n"
+    "Error: {error}\n\n"
+    "Previous reply:\n{reply}\n\n"
+    "Return only the corrected JSON object, keeping its content."
+)
+
+
+def _normalize_key(key: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", key.lower())
+
+
+def message_text(message: Any) -> str:
+    """The JSON the model produced: content for json_schema calls, tool arguments for tool calls."""
+    if isinstance(message, BaseMessage):
+        if isinstance(message.content, str) and message.content.strip():
+            return message.content
+        for call in getattr(message, "invalid_tool_calls", None) or []:
+            if call.get("args"):
+                return call["args"]
+        for call in getattr(message, "tool_calls", None) or []:
+            return json.dumps(call.get("args") or {})
+        return ""
+    return str(message or "")
+
+
+def close_truncated_json(text: str) -> str:
+    """Close the strings, arrays and objects left open by a reply cut off mid-way."""
+    stack: list[str] = []
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+    if not stack and not in_string:
+        return text
+    if in_string:
+        text = (text[:-1] if escaped else text) + '"'
+    text = text.rstrip()
+    partial = re.search(r"[A-Za-z]+$", text)
+    if not in_string and partial and partial.group(0) not in ("true", "false", "null"):
+        text = text[: partial.start()].rstrip()
+    text = re.sub(r"(?<=\d)[.eE+-]+$", "", text)
+    if stack and stack[-1] == "}":
+        # A key whose value never arrived: {"a": 1, "b"  or  {"a": 1, "b":
+        text = re.sub(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$', r"\1", text)
+    text = text.rstrip().rstrip(",").rstrip()
+    return text + "".join(reversed(stack))
+
+
+def extract_json(text: str) -> Any:
+    """First JSON value in ``text``, tolerating fences, prose, trailing commas and truncation."""
+    text = re.sub(r"```(?:json)?", "", text or "")
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("no JSON object in the reply")
+    candidate = text[min(starts):]
+    candidate = re.sub(r",\s*([}\]])", r"\1", candidate)
+    decoder = json.JSONDecoder()
+    try:
+        return decoder.raw_decode(candidate)[0]
+    except json.JSONDecodeError:
+        return decoder.raw_decode(re.sub(r",\s*([}\]])", r"\1", close_truncated_json(candidate)))[0]
+
+
+def _match_keys(data: dict, schema: type[BaseModel]) -> dict:
+    """Map mis-spelled or aliased keys onto the schema's fields, recursively."""
+    fields = schema.model_fields
+    by_normalized = {_normalize_key(name): name for name in fields}
+    for name in fields:
+        for alias in FIELD_ALIASES.get(name, ()):
+            by_normalized.setdefault(_normalize_key(alias), name)
+    matched: dict = {}
+    for key, value in data.items():
+        name = key if key in fields else by_normalized.get(_normalize_key(str(key)))
+        if name is None or name in matched:
+            continue
+        matched[name] = _coerce(value, fields[name].annotation)
+    return matched
+
+
+def _model_in(annotation: Any) -> type[BaseModel] | None:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in getattr(annotation, "__args__", ()) or ():
+        model = _model_in(arg)
+        if model is not None:
+            return model
+    return None
+
+
+def _coerce(value: Any, annotation: Any) -> Any:
+    model = _model_in(annotation)
+    if model is None:
+        return value
+    if isinstance(value, dict):
+        return _match_keys(value, model)
+    if isinstance(value, list):
+        return [_match_keys(item, model) if isinstance(item, dict) else item for item in value]
+    return value
+
+
+def _unwrap(data: Any, schema: type[BaseModel]) -> Any:
+    """Fit a bare list, or an object wrapped in one extra key, to the schema's shape."""
+    fields = schema.model_fields
+    if isinstance(data, list) and len(fields) == 1:
+        return {next(iter(fields)): data}
+    if isinstance(data, dict) and len(data) == 1:
+        (key, inner), = data.items()
+        if _normalize_key(str(key)) not in {_normalize_key(f) for f in fields} and isinstance(inner, dict):
+            return inner
+    return data
+
+
+def _trim_invalid_item(data: Any, errors: list[dict]) -> bool:
+    """Drop the list item the first error points into (usually the cut-off last item of a list)."""
+    loc = errors[0]["loc"]
+    for depth in range(len(loc) - 1, -1, -1):
+        if isinstance(loc[depth], int):
+            parent = data
+            for part in loc[:depth]:
+                parent = parent[part]
+            if isinstance(parent, list) and len(parent) > 1:
+                del parent[loc[depth]]
+                return True
+            return False
+    return False
+
+
+def repair(text: str, schema: type[BaseModel]) -> BaseModel | None:
+    """Parse ``text`` into ``schema`` leniently; None if it cannot be repaired locally."""
+    try:
+        data = _unwrap(extract_json(text), schema)
+    except ValueError:
+        return None
+    if isinstance(data, dict):
+        data = _match_keys(data, schema)
+    for _ in range(MAX_LIST_TRIMS + 1):
+        try:
+            return schema.model_validate(data)
+        except ValidationError as e:
+            if not _trim_invalid_item(data, e.errors()):
+                return None
+    return None
+
+
+def _reply_text(error: BaseException) -> str:
+    """The reply behind a parse error raised inside the model call."""
+    if isinstance(error, openai.LengthFinishReasonError):
+        return error.completion.choices[0].message.content or ""
+    # langchain-openai attaches the raw HTTP response to errors raised while parsing it.
+    response = getattr(error, "response", None)
+    if isinstance(response, httpx.Response):
+        try:
+            return response.json()["choices"][0]["message"].get("content") or ""
+        except (ValueError, KeyError, IndexError, TypeError):
+            return ""
+    return ""
+
+
+def _failure_text(error: BaseException) -> str:
+    if isinstance(error, openai.LengthFinishReasonError):
+        return "the reply was cut off at the token limit"
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors()[:5])
+    return str(error).splitlines()[0][:300] if str(error) else type(error).__name__
+
+
+def repairing_structured_output(raw: Runnable, schema: type[BaseModel]) -> Runnable:
+    """
+    Wrap ``raw`` (a ``with_structured_output(schema, include_raw=True)`` runnable) so
+    the result is always a ``schema`` instance: parsed directly, repaired locally, or
+    fixed by one short follow-up call. Raises OutputParserException if all three fail.
+    """
+    name = schema.__name__
+
+    async def _ainvoke(input: Any, config: RunnableConfig) -> Any:
+        try:
+            output = await raw.ainvoke(input, config)
+            if output["parsing_error"] is None and output["parsed"] is not None:
+                STRUCTURED_CALLS.inc(schema=name, result="parsed")
+                return output["parsed"]
+            error = output["parsing_error"] or ValueError("empty reply")
+            text = message_text(output["raw"])
+        except PARSE_ERRORS as e:
+            # openai parses json_schema replies itself, so these are raised from the model call.
+            error, text = e, _reply_text(e)
+
+        metadata = config.get("metadata")
+        record_parse_failure(name, metadata, error)
+        repaired = repair(text, schema)
+        if repaired is not None:
+            STRUCTURED_CALLS.inc(schema=name, result="repaired")
+            return repaired
+
+        followup = [
+            {"role": "system", "content": "You fix JSON replies so they match the required schema."},
+            {"role": "user", "content": FOLLOWUP_PROMPT.format(error=_failure_text(error), reply=text)},
+        ]
+        try:
+            with llm_call_site(f"{resolve_call_site(metadata)}.repair"):
+                output = await raw.ainvoke(followup, config)
+            fixed = output["parsed"] if output["parsing_error"] is None else None
+            if fixed is None:
+                fixed = repair(message_text(output["raw"]), schema)
+        except PARSE_ERRORS:
+            fixed = None
+        if fixed is None:
+            STRUCTURED_CALLS.inc(schema=name, result="failed")
+            raise OutputParserException(f"Could not parse {name} from the model's reply: {_failure_text(error)}")
+        STRUCTURED_CALLS.inc(schema=name, result="followup")
+        logger.info(f"Structured output {name} fixed by a follow-up call")
+        return fixed
+
+    return RunnableLambda(_ainvoke, name=f"structured_output[{name}]")
+
+
+def instrument_structured_output(runnable: Runnable, schema: str) -> Runnable:
+    async def _ainvoke(input: Any, config: RunnableConfig) -> Any:
+        try:
+            return await runnable.ainvoke(input, config)
+        except PARSE_ERRORS as e:
+            record_parse_failure(schema, config.get("metadata"), e)
+            raise
+
+    return RunnableLambda(_ainvoke, name=f"structured_output[{schema}]")
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.orm import Session
+
+from app.api.v1.stats import refresh_leaderboard_cache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.llm import BACKGROUND, STANDARD
+from app.jobs import queue
+from app.jobs.queue import ClaimedJob
+from app.services.daily_bundle_service import generate_daily_bundle
+from app.services.lesson_service import evaluate_lesson_answers, generate_lesson_for_day
+from app.services.roleplay_service import evaluate_roleplay_session
+from app.services.situation_service import generate_daily_situation
+from app.services.subscription_service import apply_stripe_event
+from app.services.writing_service import evaluate_writing_submission
+
+LESSON = "lesson"
+DAILY_SITUATION = "daily_situation"
+LESSON_EVALUATION = "lesson_evaluation"
+ROLEPLAY_EVALUATION = "roleplay_evaluation"
+DAILY_BUNDLE = "daily_bundle"
+PREGENERATE = "pregenerate"
+LEADERBOARD_REFRESH = "leaderboard_refresh"
+WRITING_EVALUATION = "writing_evaluation"
+STRIPE_EVENT = "stripe_event"
+
+
+@dataclass
+class JobContext:
+    job: ClaimedJob
+    _emitting: asyncio.Task | None = field(default=None, init=False, repr=False)
+
+    @property
+    def payload(self) -> dict:
+        return self.job.payload
+
+    def progress(self, step: str, message: str) -> None:
+        """Record a progress event from a thread, in order, without waiting for it."""
+        previous = self._emitting
+
+        async def emit() -> None:
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            await asyncio.to_thread(queue.emit, self.job.id, "progress", {"step": step, "message": message})
+
+        self._emitting = asyncio.create_task(emit())
+
+    async def flush(self) -> None:
+        """Wait for the progress events recorded so far."""
+        if self._emitting is not None:
+            await asyncio.gather(self._emitting, return_exceptions=True)
+
+
+@dataclass
+class JobHandler:
+    run: Callable[[JobContext], Awaitable[Any]]
+    # LLM scheduler class the job's calls run at
+    priority: str
+
+
+HANDLERS: dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str, priority: str = STANDARD):
+    def register(func: Callable[[JobContext], Awaitable[Any]]):
+        HANDLERS[kind] = JobHandler(run=func, priority=priority)
+        return func
+    return register
+
+
+@job_handler(LESSON)
+async def run_lesson(ctx: JobContext) -> dict:
+    return await generate_lesson_for_day(
+        ctx.payload["user_id"], date.fromisoformat(ctx.payload["date"]), ctx.progress
+    )
+
+
+@job_handler(DAILY_SITUATION)
+async def run_daily_situation(ctx: JobContext) -> dict:
+    return await generate_daily_situation(ctx.payload["user_id"], date.fromisoformat(ctx.payload["date"]))
+
+
+def schedule_leaderboard_refresh(db: Session) -> None:
+    """
+    Rebuild the leaderboard once at the end of the current window, however many
+    users earned points in it, instead of inline after every result.
+    """
+    window = settings.LEADERBOARD_REFRESH_WINDOW_S
+    slot = int(time.time() // window)
+    queue.enqueue(
+        db,
+        LEADERBOARD_REFRESH,
+        {},
+        idempotency_key=f"leaderboard_refresh:{slot}",
+        run_after=datetime.fromtimestamp((slot + 1) * window, timezone.utc),
+    )
+
+
+def _schedule_leaderboard_refresh() -> None:
+    db = SessionLocal()
+    try:
+        schedule_leaderboard_refresh(db)
+    finally:
+        db.close()
+
+
+@job_handler(LESSON_EVALUATION, priority=BACKGROUND)
+async def run_lesson_evaluation(ctx: JobContext) -> dict:
+    result = await evaluate_lesson_answers(ctx.payload["lesson_id"], ctx.progress)
+    await asyncio.to_thread(_schedule_leaderboard_refresh)
+    return result
+
+
+@job_handler(ROLEPLAY_EVALUATION, priority=BACKGROUND)
+async def run_roleplay_evaluation(ctx: JobContext) -> dict:
+    result = await evaluate_roleplay_session(ctx.payload["goal_id"], ctx.payload["lesson_id"], ctx.progress)
+    await asyncio.to_thread(_schedule_leaderboard_refresh)
+    return result
+
+
+@job_handler(WRITING_EVALUATION)
+async def run_writing_evaluation(ctx: JobContext) -> dict:
+    return await evaluate_writing_submission(ctx.payload["writing_id"], ctx.payload["user_input"])
+
+
+@job_handler(STRIPE_EVENT)
+async def run_stripe_event(ctx: JobContext) -> dict:
+    return await apply_stripe_event(ctx.payload["event_id"])
+
+
+@job_handler(LEADERBOARD_REFRESH, priority=BACKGROUND)
+async def run_leaderboard_refresh(ctx: JobContext) -> dict:
+    def refresh() -> None:
+        db = SessionLocal()
+        try:
+            refresh_leaderboard_cache(db)
+        finally:
+            db.close()
+
+    # A full rebuild of the cache table; keep it off the event loop.
+    await asyncio.to_thread(refresh)
+    return {}
+
+
+@job_handler(DAILY_BUNDLE)
+async def run_daily_bundle(ctx: JobContext) -> dict:
+    return await generate_daily_bundle(
+        ctx.payload["user_id"], date.fromisoformat(ctx.payload["date"]), ctx.progress
+    )
+
+
+@job_handler(PREGENERATE, priority=BACKGROUND)
+async def run_pregenerate(ctx: JobContext) -> dict:
+    """The daily bundle generated ahead of time; a retried job reuses the parts already stored."""
+    return await generate_daily_bundle(
+        ctx.payload["user_id"], date.fromisoformat(ctx.payload["date"]), ctx.progress
+    )
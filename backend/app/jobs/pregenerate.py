@@ -0,0 +1,149 @@
+"""
+Off-peak pre-generation of a day's situation, lesson, roleplay goal and writing
+goal for active premium users, so their morning requests are plain DB reads.
+Run it from cron the evening before, e.g.:
+
+    python -m app.jobs.pregenerate --date tomorrow
+
+Every user gets one ``pregenerate`` job keyed by user and date. Running the command
+again for the same date (after a crash or to pick up failures) enqueues nothing new
+for finished users; failed jobs are retried and lost ones are requeued by the lease.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func, or_
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.jobs import queue
+from app.jobs.handlers import PREGENERATE
+from app.jobs.worker import Worker
+from app.models.activity_log_model import ActivityLog
+from app.models.daily_situation_model import DailySituation
+from app.models.job_model import Job
+from app.models.user_model import User
+from app.models.user_profile_model import UserProfile
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL_S = 10.0
+
+
+def batch_key_prefix(day: date) -> str:
+    return f"pregenerate:{day.isoformat()}:"
+
+
+def active_user_ids(db, active_days: int) -> list[int]:
+    """Premium users with a profile who used the app within the last ``active_days`` days."""
+    since = datetime.now(timezone.utc) - timedelta(days=active_days)
+    recent_situation = db.query(DailySituation.id).filter(
+        DailySituation.user_id == User.id, DailySituation.created_at >= since
+    ).exists()
+    recent_activity = db.query(ActivityLog.id).filter(
+        ActivityLog.user_id == User.id, ActivityLog.created_at >= since
+    ).exists()
+    rows = (
+        db.query(User.id)
+        .join(UserProfile, UserProfile.user_id == User.id)
+        .filter(
+            User.subscription_plan == "premium",
+            User.subscription_status.in_(["active", "trialing"]),
+            or_(recent_situation, recent_activity),
+        )
+        .order_by(User.id)
+        .all()
+    )
+    return [user_id for (user_id,) in rows]
+
+
+def enqueue_batch(day: date, active_days: int) -> int:
+    db = SessionLocal()
+    try:
+        user_ids = active_user_ids(db, active_days)
+        for user_id in user_ids:
+            queue.enqueue(
+                db,
+                PREGENERATE,
+                {"user_id": user_id, "date": day.isoformat()},
+                user_id=user_id,
+                idempotency_key=f"{batch_key_prefix(day)}{user_id}",
+            )
+        return len(user_ids)
+    finally:
+        db.close()
+
+
+def batch_status(day: date) -> dict[str, int]:
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Job.status, func.count(Job.id))
+            .filter(Job.kind == PREGENERATE, Job.idempotency_key.startswith(batch_key_prefix(day)))
+            .group_by(Job.status)
+            .all()
+        )
+        return {status: count for status, count in rows}
+    finally:
+        db.close()
+
+
+def format_status(day: date, counts: dict[str, int]) -> str:
+    total = sum(counts.values())
+    return (
+        f"pregenerate {day.isoformat()}: {counts.get(queue.SUCCEEDED, 0)}/{total} done, "
+        f"{counts.get(queue.RUNNING, 0)} running, {counts.get(queue.QUEUED, 0)} queued, "
+        f"{counts.get(queue.FAILED, 0)} failed"
+    )
+
+
+async def run_batch(day: date, active_days: int, concurrency: int, wait: bool) -> dict[str, int]:
+    users = await asyncio.to_thread(enqueue_batch, day, active_days)
+    logger.info(f"Pre-generating {day.isoformat()} for {users} active users")
+    if not wait:
+        return await asyncio.to_thread(batch_status, day)
+
+    worker = Worker(concurrency, kinds=[PREGENERATE]) if concurrency > 0 else None
+    worker_task = asyncio.create_task(worker.run()) if worker else None
+    try:
+        while True:
+            counts = await asyncio.to_thread(batch_status, day)
+            logger.info(format_status(day, counts))
+            if counts.get(queue.QUEUED, 0) + counts.get(queue.RUNNING, 0) == 0:
+                return counts
+            await asyncio.sleep(PROGRESS_INTERVAL_S)
+    finally:
+        if worker_task is not None:
+            worker.stop()
+            await worker_task
+
+
+def parse_day(value: str) -> date:
+    today = datetime.now(timezone.utc).date()
+    if value == "today":
+        return today
+    if value == "tomorrow":
+        return today + timedelta(days=1)
+    return date.fromisoformat(value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-generate a day's content for active users")
+    parser.add_argument("--date", type=parse_day, default="tomorrow", help="today, tomorrow or YYYY-MM-DD")
+    parser.add_argument("--active-days", type=int, default=settings.PREGENERATE_ACTIVE_DAYS)
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.PREGENERATE_CONCURRENCY,
+        help="jobs run by this process (0 = leave them to the running workers)",
+    )
+    parser.add_argument("--no-wait", action="store_true", help="enqueue and exit without waiting")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    counts = asyncio.run(run_batch(args.date, args.active_days, args.concurrency, not args.no_wait))
+    print(format_status(args.date, counts))
+
+
+if __name__ == "__main__":
+    main()
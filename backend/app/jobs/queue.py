@@ -0,0 +1,374 @@
+"""
+Postgres-backed job queue.
+
+Jobs are rows in ``jobs``; workers claim them with ``FOR UPDATE SKIP LOCKED`` and
+keep a heartbeat while they run, so a job whose worker died is requeued once its
+lease expires. Progress is appended to ``job_events``; the event id doubles as the
+SSE event id, which lets clients resume a stream with ``Last-Event-ID``.
+"""
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import REGISTRY
+from app.models.job_model import Job, JobEvent
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+JOBS_ENQUEUED = REGISTRY.counter("jobs_enqueued_total", "Jobs created (idempotent repeats excluded).", ("kind",))
+JOBS_FINISHED = REGISTRY.counter("jobs_finished_total", "Job attempts by outcome.", ("kind", "outcome"))
+
+
+class JobError(Exception):
+    """A failure with the HTTP status a request waiting on the job should answer with."""
+
+    def __init__(self, message: str, status_code: int | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class PermanentJobError(JobError):
+    """Raised by handlers for failures a retry cannot fix (missing rows, invalid input)."""
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    kind: str
+    user_id: int | None
+    payload: dict
+    attempts: int
+    max_attempts: int
+
+
+@dataclass
+class JobSnapshot:
+    id: int
+    kind: str
+    status: str
+    result: Any
+    error: str | None
+    error_status: int | None
+    attempts: int
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _snapshot(job: Job) -> JobSnapshot:
+    return JobSnapshot(
+        id=job.id, kind=job.kind, status=job.status, result=job.result, error=job.error,
+        error_status=job.error_status, attempts=job.attempts,
+    )
+
+
+def _add_event(db: Session, job_id: int, type: str, data: dict | None = None) -> None:
+    db.add(JobEvent(job_id=job_id, type=type, data=data or {}))
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict,
+    user_id: int | None = None,
+    idempotency_key: str | None = None,
+    max_attempts: int | None = None,
+    run_after: datetime | None = None,
+) -> JobSnapshot:
+    """
+    Create a job, or return the existing one with the same idempotency key.
+    A failed job with that key is reset and queued again. ``run_after`` delays
+    the first attempt.
+    """
+    if idempotency_key:
+        existing = db.query(Job).filter(Job.idempotency_key == idempotency_key).first()
+        if existing is not None:
+            if existing.status == FAILED:
+                existing.status = QUEUED
+                existing.attempts = 0
+                existing.error = None
+                existing.error_status = None
+                existing.run_after = _now()
+                existing.finished_at = None
+                _add_event(db, existing.id, "progress", {"step": "queued", "message": "Retrying..."})
+                db.commit()
+            return _snapshot(existing)
+
+    job = Job(
+        kind=kind,
+        user_id=user_id,
+        idempotency_key=idempotency_key,
+        payload=payload,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        status=QUEUED,
+        run_after=run_after or _now(),
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost the race against a concurrent enqueue with the same key.
+        db.rollback()
+        return _snapshot(db.query(Job).filter(Job.idempotency_key == idempotency_key).one())
+    JOBS_ENQUEUED.inc(kind=kind)
+    return _snapshot(job)
+
+
+def get_job(job_id: int, db: Session | None = None) -> JobSnapshot | None:
+    if db is not None:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        return _snapshot(job) if job else None
+    db = SessionLocal()
+    try:
+        return get_job(job_id, db)
+    finally:
+        db.close()
+
+
+def claim_job(worker_id: str, kinds: list[str] | None = None) -> ClaimedJob | None:
+    db = SessionLocal()
+    try:
+        query = db.query(Job).filter(Job.status == QUEUED, Job.run_after <= _now())
+        if kinds:
+            query = query.filter(Job.kind.in_(kinds))
+        job = query.order_by(Job.run_after, Job.id).with_for_update(skip_locked=True).first()
+        if job is None:
+            db.rollback()
+            return None
+        job.status = RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.heartbeat_at = _now()
+        claimed = ClaimedJob(
+            id=job.id,
+            kind=job.kind,
+            user_id=job.user_id,
+            payload=dict(job.payload or {}),
+            attempts=job.attempts,
+            max_attempts=job.max_attempts,
+        )
+        db.commit()
+        return claimed
+    finally:
+        db.close()
+
+
+def heartbeat(job_id: int, worker_id: str) -> None:
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id, Job.locked_by == worker_id).update(
+            {Job.heartbeat_at: _now()}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def emit(job_id: int, type: str, data: dict | None = None) -> None:
+    db = SessionLocal()
+    try:
+        _add_event(db, job_id, type, data)
+        db.commit()
+    finally:
+        db.close()
+
+
+def complete_job(job: ClaimedJob, result: Any) -> None:
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job.id).update(
+            {
+                Job.status: SUCCEEDED,
+                Job.result: result,
+                Job.error: None,
+                Job.error_status: None,
+                Job.locked_by: None,
+                Job.finished_at: _now(),
+            },
+            synchronize_session=False,
+        )
+        _add_event(db, job.id, "complete", {"data": result})
+        db.commit()
+    finally:
+        db.close()
+    JOBS_FINISHED.inc(kind=job.kind, outcome=SUCCEEDED)
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(settings.JOBS_RETRY_BASE_S * 2 ** (attempts - 1), settings.JOBS_RETRY_MAX_S)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def fail_job(job: ClaimedJob, error: BaseException) -> None:
+    """Schedule a retry with exponential backoff, or fail the job for good."""
+    message = str(error) or type(error).__name__
+    permanent = isinstance(error, PermanentJobError) or job.attempts >= job.max_attempts
+    db = SessionLocal()
+    try:
+        values: dict = {Job.error: message, Job.locked_by: None}
+        if permanent:
+            values.update({
+                Job.status: FAILED,
+                Job.finished_at: _now(),
+                Job.error_status: error.status_code if isinstance(error, JobError) else None,
+            })
+            _add_event(db, job.id, "error", {"message": message})
+        else:
+            delay = retry_delay(job.attempts)
+            values.update({Job.status: QUEUED, Job.run_after: _now() + timedelta(seconds=delay)})
+            _add_event(db, job.id, "progress", {
+                "step": "retrying",
+                "message": f"Attempt {job.attempts} failed, retrying in {delay:.0f}s",
+            })
+        db.query(Job).filter(Job.id == job.id).update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    JOBS_FINISHED.inc(kind=job.kind, outcome=FAILED if permanent else "retry")
+    logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed: {message}")
+
+
+def release_job(job: ClaimedJob) -> None:
+    """Put a job back without spending an attempt (worker shutting down)."""
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job.id, Job.status == RUNNING).update(
+            {Job.status: QUEUED, Job.attempts: Job.attempts - 1, Job.locked_by: None, Job.run_after: _now()},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def requeue_stale_jobs() -> int:
+    """Requeue running jobs whose worker stopped heartbeating (crashed or killed)."""
+    cutoff = _now() - timedelta(seconds=settings.JOBS_LEASE_S)
+    db = SessionLocal()
+    try:
+        stale = (
+            db.query(Job)
+            .filter(Job.status == RUNNING, Job.heartbeat_at < cutoff)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for job in stale:
+            job.locked_by = None
+            if job.attempts >= job.max_attempts:
+                job.status = FAILED
+                job.error = "Worker lost"
+                job.finished_at = _now()
+                _add_event(db, job.id, "error", {"message": "Worker lost"})
+            else:
+                job.status = QUEUED
+                job.run_after = _now()
+                _add_event(db, job.id, "progress", {"step": "retrying", "message": "Worker lost, retrying"})
+        db.commit()
+        if stale:
+            logger.warning(f"Requeued {len(stale)} stale jobs")
+        return len(stale)
+    finally:
+        db.close()
+
+
+def prune_jobs() -> int:
+    """
+    Delete jobs that finished more than JOBS_RETENTION_S ago; their events go
+    with them (ON DELETE CASCADE). Runs in batches so each transaction is short.
+    """
+    cutoff = _now() - timedelta(seconds=settings.JOBS_RETENTION_S)
+    pruned = 0
+    while True:
+        db = SessionLocal()
+        try:
+            batch = (
+                select(Job.id)
+                .where(Job.finished_at < cutoff, Job.status.in_(FINISHED))
+                .limit(settings.JOBS_RETENTION_BATCH)
+            )
+            deleted = db.query(Job).filter(Job.id.in_(batch)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        pruned += deleted
+        if deleted < settings.JOBS_RETENTION_BATCH:
+            break
+    if pruned:
+        logger.info(f"Pruned {pruned} finished jobs")
+    return pruned
+
+
+def backlog(kinds: list[str]) -> int:
+    """Jobs of ``kinds`` that are running or due to run, across all workers."""
+    db = SessionLocal()
+    try:
+        return db.query(func.count(Job.id)).filter(
+            Job.kind.in_(kinds),
+            or_(Job.status == RUNNING, and_(Job.status == QUEUED, Job.run_after <= _now())),
+        ).scalar()
+    finally:
+        db.close()
+
+
+def _read_events(job_id: int, after_id: int) -> tuple[str | None, list[tuple[int, str, dict]]]:
+    db = SessionLocal()
+    try:
+        # Status first: once it reads finished, every event of the job is already committed.
+        status = db.query(Job.status).filter(Job.id == job_id).scalar()
+        events = [
+            (e.id, e.type, e.data or {})
+            for e in db.query(JobEvent)
+            .filter(JobEvent.job_id == job_id, JobEvent.id > after_id)
+            .order_by(JobEvent.id)
+            .all()
+        ]
+        return status, events
+    finally:
+        db.close()
+
+
+async def tail_events(job_id: int, after_id: int = 0) -> AsyncIterator[tuple[int, str, dict]]:
+    """
+    Yield (event_id, type, data) for events after ``after_id`` until the job has
+    finished. Each poll uses its own short session, in a thread so open streams
+    never block the event loop.
+    """
+    while True:
+        status, events = await asyncio.to_thread(_read_events, job_id, after_id)
+        for event in events:
+            after_id = event[0]
+            yield event
+        if status is None or status in FINISHED:
+            return
+        await asyncio.sleep(settings.JOBS_POLL_INTERVAL_S)
+
+
+async def wait_for_job(job_id: int, timeout: float) -> JobSnapshot | None:
+    """Poll until the job finishes; returns its last snapshot (unfinished on timeout)."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        snapshot = await asyncio.to_thread(get_job, job_id)
+        if snapshot is None or snapshot.finished or loop.time() >= deadline:
+            return snapshot
+        await asyncio.sleep(settings.JOBS_POLL_INTERVAL_S)
@@ -0,0 +1,194 @@
+"""
+Job worker. Runs inside the API process when JOBS_RUN_IN_API is set (on a
+thread and event loop of its own, see WorkerThread), or as a separate process
+so generation scales independently of the web workers. The email outbox sender
+runs alongside it:
+
+    python -m app.jobs.worker --concurrency 16
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.email import EmailSender
+from app.core.lazy import lazy_module, warm_up
+from app.core.llm import llm_priority
+from app.core.metrics import REGISTRY
+from app.jobs import queue
+from app.jobs.handlers import HANDLERS, JobContext
+from app.jobs.queue import ClaimedJob, JobError, PermanentJobError
+
+logger = logging.getLogger(__name__)
+
+checkpoints = lazy_module("app.workflows.checkpoints")
+
+PRUNE_INTERVAL_S = 3600.0
+
+JOBS_RUNNING = REGISTRY.gauge("jobs_running", "Jobs currently executing in this process.", ("kind",))
+JOB_DURATION = REGISTRY.histogram("job_duration_seconds", "Job attempt duration.", ("kind",))
+
+
+class Worker:
+    def __init__(self, concurrency: int, kinds: list[str] | None = None) -> None:
+        self.concurrency = concurrency
+        self.kinds = kinds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        logger.info(f"Job worker {self.worker_id} started (concurrency {self.concurrency})")
+        last_requeue = 0.0
+        last_prune = 0.0
+        while not self._stopping.is_set():
+            try:
+                if time.monotonic() - last_requeue > settings.JOBS_LEASE_S / 2:
+                    await asyncio.to_thread(queue.requeue_stale_jobs)
+                    last_requeue = time.monotonic()
+                if time.monotonic() - last_prune > PRUNE_INTERVAL_S:
+                    await asyncio.to_thread(checkpoints.prune_checkpoints)
+                    await asyncio.to_thread(queue.prune_jobs)
+                    last_prune = time.monotonic()
+                while len(self._tasks) < self.concurrency:
+                    job = await asyncio.to_thread(queue.claim_job, self.worker_id, self.kinds)
+                    if job is None:
+                        break
+                    task = asyncio.create_task(self._execute(job))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            except Exception as e:
+                logger.error(f"Job worker poll failed: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.JOBS_POLL_INTERVAL_S)
+            except asyncio.TimeoutError:
+                pass
+        await self._drain()
+
+    async def _drain(self) -> None:
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=settings.JOBS_SHUTDOWN_GRACE_S)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+    async def _heartbeat(self, job: ClaimedJob) -> None:
+        while True:
+            await asyncio.sleep(settings.JOBS_LEASE_S / 3)
+            await asyncio.to_thread(queue.heartbeat, job.id, self.worker_id)
+
+    async def _execute(self, job: ClaimedJob) -> None:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            await asyncio.to_thread(queue.fail_job, job, PermanentJobError(f"No handler for job kind {job.kind!r}"))
+            return
+
+        context = JobContext(job)
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        JOBS_RUNNING.inc(kind=job.kind)
+        started = time.perf_counter()
+        error: BaseException | None = None
+        try:
+            with llm_priority(handler.priority):
+                result = await handler.run(context)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(queue.release_job, job)
+            raise
+        except HTTPException as e:
+            # Keep the status (404, 400, ...) for the request waiting on the job; 5xx are retried.
+            error = (PermanentJobError if e.status_code < 500 else JobError)(str(e.detail), e.status_code)
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}", exc_info=True)
+            error = e
+        finally:
+            heartbeat.cancel()
+            JOBS_RUNNING.dec(kind=job.kind)
+            JOB_DURATION.observe(time.perf_counter() - started, kind=job.kind)
+        # The job's progress events go before its final one.
+        await context.flush()
+        if error is None:
+            await asyncio.to_thread(queue.complete_job, job, result)
+        else:
+            await asyncio.to_thread(queue.fail_job, job, error)
+
+
+class WorkerThread(threading.Thread):
+    """
+    The job worker and email sender inside the API process. They run on an event
+    loop of their own so job handlers, and the blocking work they still do,
+    never hold up request handling on the API's loop.
+    """
+
+    def __init__(self, concurrency: int) -> None:
+        super().__init__(name="job-worker", daemon=True)
+        self.concurrency = concurrency
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._started = threading.Event()
+
+    def run(self) -> None:
+        try:
+            asyncio.run(self._run())
+        except Exception as e:
+            logger.error(f"Job worker thread stopped: {e}", exc_info=True)
+        finally:
+            self._started.set()
+
+    async def _run(self) -> None:
+        self.worker = Worker(self.concurrency)
+        self.sender = EmailSender()
+        self._loop = asyncio.get_running_loop()
+        self._started.set()
+        await asyncio.gather(self.worker.run(), self.sender.run())
+
+    def stop(self) -> None:
+        self._started.wait()
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.worker.stop)
+            self._loop.call_soon_threadsafe(self.sender.stop)
+
+    def shutdown(self) -> None:
+        """Stop and wait for running jobs to finish (up to JOBS_SHUTDOWN_GRACE_S)."""
+        if self.is_alive():
+            self.stop()
+            self.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Jonas job worker")
+    parser.add_argument("--concurrency", type=int, default=settings.JOBS_WORKER_CONCURRENCY)
+    parser.add_argument("--kinds", nargs="*", help="only run these job kinds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    worker = Worker(args.concurrency, args.kinds)
+    sender = EmailSender()
+
+    async def run() -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+            loop.add_signal_handler(sig, sender.stop)
+        tasks = [worker.run(), sender.run()]
+        if settings.WARM_UP_ON_STARTUP:
+            # Load the graphs in the background rather than in the first jobs that need them.
+            tasks.append(asyncio.to_thread(warm_up))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,10 @@ from app.models.goal_model import Roleplay
 from app.models.roleplay_message_model import RoleplayMessage
 from app.models.writng_model import Writing
 from app.models.teacher_model import TeacherConversation, TeacherMessage
+from app.models.job_model import Job, JobEvent
+from app.models.graph_checkpoint_model import GraphCheckpoint, GraphCheckpointWrite
+from app.models.stripe_event_model import StripeEvent
+from app.models.email_outbox_model import EmailOutbox
 
 
 __all__ = [
@@ -24,5 +28,11 @@ __all__ = [
     "Writing",
     "TeacherConversation",
     "TeacherMessage",
+    "Job",
+    "JobEvent",
+    "GraphCheckpoint",
+    "GraphCheckpointWrite",
+    "StripeEvent",
+    "EmailOutbox",
 ]
 
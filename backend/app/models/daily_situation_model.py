@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -12,4 +12,8 @@ class DailySituation(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    user = relationship ("User",back_populates="daily_situation")
\ No newline at end of file
+    user = relationship ("User",back_populates="daily_situation")
+
+    __table_args__ = (
+        Index("ix_daily_situation_user_created", "user_id", "created_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -23,3 +23,10 @@ class Roleplay(Base):
 
     user = relationship ("User",back_populates="roleplay")
     messages = relationship("RoleplayMessage", back_populates="roleplay")
+
+    __table_args__ = (
+        Index(
+            "ix_roleplay_user_created_id", "user_id", "created_at", "id",
+            postgresql_include=["score", "completed"],
+        ),
+    )
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, Index, PrimaryKeyConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class GraphCheckpoint(Base):
+    __tablename__ = "graph_checkpoints"
+
+    thread_id = Column(String, nullable=False)
+    checkpoint_ns = Column(String, nullable=False, default="")
+    checkpoint_id = Column(String, nullable=False)
+    parent_checkpoint_id = Column(String, nullable=True)
+    type = Column(String, nullable=False)
+    checkpoint = Column(LargeBinary, nullable=False)
+    metadata_type = Column(String, nullable=False)
+    checkpoint_metadata = Column("metadata", LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        PrimaryKeyConstraint("thread_id", "checkpoint_ns", "checkpoint_id"),
+        Index("ix_graph_checkpoints_created_at", "created_at"),
+    )
+
+
+class GraphCheckpointWrite(Base):
+    __tablename__ = "graph_checkpoint_writes"
+
+    thread_id = Column(String, nullable=False)
+    checkpoint_ns = Column(String, nullable=False, default="")
+    checkpoint_id = Column(String, nullable=False)
+    task_id = Column(String, nullable=False)
+    idx = Column(Integer, nullable=False)
+    channel = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    value = Column(LargeBinary, nullable=False)
+    task_path = Column(String, nullable=False, default="")
+
+    __table_args__ = (
+        PrimaryKeyConstraint("thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx"),
+    )
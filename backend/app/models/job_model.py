@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    idempotency_key = Column(String, nullable=True, unique=True)
+    status = Column(String, nullable=False, default="queued")
+    payload = Column(JSONB, nullable=False, default={})
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    # HTTP status a request waiting on the failed job answers with (None: 500)
+    error_status = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_by = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    events = relationship("JobEvent", back_populates="job")
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+        Index("ix_jobs_finished_at", "finished_at", postgresql_where=finished_at.isnot(None)),
+    )
+
+
+class JobEvent(Base):
+    __tablename__ = "job_events"
+
+    id = Column(BigInteger, primary_key=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False)
+    type = Column(String, nullable=False)
+    data = Column(JSONB, nullable=False, default={})
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    job = relationship("Job", back_populates="events")
+
+    __table_args__ = (
+        Index("ix_job_events_job_id_id", "job_id", "id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -24,3 +24,10 @@ class Lesson(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     user = relationship("User", back_populates="lesson")
+
+    __table_args__ = (
+        Index(
+            "ix_lesson_user_created_id", "user_id", "created_at", "id",
+            postgresql_include=["title", "score", "completed"],
+        ),
+    )
@@ -18,5 +18,5 @@ class RoleplayMessage(Base):
     user = relationship("User", back_populates="roleplay_messages")
 
     __table_args__ = (
-        Index("ix_roleplay_messages_roleplay_created", "roleplay_id", "created_at"),
+        Index("ix_roleplay_messages_roleplay_created_id", "roleplay_id", "created_at", "id"),
     )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class StripeEvent(Base):
+    __tablename__ = "stripe_events"
+
+    # Stripe's event id (evt_...): redeliveries of one event share it
+    id = Column(String, primary_key=True)
+    type = Column(String, nullable=False)
+    created = Column(DateTime(timezone=True), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    deliveries = Column(Integer, nullable=False, default=1)
+    # applied | stale | ignored, once processed
+    outcome = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
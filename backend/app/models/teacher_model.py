@@ -14,6 +14,10 @@ class TeacherConversation(Base):
     user = relationship("User", back_populates="teacher_conversations")
     messages = relationship("TeacherMessage", back_populates="conversation")
 
+    __table_args__ = (
+        Index("ix_teacher_conversations_user_created_id", "user_id", "created_at", "id"),
+    )
+
 
 class TeacherMessage(Base):
     __tablename__ = "teacher_messages"
@@ -29,6 +33,6 @@ class TeacherMessage(Base):
     user = relationship("User", back_populates="teacher_messages")
 
     __table_args__ = (
-        Index("ix_teacher_messages_conversation_created", "conversation_id", "created_at"),
+        Index("ix_teacher_messages_conversation_created_id", "conversation_id", "created_at", "id"),
     )
 
@@ -20,6 +20,8 @@ class User(Base):
     subscription_status = Column(String, nullable=False, default="free")
     subscription_plan = Column(String, nullable=False, default="free")
     subscription_current_period_end = Column(DateTime(timezone=True), nullable=True)
+    # ``created`` of the newest Stripe event applied to the user; older ones arriving late are skipped
+    stripe_event_at = Column(DateTime(timezone=True), nullable=True)
 
     profile = relationship("UserProfile",back_populates="user",uselist=False)
     daily_situation = relationship("DailySituation",back_populates="user")
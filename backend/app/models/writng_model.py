@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from app.core.database import Base
 
 class Writing(Base):
@@ -10,7 +11,24 @@ class Writing(Base):
     user_id = Column(Integer,ForeignKey("users.id"),nullable=False)
     goal = Column(String,nullable=False)
     user_input = Column(String,nullable=True)
+    # Evaluation of user_input; input_hash identifies the text it was made for.
+    evaluation = Column(JSONB, nullable=True)
+    input_hash = Column(String(64), nullable=True)
+    # Whether user_input has text; kept in step by set_user_input so the history list is served from its index.
+    completed = Column(Boolean, nullable=True, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    user = relationship ("User",back_populates="writing")
\ No newline at end of file
+    user = relationship ("User",back_populates="writing")
+
+    @validates("user_input")
+    def set_user_input(self, key, value):
+        self.completed = bool(value and value.strip())
+        return value
+
+    __table_args__ = (
+        Index(
+            "ix_writing_model_user_created_id", "user_id", "created_at", "id",
+            postgresql_include=["goal", "completed"],
+        ),
+    )
@@ -0,0 +1,129 @@
+"""
+Preforking web server. The master imports the app and runs ``warm_up`` once,
+then forks the uvicorn workers, which start with langchain, langgraph and the
+compiled graphs already loaded and share those pages copy-on-write instead of
+each importing them again (``uvicorn --workers`` spawns fresh interpreters).
+Workers that exit are replaced; SIGTERM/SIGINT stop them all.
+
+    python -m app.prefork --workers 4 --port 8000
+"""
+import argparse
+import gc
+import importlib
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.lazy import warm_up
+
+logger = logging.getLogger(__name__)
+
+RESTART_DELAY_S = 1.0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Jonas API with preloaded, forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--app", default="main:app", help="module:attribute of the ASGI app")
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+
+def load_app(target: str):
+    module, _, attribute = target.partition(":")
+    return getattr(importlib.import_module(module), attribute or "app")
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(app, sock: socket.socket, log_level: str) -> None:
+    """Worker body, run in the forked child."""
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+    # Pooled connections opened in the master (none normally) must not be shared.
+    engine.dispose(close=False)
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    started = time.perf_counter()
+    app = load_app(args.app)
+    if settings.WARM_UP_ON_STARTUP:
+        warm_up()
+    logger.info(f"Preloaded {args.app} in {time.perf_counter() - started:.2f}s")
+    # Objects created so far live for the whole process; keep the collector from
+    # touching (and so un-sharing) their pages in the workers.
+    gc.collect()
+    gc.freeze()
+
+    sock = bind(args.host, args.port)
+    workers: dict[int, int] = {}
+    stopping = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                serve(app, sock, args.log_level)
+            except BaseException:
+                logger.exception(f"Worker {os.getpid()} crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        workers[pid] = slot
+        logger.info(f"Started worker {pid}")
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for slot in range(args.workers):
+        spawn(slot)
+    logger.info(f"Serving on {args.host}:{args.port} with {args.workers} workers")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        slot = workers.pop(pid, None)
+        if slot is None or stopping:
+            continue
+        logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, starting another")
+        time.sleep(RESTART_DELAY_S)
+        if not stopping:
+            spawn(slot)
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
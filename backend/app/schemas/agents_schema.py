@@ -2,7 +2,7 @@ from pydantic import BaseModel
 from typing_extensions import TypedDict
 from typing import List,Literal,Optional
 from app.schemas.user_schema import UserProfileRequest
-from sqlalchemy.orm import Session
+from app.schemas.roleplay_schema import Goal as RoleplayGoal
 
 class LessonOutput(BaseModel):
     user_id : int | None 
@@ -14,6 +14,9 @@ class Question(BaseModel):
     type : Literal ["mcq","short"]
     options : List[str] | None
     question : str
+    # MCQ answer key, used to score MCQ answers locally; not sent to the client.
+    correct_option_index : Optional[int] = None
+    explanation : Optional[str] = None
 
 
 
@@ -48,15 +51,28 @@ class AgentOutput(BaseModel):
     
 
 class State(TypedDict):
-    db : Session
+    user_id : int
     lesson : LessonOutput
     questions : List[Question]
     user_profile : UserProfileRequest
     daily_situation : str 
-    current_user : str | None 
     vocabs : List[VocabItem]
     grammar : List[GrammarItem]
 
+class DailyBundleState(TypedDict, total=False):
+    user_id : int
+    user_name : str
+    user_profile : UserProfileRequest
+    recent_situations : List[str]
+    daily_situation : str
+    lesson : LessonOutput
+    vocabs : List[VocabItem]
+    grammar : List[GrammarItem]
+    questions : List[Question]
+    roleplay_goal : RoleplayGoal
+    roleplay_vocab : List[dict]
+    writing_goal : str
+
 class SitationOutput(BaseModel):
     situation : str
 
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    error_status: Optional[int] = None
@@ -1,8 +1,7 @@
 # schemas/roleplay_schema.py
-from typing import Literal, List, Annotated, Optional
+from typing import Literal, List, Optional
 from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
-from langgraph.graph.message import add_messages
 
 Role = Literal["system", "user", "assistant"]
 
@@ -10,9 +9,6 @@ class ChatMessage(BaseModel):
     role: Role
     content: str
     
-class state(TypedDict):
-    messages : Annotated[list,add_messages]
-
 class EvalState(TypedDict):
     lesson_goal: str
     chat_history: List[str]
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+
+from app.schemas.stats_schema import ActivityCompletionResponse, UserStatsResponse
+
+
+class TodayLesson(BaseModel):
+    id: int
+    title: str
+    completed: bool
+    score: int | None = None
+
+
+class TodayRoleplay(BaseModel):
+    goal: str
+    user_role: str
+    ai_role: str
+    completed: bool
+    score: int | None = None
+
+
+class TodayWriting(BaseModel):
+    goal: str
+    submitted: bool
+
+
+class TodayResponse(BaseModel):
+    date: str
+    situation: str | None = None
+    lesson: TodayLesson | None = None
+    roleplay: TodayRoleplay | None = None
+    writing: TodayWriting | None = None
+    stats: UserStatsResponse
+    activities: ActivityCompletionResponse
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.core.lazy import lazy_module
+from app.models.daily_situation_model import DailySituation
+from app.models.goal_model import Roleplay
+from app.models.lesson_model import Lesson
+from app.models.user_model import User
+from app.models.writng_model import Writing
+from app.schemas.agents_schema import GrammarItem, LessonOutput, Question, VocabItem
+from app.schemas.roleplay_schema import Goal
+from app.services.lesson_service import (
+    ProgressCallback,
+    day_bounds,
+    generated_at,
+    lesson_from_state,
+    lesson_to_payload,
+    lock_user_day,
+    profile_data,
+    stored_for_day,
+)
+
+daily_bundle_workflow = lazy_module("app.workflows.daily_bundle_workflow")
+
+# node name -> (SSE step, message)
+BUNDLE_PROGRESS_STEPS = {
+    "situation_maker": ("situation", "Daily situation generated!"),
+    "lesson_maker": ("lesson", "Article generated!"),
+    "vocab_maker": ("vocab", "Vocabulary generated!"),
+    "grammar_maker": ("grammar", "Grammar extracted!"),
+    "question_maker": ("questions", "Questions generated!"),
+    "roleplay_goal_maker": ("roleplay_goal", "Roleplay goal generated!"),
+    "writing_goal_maker": ("writing_goal", "Writing goal generated!"),
+}
+
+
+def _stored_artifacts(db: Session, user_id: int, day: date) -> dict[str, Any]:
+    return {
+        "situation": stored_for_day(db, DailySituation, user_id, day),
+        "lesson": stored_for_day(db, Lesson, user_id, day),
+        "roleplay": stored_for_day(db, Roleplay, user_id, day),
+        "writing": stored_for_day(db, Writing, user_id, day),
+    }
+
+
+def bundle_payload(db: Session, user_id: int, day: date) -> dict | None:
+    """The `complete` payload of the daily bundle stream, or None while anything is missing."""
+    stored = _stored_artifacts(db, user_id, day)
+    if not all(stored.values()):
+        return None
+    roleplay = stored["roleplay"]
+    return {
+        "situation": stored["situation"].daily_situation,
+        "lesson": lesson_to_payload(stored["lesson"]),
+        "roleplay_goal": {
+            "goal": roleplay.goal,
+            "user_role": roleplay.user_role,
+            "ai_role": roleplay.ai_role,
+            "suggested_vocab": roleplay.suggested_vocab or [],
+        },
+        "writing_goal": stored["writing"].goal,
+    }
+
+
+def build_bundle_state(db: Session, user: User, day: date) -> dict:
+    """
+    Initial bundle-graph state: the profile, recent situations for variety, and
+    whatever was already stored for the day so those nodes are skipped.
+    """
+    if not user.profile:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No user profile")
+
+    start, _ = day_bounds(day)
+    recent = db.query(DailySituation.daily_situation).filter(
+        DailySituation.user_id == user.id,
+        DailySituation.created_at >= start - timedelta(days=7),
+        DailySituation.created_at < start,
+    ).all()
+    state: dict = {
+        "user_id": user.id,
+        "user_name": user.full_name,
+        "user_profile": profile_data(user.profile),
+        "recent_situations": [text for (text,) in recent],
+    }
+
+    stored = _stored_artifacts(db, user.id, day)
+    if stored["situation"]:
+        state["daily_situation"] = stored["situation"].daily_situation
+    if stored["lesson"]:
+        lesson = stored["lesson"]
+        state["lesson"] = LessonOutput(user_id=user.id, title=lesson.title, paragraphs=list(lesson.paragraphs))
+        state["vocabs"] = [VocabItem(**v) for v in lesson.vocab or []]
+        state["grammar"] = [GrammarItem(**g) for g in lesson.grammar or []]
+        state["questions"] = [Question(**q) for q in lesson.questions or []]
+    if stored["roleplay"]:
+        roleplay = stored["roleplay"]
+        state["roleplay_goal"] = Goal(goal=roleplay.goal, user_role=roleplay.user_role, ai_role=roleplay.ai_role)
+    if stored["writing"]:
+        state["writing_goal"] = stored["writing"].goal
+    return state
+
+
+def save_bundle(db: Session, user_id: int, day: date, final_state: dict) -> None:
+    """Store every artifact of the day that is not stored yet, in one transaction."""
+    created_at = generated_at(day)
+    lock_user_day(db, user_id, day)
+    stored = _stored_artifacts(db, user_id, day)
+    if not stored["situation"]:
+        db.add(DailySituation(user_id=user_id, daily_situation=final_state["daily_situation"], created_at=created_at))
+    if not stored["lesson"]:
+        db.add(lesson_from_state(user_id, final_state, created_at))
+    if not stored["roleplay"]:
+        goal = final_state["roleplay_goal"]
+        db.add(Roleplay(
+            user_id=user_id,
+            goal=goal.goal,
+            user_role=goal.user_role,
+            ai_role=goal.ai_role,
+            suggested_vocab=final_state.get("roleplay_vocab", []),
+            created_at=created_at,
+        ))
+    if not stored["writing"]:
+        db.add(Writing(user_id=user_id, goal=final_state["writing_goal"], created_at=created_at))
+    db.commit()
+
+
+async def generate_daily_bundle(user_id: int, day: date, on_progress: ProgressCallback) -> dict:
+    """
+    Generate the day's situation, lesson, roleplay goal and writing goal in one graph
+    run and store them together. Safe to run again: stored parts are reused.
+    """
+    db = SessionLocal()
+    try:
+        payload = bundle_payload(db, user_id, day)
+        if payload:
+            return payload
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        initial_state = build_bundle_state(db, user, day)
+    finally:
+        db.close()
+
+    on_progress("started", "Preparing your day...")
+    final_state = dict(initial_state)
+    async for event in daily_bundle_workflow.build_workflow().astream(initial_state, stream_mode="updates"):
+        for node_name, node_output in event.items():
+            if node_output:
+                final_state.update(node_output)
+                if node_name in BUNDLE_PROGRESS_STEPS:
+                    on_progress(*BUNDLE_PROGRESS_STEPS[node_name])
+
+    db = SessionLocal()
+    try:
+        save_bundle(db, user_id, day, final_state)
+        return bundle_payload(db, user_id, day)
+    finally:
+        db.close()
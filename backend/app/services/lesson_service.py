@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.api.v1.stats import update_user_stats
+from app.core.database import SessionLocal
+from app.core.lazy import lazy_module
+from app.core.llm import LLMClient, MODEL_NAME
+from app.core.utils import open_yaml
+from app.models.daily_situation_model import DailySituation
+from app.models.lesson_model import Lesson
+from app.models.user_model import User
+from app.models.user_profile_model import UserProfile
+from app.schemas.agents_schema import EvaluateLessonOutput, QuestionFeedback
+from app.schemas.user_schema import UserProfileRequest
+
+checkpoints = lazy_module("app.workflows.checkpoints")
+lesson_workflow = lazy_module("app.workflows.lesson_workflow")
+
+REQUIRED_KEYS = ("lesson", "vocabs", "grammar", "questions")
+
+# node name -> (SSE step, message)
+PROGRESS_STEPS = {
+    "lesson_maker": ("lesson", "Article generated!"),
+    "vocab_maker": ("vocab", "Vocabulary generated!"),
+    "grammar_maker": ("grammar", "Grammar extracted!"),
+    "question_maker": ("questions", "Questions generated!"),
+}
+# node name -> state key it fills
+NODE_OUTPUTS = {
+    "lesson_maker": "lesson",
+    "vocab_maker": "vocabs",
+    "grammar_maker": "grammar",
+    "question_maker": "questions",
+}
+
+ProgressCallback = Callable[[str, str], None]
+
+# Question fields that hold the MCQ answer key; stripped from what the client sees.
+ANSWER_KEY_FIELDS = ("correct_option_index", "explanation")
+
+
+def build_lesson_state(current_user: User, situation_text: str) -> dict:
+    """
+    Initial lesson-graph state as plain data. The graph runs for tens of seconds of
+    LLM calls, so it must not carry ORM objects or a Session (and with it a pooled
+    connection) through its state.
+    """
+    profile = current_user.profile
+    if not profile:
+        raise HTTPException(status_code=400, detail="User profile not found. Please complete your profile first.")
+
+    return {
+        "user_id": current_user.id,
+        "daily_situation": situation_text,
+        "user_profile": profile_data(profile),
+    }
+
+
+def profile_data(profile: UserProfile) -> UserProfileRequest:
+    return UserProfileRequest(
+        user_goal=profile.user_goal,
+        user_level_speaking=profile.user_level_speaking,
+        user_level_reading=profile.user_level_reading,
+        user_region=profile.user_region,
+    )
+
+
+def lesson_thread_id(user_id: int, day: date) -> str:
+    return f"lesson:{user_id}:{day.isoformat()}"
+
+
+async def run_lesson_workflow(
+    state: dict,
+    thread_id: str,
+    on_progress: ProgressCallback | None = None,
+) -> dict:
+    """
+    Run the lesson graph with a checkpoint after every node and return the final state.
+    A run for the same thread that failed part-way resumes after its last finished node;
+    the steps it already finished are reported again so the client's progress is complete.
+    """
+    graph = lesson_workflow.build_workflow(checkpoints.get_checkpointer())
+    done = await checkpoints.thread_values(graph, thread_id)
+    if on_progress:
+        for node_name, key in NODE_OUTPUTS.items():
+            if key in done:
+                on_progress(*PROGRESS_STEPS[node_name])
+
+    async for node_name, _node_output in checkpoints.astream_resumable(graph, state, thread_id):
+        if on_progress and node_name in PROGRESS_STEPS:
+            on_progress(*PROGRESS_STEPS[node_name])
+    return await checkpoints.thread_values(graph, thread_id)
+
+
+def is_complete(final_state: dict) -> bool:
+    return all(key in final_state for key in REQUIRED_KEYS)
+
+
+def lesson_from_state(user_id: int, final_state: dict[str, Any], created_at: datetime | None = None) -> Lesson:
+    lesson = Lesson(
+        user_id=user_id,
+        vocab=[v.model_dump() for v in final_state.get("vocabs", [])],
+        paragraphs=list(final_state["lesson"].paragraphs),
+        grammar=[g.model_dump() for g in final_state.get("grammar", [])],
+        questions=[q.model_dump() for q in final_state.get("questions", [])],
+        title=final_state["lesson"].title,
+    )
+    if created_at is not None:
+        lesson.created_at = created_at
+    return lesson
+
+
+def save_lesson(
+    user_id: int,
+    final_state: dict[str, Any],
+    db: Session | None = None,
+    created_at: datetime | None = None,
+) -> Lesson:
+    """
+    Persist a generated lesson, unless a concurrent run stored the day's lesson
+    first (that one is returned then); without ``db`` a short-lived session is used.
+    """
+    if db is not None:
+        created_at = created_at or datetime.now(timezone.utc)
+        day = created_at.astimezone(timezone.utc).date()
+        lock_user_day(db, user_id, day)
+        lesson = stored_for_day(db, Lesson, user_id, day)
+        if lesson is None:
+            lesson = lesson_from_state(user_id, final_state, created_at)
+            db.add(lesson)
+        db.commit()
+        db.refresh(lesson)
+        return lesson
+
+    db = SessionLocal()
+    try:
+        return save_lesson(user_id, final_state, db, created_at)
+    finally:
+        db.close()
+
+
+def day_bounds(day: date) -> tuple[datetime, datetime]:
+    start = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def lock_user_day(db: Session, user_id: int, day: date) -> None:
+    """
+    Serialise writers of the user's rows for ``day`` (situation, lesson, roleplay
+    and writing goal) until ``db``'s transaction ends. The lesson, bundle and
+    pre-generation jobs and the inline roleplay path all check for the day's row
+    before their LLM calls; each takes this lock and checks again before inserting,
+    so concurrent runs cannot both store one.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(:user_id, :day)"), {"user_id": user_id, "day": day.toordinal()})
+
+
+def stored_for_day(db: Session, model: type, user_id: int, day: date) -> Any:
+    start, end = day_bounds(day)
+    return db.query(model).filter(
+        model.user_id == user_id,
+        model.created_at >= start,
+        model.created_at < end,
+    ).first()
+
+
+def generated_at(day: date) -> datetime:
+    """Timestamp for a row generated for ``day``: now, or the start of the day when generating ahead."""
+    return max(datetime.now(timezone.utc), day_bounds(day)[0])
+
+
+def public_questions(questions: list[dict] | None) -> list[dict]:
+    """Questions as sent to the client, without the MCQ answer keys."""
+    return [{k: v for k, v in q.items() if k not in ANSWER_KEY_FIELDS} for q in questions or []]
+
+
+def lesson_to_payload(lesson: Lesson) -> dict:
+    """The `complete` payload of the create_lesson stream for a stored lesson."""
+    return {
+        'lesson': {
+            'id': lesson.id,
+            'user_id': lesson.user_id,
+            'title': lesson.title,
+            'paragraphs': lesson.paragraphs
+        },
+        'vocabs': lesson.vocab,
+        'grammar': lesson.grammar or [],
+        'questions': public_questions(lesson.questions),
+        'progress': lesson.progress or {},
+        'completed': lesson.completed,
+        'evaluation': {
+            'score': lesson.score,
+            'summary': lesson.summary,
+            'focus_areas': lesson.focus_areas,
+            'per_question': lesson.per_question or []
+        } if lesson.score is not None else None
+    }
+
+
+async def generate_lesson_for_day(user_id: int, day: date, on_progress: ProgressCallback) -> dict:
+    """
+    Generate and store the user's lesson for ``day`` from that day's situation.
+    Safe to run again after a crash: an already stored lesson is returned as is.
+    """
+    start, end = day_bounds(day)
+    db = SessionLocal()
+    try:
+        existing = db.query(Lesson).filter(
+            Lesson.user_id == user_id,
+            Lesson.created_at >= start,
+            Lesson.created_at < end
+        ).first()
+        if existing:
+            return lesson_to_payload(existing)
+
+        daily_situation = db.query(DailySituation).filter(
+            DailySituation.user_id == user_id,
+            DailySituation.created_at >= start,
+            DailySituation.created_at < end
+        ).first()
+        if not daily_situation:
+            raise HTTPException(status_code=404, detail="No daily situation found")
+
+        user = db.query(User).filter(User.id == user_id).first()
+        initial_state = build_lesson_state(user, daily_situation.daily_situation)
+    finally:
+        db.close()
+
+    on_progress("started", "Starting lesson creation...")
+    thread_id = lesson_thread_id(user_id, day)
+    final_state = await run_lesson_workflow(initial_state, thread_id, on_progress)
+
+    if not is_complete(final_state):
+        raise RuntimeError("Lesson creation incomplete. Missing required data.")
+
+    save_lesson(user_id, final_state, created_at=generated_at(day))
+    await checkpoints.delete_thread(thread_id)
+    return {
+        'lesson': final_state['lesson'].model_dump(),
+        'vocabs': [v.model_dump() for v in final_state['vocabs']],
+        'grammar': [g.model_dump() for g in final_state['grammar']],
+        'questions': public_questions([q.model_dump() for q in final_state['questions']])
+    }
+
+
+def _evaluation_payload(lesson: Lesson) -> dict:
+    return {
+        "score": lesson.score,
+        "summary": lesson.summary,
+        "focus_areas": lesson.focus_areas or [],
+        "per_question": lesson.per_question or [],
+    }
+
+
+def has_answer_key(question: dict) -> bool:
+    """Whether an MCQ can be scored locally (older lessons were stored without the key)."""
+    index = question.get("correct_option_index")
+    options = question.get("options") or []
+    return question.get("type") == "mcq" and isinstance(index, int) and 0 <= index < len(options)
+
+
+def _answer_for(answers: dict, question: dict) -> str:
+    # Stored as JSON, so question ids come back as string keys.
+    answer = answers.get(str(question["id"]), answers.get(question["id"]))
+    return "" if answer is None else str(answer).strip()
+
+
+def _chosen_option(question: dict, answer: str) -> int | None:
+    # Option text wins over an index, so an option like "1990" or "3" is never misread as a position.
+    options = [str(option).strip().casefold() for option in question.get("options") or []]
+    if answer and answer.casefold() in options:
+        return options.index(answer.casefold())
+    if answer.isdigit() and 0 <= int(answer) < len(options):
+        return int(answer)
+    return None
+
+
+def score_mcq(question: dict, answer: str) -> QuestionFeedback:
+    return QuestionFeedback(
+        question_id=question["id"],
+        correct=_chosen_option(question, answer) == question["correct_option_index"],
+        correct_option_index=question["correct_option_index"],
+        explanation=question.get("explanation"),
+    )
+
+
+def merge_evaluation(
+    questions: list[dict],
+    local: list[QuestionFeedback],
+    remote: EvaluateLessonOutput | None,
+) -> EvaluateLessonOutput:
+    """Combine locally scored MCQs with the LLM's evaluation of the remaining questions."""
+    local_correct = sum(f.correct for f in local)
+    remote_count = len(questions) - len(local)
+    if remote is None:
+        score = round(100 * local_correct / len(local)) if local else 0
+        summary = f"You answered {local_correct} of {len(local)} questions correctly."
+        summary += " Great job!" if local_correct == len(local) else " Review the explanations for the ones you missed."
+        missed = {f.question_id for f in local if not f.correct}
+        focus_areas = [f"Review: {q['question']}" for q in questions if q["id"] in missed][:3]
+        feedback = local
+    else:
+        remote_score = min(max(remote.score, 0), 100)
+        score = round((100 * local_correct + remote_score * remote_count) / len(questions))
+        summary, focus_areas = remote.summary, remote.focus_areas
+        feedback = remote.per_question + local
+
+    by_id = {f.question_id: f for f in feedback}
+    return EvaluateLessonOutput(
+        score=score,
+        summary=summary,
+        focus_areas=focus_areas,
+        per_question=[by_id[q["id"]] for q in questions if q["id"] in by_id],
+    )
+
+
+def _evaluation_prompt(lesson: Lesson, to_grade: list[dict], graded: list[tuple[dict, QuestionFeedback]]) -> str:
+    answers = lesson.answers or {}
+    items = []
+    for q in to_grade:
+        item = {"id": q["id"], "type": q["type"], "question": q["question"]}
+        if q.get("options"):
+            item["options"] = q["options"]
+        items.append({**item, "answer": _answer_for(answers, q)})
+    graded_text = "\n".join(
+        f"- {q['question']}: {'correct' if f.correct else 'incorrect'}" for q, f in graded
+    ) or "None"
+    prompt = open_yaml("app/workflows/prompts.yaml")['evaluate_lesson_prompt']
+    prompt = prompt.replace("{{ article }}", "\n".join(lesson.paragraphs))
+    prompt = prompt.replace("{{ items }}", json.dumps(items, ensure_ascii=False))
+    return prompt.replace("{{ graded }}", graded_text)
+
+
+async def evaluate_lesson_answers(lesson_id: int, on_progress: ProgressCallback) -> dict:
+    """
+    Score the answers stored on the lesson, save the evaluation and award points.
+    MCQs with an answer key are scored in-process; only the rest go to the LLM.
+    """
+    db = SessionLocal()
+    try:
+        lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+        if not lesson:
+            raise HTTPException(status_code=404, detail="No lesson found")
+        if lesson.completed:
+            return _evaluation_payload(lesson)
+
+        questions = lesson.questions or []
+        local_questions = [q for q in questions if has_answer_key(q)]
+        local = [score_mcq(q, _answer_for(lesson.answers or {}, q)) for q in local_questions]
+        to_grade = [q for q in questions if not has_answer_key(q)]
+        prompt = _evaluation_prompt(lesson, to_grade, list(zip(local_questions, local))) if to_grade else None
+        user_id = lesson.user_id
+    finally:
+        db.close()
+
+    if local:
+        on_progress("scored", "Multiple-choice answers scored!")
+    remote = None
+    if prompt is not None:
+        on_progress("evaluating", "Evaluating answers...")
+        messages = [
+            {
+                "role": "system",
+                "content": prompt
+            }
+        ]
+        llm = LLMClient()
+        chat = llm.get_client(MODEL_NAME)
+        remote = await chat.with_structured_output(EvaluateLessonOutput).ainvoke(messages)
+    result = merge_evaluation(questions, local, remote)
+
+    db = SessionLocal()
+    try:
+        lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+        lesson.score = result.score
+        lesson.summary = result.summary
+        lesson.focus_areas = result.focus_areas
+        lesson.per_question = [q.model_dump() for q in result.per_question]
+        lesson.completed = True
+        db.commit()
+
+        points_earned = result.score + 10
+        update_user_stats(db, user_id, points_earned, "lesson", lesson_id)
+    finally:
+        db.close()
+
+    return result.model_dump()
@@ -1,21 +1,28 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date
 from typing import Any
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
 
 from app.core.database import SessionLocal
-from app.models.daily_situation_model import DailySituation
+from app.core.llm_tracing import llm_call_site
 from app.models.goal_model import Roleplay
 from app.models.lesson_model import Lesson
 from app.models.roleplay_message_model import RoleplayMessage
-from app.models.user_model import User
+from app.schemas.agents_schema import LessonOutput
 from app.schemas.roleplay_schema import ChatMessage, RoleplayState
-from app.workflows.lesson_workflow import build_workflow as build_lesson_workflow
+from app.services.lesson_service import (
+    ProgressCallback,
+    day_bounds,
+    generated_at,
+    lock_user_day,
+    stored_for_day,
+)
+from app.workflows.nodes.roleplay_evaluation_node import evaluate_roleplay
+from app.api.v1.stats import update_user_stats
 from app.workflows.nodes.end_node import end_check_node
-
+from app.workflows.nodes.roleplay_goal_node import make_roleplay_goal
 
 async def check_end_in_background_task(
     goal_id: int,
@@ -57,7 +64,8 @@ async def check_end_in_background_task(
             goal_id=goal_id,
         )
 
-        end_result = await end_check_node(state)
+        with llm_call_site("end_check"):
+            end_result = await end_check_node(state)
         should_end = bool(end_result.get("done", False))
 
         goal.should_end = should_end
@@ -115,79 +123,119 @@ def normalize_roleplay_evaluation(evaluation: Any) -> dict:
     }
 
 
-async def create_lesson_from_daily_situation(
-    current_user: User,
-    daily_situation: DailySituation,
-    db: Session,
-) -> Lesson:
-    """Create a Lesson from a DailySituation using the existing lesson workflow."""
-    situation_text = daily_situation.daily_situation
-    user_profile = current_user.profile
+async def generate_roleplay_goal(user_id: int, day: date) -> dict:
+    """
+    Generate and store the roleplay goal (with suggested vocab) for the user's lesson of ``day``.
+    Safe to run again: an already stored goal is returned as is.
+    """
+    start, end = day_bounds(day)
+    db = SessionLocal()
+    try:
+        existing_goal = db.query(Roleplay).filter(
+            Roleplay.user_id == user_id,
+            Roleplay.created_at >= start,
+            Roleplay.created_at < end
+        ).first()
+        if existing_goal:
+            return {"goal": existing_goal.goal, "user_role": existing_goal.user_role, "ai_role": existing_goal.ai_role}
+
+        lesson = db.query(Lesson).filter(
+            Lesson.user_id == user_id,
+            Lesson.created_at >= start,
+            Lesson.created_at < end
+        ).first()
+        if not lesson:
+            raise HTTPException(status_code=404, detail="No lesson or daily situation found for today.")
+        title = lesson.title
+        paragraphs = list(lesson.paragraphs)
+    finally:
+        db.close()
 
-    if not user_profile:
-        raise HTTPException(status_code=400, detail="User profile not found. Please complete your profile first.")
+    with llm_call_site("roleplay_goal"):
+        result = await make_roleplay_goal({"lesson": LessonOutput(user_id=user_id, title=title, paragraphs=paragraphs)})
+    goal = result["roleplay_goal"]
 
-    initial_state = {
-        "db": db,
-        "current_user": current_user,
-        "daily_situation": situation_text,
-        "user_profile": user_profile,
-    }
+    db = SessionLocal()
+    try:
+        lock_user_day(db, user_id, day)
+        stored = stored_for_day(db, Roleplay, user_id, day)
+        if stored is not None:
+            # A concurrent run stored the day's goal while this one was generating.
+            db.commit()
+            return {"goal": stored.goal, "user_role": stored.user_role, "ai_role": stored.ai_role}
+        db.add(Roleplay(
+            user_id=user_id,
+            goal=goal.goal,
+            user_role=goal.user_role,
+            ai_role=goal.ai_role,
+            suggested_vocab=result["roleplay_vocab"],
+            created_at=generated_at(day),
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    return goal.model_dump()
 
-    app = build_lesson_workflow()
-    final_state: dict = {}
-
-    async for event in app.astream(initial_state, stream_mode="updates"):
-        for _node_name, node_output in event.items():
-            final_state.update(node_output)
-
-    lesson = Lesson(
-        user_id=current_user.id,
-        vocab=[v.model_dump() for v in final_state.get("vocabs", [])],
-        paragraphs=list(final_state["lesson"].paragraphs),
-        grammar=[g.model_dump() for g in final_state.get("grammar", [])],
-        questions=[q.model_dump() for q in final_state.get("questions", [])],
-        title=final_state["lesson"].title,
-    )
-    db.add(lesson)
-    db.commit()
-    db.refresh(lesson)
-    return lesson
-
-
-async def get_or_create_today_lesson(
-    *,
-    current_user: User,
-    db: Session,
-    start: datetime,
-    end: datetime,
-) -> Lesson:
+
+async def evaluate_roleplay_session(goal_id: int, lesson_id: int, on_progress: ProgressCallback) -> dict:
     """
-    Get today's lesson. If none exists, try to create it from today's DailySituation.
+    Evaluate a finished roleplay conversation, store the evaluation and award points.
+    Safe to run again: a stored evaluation is returned as is.
     """
-    lesson = (
-        db.query(Lesson)
-        .filter(
-            Lesson.user_id == current_user.id,
-            Lesson.created_at >= start,
-            Lesson.created_at < end,
-        )
-        .first()
-    )
-    if lesson:
-        return lesson
-
-    daily_situation = (
-        db.query(DailySituation)
-        .filter(
-            DailySituation.user_id == current_user.id,
-            DailySituation.created_at >= start,
-            DailySituation.created_at < end,
+    db = SessionLocal()
+    try:
+        goal = db.query(Roleplay).filter(Roleplay.id == goal_id).first()
+        lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+        if goal is None or lesson is None:
+            raise HTTPException(status_code=404, detail="No roleplay goal found for today.")
+        if goal.evaluation:
+            return {"evaluation": goal.evaluation, "score": goal.score or 0}
+
+        messages = (
+            db.query(RoleplayMessage)
+            .filter(RoleplayMessage.roleplay_id == goal.id)
+            .order_by(RoleplayMessage.created_at.asc())
+            .all()
         )
-        .first()
-    )
-    if not daily_situation:
-        raise HTTPException(status_code=404, detail="No lesson or daily situation found for today.")
+        initial_state = {
+            "lesson_title": lesson.title,
+            "lesson_body": " ".join(lesson.paragraphs),
+            "goal_text": goal.goal,
+            "user_role": goal.user_role,
+            "ai_role": goal.ai_role,
+            "chat_history": [ChatMessage(role=m.role, content=m.content) for m in messages],
+            "user_input": "",
+            "turn_count": 0,
+            "goal_id": goal.id
+        }
+        user_id = goal.user_id
+    finally:
+        db.close()
 
-    return await create_lesson_from_daily_situation(current_user=current_user, daily_situation=daily_situation, db=db)
+    on_progress("evaluating", "Evaluating conversation...")
+    with llm_call_site("evaluate"):
+        evaluation_result = await evaluate_roleplay(initial_state)
+    evaluation = evaluation_result.get("evaluation")
+    if not evaluation:
+        raise RuntimeError("Failed to generate evaluation.")
+
+    avg_score = (
+        evaluation.get("grammarScore", 0) +
+        evaluation.get("clarityScore", 0) +
+        evaluation.get("naturalnessScore", 0)
+    ) // 3
+
+    db = SessionLocal()
+    try:
+        goal = db.query(Roleplay).filter(Roleplay.id == goal_id).first()
+        goal.evaluation = evaluation
+        goal.completed = True
+        goal.score = avg_score
+        db.commit()
+
+        update_user_stats(db, user_id, avg_score + 10, "roleplay", goal_id)
+    finally:
+        db.close()
 
+    return {"evaluation": evaluation, "score": avg_score}
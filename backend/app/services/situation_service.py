@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import logging
+from datetime import date, timedelta
+
+from fastapi import HTTPException, status
+
+from app.core.database import SessionLocal
+from app.core.llm_tracing import llm_call_site
+from app.models.daily_situation_model import DailySituation
+from app.models.user_model import User
+from app.services.lesson_service import day_bounds, generated_at, lock_user_day, profile_data, stored_for_day
+from app.workflows.nodes.situation_node import make_situation
+
+logger = logging.getLogger(__name__)
+
+
+async def generate_daily_situation(user_id: int, day: date) -> dict:
+    """
+    Generate and store the user's situation for ``day``, avoiding the last seven days.
+    Safe to run again: an already stored situation is returned as is.
+    """
+    start, end = day_bounds(day)
+    seven_days_ago = day - timedelta(days=7)
+
+    db = SessionLocal()
+    try:
+        daily_situation = db.query(DailySituation).filter(
+            DailySituation.user_id==user_id,
+            DailySituation.created_at>=start,
+            DailySituation.created_at<end
+            ).first()
+        if daily_situation:
+            return {"situation": daily_situation.daily_situation}
+
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user or not user.profile:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No user profile"
+            )
+
+        last_seven_days_situations = [
+            situation.daily_situation
+            for situation in db.query(DailySituation).filter(
+                DailySituation.user_id==user_id,
+                DailySituation.created_at>=seven_days_ago,
+                DailySituation.created_at<end
+                ).all()
+        ]
+
+        state = {
+            "user_name": user.full_name,
+            "user_profile": profile_data(user.profile),
+            "recent_situations": last_seven_days_situations,
+        }
+    finally:
+        db.close()
+
+    with llm_call_site("daily_situation"):
+        result = await make_situation(state)
+
+    db = SessionLocal()
+    try:
+        lock_user_day(db, user_id, day)
+        stored = stored_for_day(db, DailySituation, user_id, day)
+        if stored is not None:
+            # A concurrent run stored the day's situation while this one was generating.
+            db.commit()
+            return {"situation": stored.daily_situation}
+        db.add(DailySituation(
+            daily_situation = result["daily_situation"],
+            user_id = user_id,
+            created_at = generated_at(day),
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    return {"situation": result["daily_situation"]}
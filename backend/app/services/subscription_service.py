@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.lazy import lazy_module
+from app.core.metrics import REGISTRY
+from app.models.stripe_event_model import StripeEvent
+from app.models.user_model import User
+
+logger = logging.getLogger(__name__)
+
+STRIPE_EVENTS = REGISTRY.counter(
+    "stripe_events_total",
+    "Stripe webhook events by type and outcome (received, duplicate, applied, stale, ignored).",
+    ("type", "outcome"),
+)
+
+
+
+def _configure_stripe(module) -> None:
+    if settings.STRIPE_SECRET_KEY:
+        module.api_key = settings.STRIPE_SECRET_KEY
+    if settings.STRIPE_API_BASE:
+        module.api_base = settings.STRIPE_API_BASE
+
+
+stripe = lazy_module("stripe", on_load=_configure_stripe)
+
+HANDLED_EVENTS = (
+    "checkout.session.completed",
+    "customer.subscription.updated",
+    "customer.subscription.deleted",
+)
+
+
+def record_stripe_event(db: Session, event: dict) -> bool:
+    """
+    Store a verified webhook event under its Stripe id. Returns False for a
+    redelivery of an event already stored, whose count is bumped instead.
+    """
+    statement = insert(StripeEvent.__table__).values(
+        id=event["id"],
+        type=event["type"],
+        created=datetime.fromtimestamp(event["created"], timezone.utc),
+        payload=event,
+        deliveries=1,
+    )
+    inserted = db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["id"], set_={"deliveries": StripeEvent.__table__.c.deliveries + 1}
+        ).returning(StripeEvent.__table__.c.deliveries)
+    ).scalar_one() == 1
+    db.commit()
+    STRIPE_EVENTS.inc(type=event["type"], outcome="received" if inserted else "duplicate")
+    return inserted
+
+
+def _period_end(value: int | None) -> datetime | None:
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value else None
+
+
+def _apply(user: User, event_type: str, data: dict, subscription: dict | None) -> None:
+    if event_type == "checkout.session.completed" and subscription.get("status") == "canceled":
+        # Fetched when the event is applied, so it may have been canceled since.
+        event_type = "customer.subscription.deleted"
+    if event_type == "checkout.session.completed":
+        user.subscription_plan = "premium"
+        user.subscription_status = subscription.get("status", "active")
+        user.stripe_subscription_id = subscription.get("id")
+        if subscription.get("current_period_end"):
+            user.subscription_current_period_end = _period_end(subscription["current_period_end"])
+    elif event_type == "customer.subscription.updated":
+        status_value = data.get("status", "active")
+        user.subscription_status = status_value
+        if status_value in ["active", "trialing", "past_due"]:
+            user.subscription_plan = "premium"
+        elif status_value == "canceled":
+            user.subscription_plan = "free"
+        if data.get("current_period_end"):
+            user.subscription_current_period_end = _period_end(data["current_period_end"])
+    elif event_type == "customer.subscription.deleted":
+        user.subscription_plan = "free"
+        user.subscription_status = "free"
+        user.subscription_current_period_end = None
+        user.stripe_subscription_id = None
+
+
+def _load_stripe_event(event_id: str) -> tuple[str, datetime, dict] | str:
+    """The stored event's type, created and object, or its outcome if there is nothing to apply."""
+    db = SessionLocal()
+    try:
+        row = db.query(StripeEvent).filter(StripeEvent.id == event_id).first()
+        if row is None:
+            return "missing"
+        if row.processed_at is not None:
+            return row.outcome
+        return row.type, row.created, row.payload.get("data", {}).get("object", {})
+    finally:
+        db.close()
+
+
+def _apply_stored_event(
+    event_id: str,
+    event_type: str,
+    created: datetime,
+    data: dict,
+    subscription: dict | None,
+    applied_as_of: datetime,
+) -> str:
+    db = SessionLocal()
+    try:
+        user = None
+        if subscription is not None:
+            user = db.query(User).filter(User.id == int(data["client_reference_id"])).with_for_update().first()
+        elif event_type in HANDLED_EVENTS[1:] and data.get("id"):
+            user = (
+                db.query(User).filter(User.stripe_subscription_id == data["id"]).with_for_update().first()
+            )
+
+        if user is None:
+            outcome = "ignored"
+        elif user.stripe_event_at is not None and created < user.stripe_event_at:
+            outcome = "stale"
+        else:
+            _apply(user, event_type, data, subscription)
+            user.stripe_event_at = applied_as_of
+            outcome = "applied"
+
+        row = db.query(StripeEvent).filter(StripeEvent.id == event_id).one()
+        row.outcome = outcome
+        row.processed_at = datetime.now(timezone.utc)
+        db.commit()
+        return outcome
+    finally:
+        db.close()
+
+
+async def apply_stripe_event(event_id: str) -> dict:
+    """
+    Apply a stored webhook event to its user. Safe to run again: a processed
+    event is not applied twice, and an event older than the newest one already
+    applied to the user (Stripe does not deliver in order) is skipped as stale.
+    """
+    # Sessions and row locks are blocking; keep them off the worker's event loop.
+    stored = await asyncio.to_thread(_load_stripe_event, event_id)
+    if isinstance(stored, str):
+        return {"outcome": stored}
+    event_type, created, data = stored
+
+    subscription = None
+    applied_as_of = created
+    if event_type == "checkout.session.completed" and data.get("subscription") and data.get("client_reference_id"):
+        # The session only names the subscription; its status and period come from the API
+        # (errors propagate so the job is retried). That state already includes every event
+        # Stripe created before the fetch, so those count as stale from then on.
+        applied_as_of = max(created, datetime.now(timezone.utc))
+        subscription = await stripe.Subscription.retrieve_async(data["subscription"])
+
+    outcome = await asyncio.to_thread(
+        _apply_stored_event, event_id, event_type, created, data, subscription, applied_as_of
+    )
+
+    STRIPE_EVENTS.inc(type=event_type, outcome=outcome)
+    if outcome == "stale":
+        logger.info(f"Skipped stale Stripe event {event_id} ({event_type}, created {created.isoformat()})")
+    return {"outcome": outcome}
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+from sqlalchemy import exists, func, select, true
+from sqlalchemy.orm import Session
+
+from app.models.activity_log_model import ActivityLog
+from app.models.daily_situation_model import DailySituation
+from app.models.goal_model import Roleplay
+from app.models.lesson_model import Lesson
+from app.models.user_model import User
+from app.models.user_stats_model import UserStats
+from app.models.writng_model import Writing
+from app.schemas.stats_schema import ActivityCompletionResponse, UserStatsResponse
+from app.schemas.today_schema import TodayLesson, TodayResponse, TodayRoleplay, TodayWriting
+from app.services.lesson_service import day_bounds
+
+
+def _first_of_day(name: str, model: Any, user_id: int, day: date, *columns: Any):
+    """CTE with the user's first row of ``model`` created on ``day`` (a (user_id, created_at) range scan)."""
+    start, end = day_bounds(day)
+    return (
+        select(*columns)
+        .where(model.user_id == user_id, model.created_at >= start, model.created_at < end)
+        .order_by(model.created_at, model.id)
+        .limit(1)
+        .cte(name)
+    )
+
+
+def today_query(user_id: int, day: date):
+    """Everything the dashboard shows for ``day`` in one statement: one CTE per table, outer-joined to the user."""
+    start, end = day_bounds(day)
+    situation = _first_of_day("today_situation", DailySituation, user_id, day, DailySituation.daily_situation)
+    lesson = _first_of_day(
+        "today_lesson", Lesson, user_id, day, Lesson.id, Lesson.title, Lesson.completed, Lesson.score
+    )
+    roleplay = _first_of_day(
+        "today_roleplay", Roleplay, user_id, day,
+        Roleplay.goal, Roleplay.user_role, Roleplay.ai_role, Roleplay.completed, Roleplay.score,
+    )
+    writing = _first_of_day(
+        "today_writing", Writing, user_id, day,
+        Writing.goal,
+        func.coalesce(func.btrim(Writing.user_input) != "", False).label("submitted"),
+    )
+    roleplay_done = exists().where(
+        ActivityLog.user_id == user_id,
+        ActivityLog.activity_type == "roleplay",
+        ActivityLog.created_at >= start,
+        ActivityLog.created_at < end,
+    )
+
+    return (
+        select(
+            situation.c.daily_situation.label("situation"),
+            lesson.c.id.label("lesson_id"),
+            lesson.c.title.label("lesson_title"),
+            lesson.c.completed.label("lesson_completed"),
+            lesson.c.score.label("lesson_score"),
+            roleplay.c.goal.label("roleplay_goal"),
+            roleplay.c.user_role.label("roleplay_user_role"),
+            roleplay.c.ai_role.label("roleplay_ai_role"),
+            roleplay.c.completed.label("roleplay_completed"),
+            roleplay.c.score.label("roleplay_score"),
+            writing.c.goal.label("writing_goal"),
+            writing.c.submitted.label("writing_submitted"),
+            UserStats.total_points,
+            UserStats.current_streak,
+            UserStats.longest_streak,
+            UserStats.activities_count,
+            roleplay_done.label("roleplay_done"),
+        )
+        .select_from(User)
+        .outerjoin(UserStats, UserStats.user_id == User.id)
+        .outerjoin(situation, true())
+        .outerjoin(lesson, true())
+        .outerjoin(roleplay, true())
+        .outerjoin(writing, true())
+        .where(User.id == user_id)
+    )
+
+
+def load_today(db: Session, user_id: int, day: date) -> TodayResponse:
+    row = db.execute(today_query(user_id, day)).one()
+
+    lesson = None
+    if row.lesson_id is not None:
+        lesson = TodayLesson(
+            id=row.lesson_id, title=row.lesson_title, completed=row.lesson_completed, score=row.lesson_score
+        )
+    roleplay = None
+    if row.roleplay_goal is not None:
+        roleplay = TodayRoleplay(
+            goal=row.roleplay_goal,
+            user_role=row.roleplay_user_role,
+            ai_role=row.roleplay_ai_role,
+            completed=row.roleplay_completed,
+            score=row.roleplay_score,
+        )
+    writing = None
+    if row.writing_goal is not None:
+        writing = TodayWriting(goal=row.writing_goal, submitted=bool(row.writing_submitted))
+
+    return TodayResponse(
+        date=day.isoformat(),
+        situation=row.situation,
+        lesson=lesson,
+        roleplay=roleplay,
+        writing=writing,
+        stats=UserStatsResponse(
+            total_points=row.total_points or 0,
+            current_streak=row.current_streak or 0,
+            longest_streak=row.longest_streak or 0,
+            activities_count=row.activities_count or 0,
+        ),
+        activities=ActivityCompletionResponse(
+            lesson_completed=bool(row.lesson_completed),
+            roleplay_completed=bool(row.roleplay_done),
+            writing_completed=bool(row.writing_submitted),
+        ),
+    )
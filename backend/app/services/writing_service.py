@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import date
+
+from fastapi import HTTPException
+
+from app.api.v1.stats import update_user_stats
+from app.core.database import SessionLocal
+from app.core.llm import LLMClient, MODEL_NAME
+from app.core.llm_tracing import llm_call_site
+from app.core.metrics import REGISTRY
+from app.models.activity_log_model import ActivityLog
+from app.models.daily_situation_model import DailySituation
+from app.models.writng_model import Writing
+from app.schemas.evaluate_writing_schema import WritingEvaluation
+from app.services.lesson_service import day_bounds, generated_at, lock_user_day, stored_for_day
+from app.workflows.nodes.writing_goal_node import make_writing_goal
+
+WRITING_EVALUATIONS_AVOIDED = REGISTRY.counter(
+    "writing_evaluations_avoided_total",
+    "Writing evaluation requests answered without a new LLM call (stored evaluation, or joined a running one).",
+    ("reason",),
+)
+
+
+async def generate_writing_goal(user_id: int, day: date) -> dict:
+    """
+    Generate and store the writing goal for the user's situation of ``day``.
+    Safe to run again: an already stored goal is returned as is.
+    """
+    start, end = day_bounds(day)
+    db = SessionLocal()
+    try:
+        existing_goal = (
+            db.query(Writing)
+            .filter(
+                Writing.user_id == user_id,
+                Writing.created_at >= start,
+                Writing.created_at < end,
+            )
+            .first()
+        )
+        if existing_goal:
+            return {"goal": existing_goal.goal}
+
+        daily_situation = (
+            db.query(DailySituation)
+            .filter(
+                DailySituation.user_id == user_id,
+                DailySituation.created_at >= start,
+                DailySituation.created_at < end,
+            )
+            .first()
+        )
+        if not daily_situation:
+            raise HTTPException(status_code=404, detail="Daily situation not found for today")
+        situation_text = daily_situation.daily_situation
+    finally:
+        db.close()
+
+    with llm_call_site("writing_goal"):
+        result = await make_writing_goal({"daily_situation": situation_text})
+
+    db = SessionLocal()
+    try:
+        lock_user_day(db, user_id, day)
+        stored = stored_for_day(db, Writing, user_id, day)
+        if stored is not None:
+            # A concurrent run stored the day's goal while this one was generating.
+            db.commit()
+            return {"goal": stored.goal}
+        db.add(Writing(user_id=user_id, goal=result["writing_goal"], created_at=generated_at(day)))
+        db.commit()
+    finally:
+        db.close()
+
+    return {"goal": result["writing_goal"]}
+
+
+def make_evaluation_prompt(goal: str, user_input: str) -> str:
+    return f"""
+You are a supportive German writing coach in a German learning app.
+
+Your task is to evaluate the learner’s writing based on the given goal.
+
+Evaluate how well the learner’s writing matches the goal.
+
+Focus on:
+- Task completion (Did they fully respond to what the goal asked?)
+- Grammar and sentence structure
+- Clarity and coherence
+- Appropriateness of tone (formal, informal, polite, etc., if required)
+
+Be constructive, encouraging, and specific.
+Highlight what the learner did well before suggesting improvements.
+
+Return your evaluation in the following structured format:
+
+score: integer from 0 to 100  
+strengths: short, positive feedback highlighting what was done well  
+improvements: short, actionable advice explaining how to improve  
+review: 2–4 sentences of friendly overall feedback, motivating the learner to keep improving  
+
+Do NOT rewrite the entire text.
+Do NOT provide a corrected full version unless explicitly asked.
+Keep feedback clear, supportive, and concise.
+
+Goal:
+{goal}
+
+Learner writing:
+{user_input}
+""".strip()
+
+
+def writing_input_hash(user_input: str) -> str:
+    """Identifies a submitted text; differences in whitespace alone are the same text."""
+    return hashlib.sha256(" ".join(user_input.split()).encode()).hexdigest()
+
+
+async def evaluate_writing_submission(writing_id: int, user_input: str) -> dict:
+    """
+    Evaluate the learner's text against the writing goal, store the evaluation on
+    the row and award the day's writing points once. Safe to run again: an
+    evaluation stored for the same text is returned as is.
+    """
+    input_hash = writing_input_hash(user_input)
+    db = SessionLocal()
+    try:
+        writing = db.query(Writing).filter(Writing.id == writing_id).first()
+        if writing is None:
+            raise HTTPException(status_code=404, detail="No writing goal found for today")
+        if writing.input_hash == input_hash and writing.evaluation:
+            return {"goal": writing.goal, "evaluation": writing.evaluation}
+        goal = writing.goal
+    finally:
+        db.close()
+
+    messages = [{"role": "system", "content": make_evaluation_prompt(goal, user_input)}]
+    chat = LLMClient().get_client(MODEL_NAME)
+    with llm_call_site("writing_evaluation"):
+        evaluation = await chat.with_structured_output(WritingEvaluation).ainvoke(messages)
+
+    db = SessionLocal()
+    try:
+        writing = db.query(Writing).filter(Writing.id == writing_id).first()
+        writing.user_input = user_input
+        writing.evaluation = evaluation.model_dump()
+        writing.input_hash = input_hash
+        db.commit()
+
+        start, end = day_bounds(date.today())
+        writing_activity = (
+            db.query(ActivityLog)
+            .filter(
+                ActivityLog.user_id == writing.user_id,
+                ActivityLog.activity_type == "writing",
+                ActivityLog.created_at >= start,
+                ActivityLog.created_at < end,
+            )
+            .first()
+        )
+        if writing_activity is None:
+            update_user_stats(db, writing.user_id, evaluation.score + 10, "writing", writing_id)
+    finally:
+        db.close()
+
+    return {"goal": goal, "evaluation": evaluation.model_dump()}
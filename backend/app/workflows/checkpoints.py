@@ -0,0 +1,331 @@
+"""
+Checkpointing for the generation graphs.
+
+Graph state is plain data (ids, profile fields, situation text and the pydantic
+outputs of earlier nodes), so LangGraph can checkpoint it after every node. A
+graph compiled with ``get_checkpointer()`` and run through ``astream_resumable``
+continues an interrupted run on the same thread from the last node that
+finished, instead of starting over.
+
+Checkpoints live in Postgres (``graph_checkpoints``, ``graph_checkpoint_writes``)
+so a retry picks them up on any worker, also after a restart. Threads are deleted
+once their result is stored; ``prune_checkpoints`` drops the ones abandoned after
+``GRAPH_CHECKPOINT_TTL_S``.
+"""
+import asyncio
+import logging
+import random
+from collections.abc import Iterator, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.graph_checkpoint_model import GraphCheckpoint, GraphCheckpointWrite
+
+logger = logging.getLogger(__name__)
+
+_checkpointer: BaseCheckpointSaver | None = None
+
+
+class PostgresCheckpointSaver(BaseCheckpointSaver):
+    """
+    Stores each checkpoint (channel values inline) and the pending writes of its
+    tasks as serialized rows. Like the job queue, every call uses a short session of
+    its own, so no connection is held while a node waits on the LLM.
+    """
+
+    def _tuple(self, db: Any, row: GraphCheckpoint) -> CheckpointTuple:
+        writes = (
+            db.query(GraphCheckpointWrite)
+            .filter(
+                GraphCheckpointWrite.thread_id == row.thread_id,
+                GraphCheckpointWrite.checkpoint_ns == row.checkpoint_ns,
+                GraphCheckpointWrite.checkpoint_id == row.checkpoint_id,
+            )
+            .order_by(GraphCheckpointWrite.task_id, GraphCheckpointWrite.idx)
+            .all()
+        )
+        configurable = {"thread_id": row.thread_id, "checkpoint_ns": row.checkpoint_ns}
+        return CheckpointTuple(
+            config={"configurable": {**configurable, "checkpoint_id": row.checkpoint_id}},
+            checkpoint=self.serde.loads_typed((row.type, row.checkpoint)),
+            metadata=self.serde.loads_typed((row.metadata_type, row.checkpoint_metadata)),
+            parent_config=(
+                {"configurable": {**configurable, "checkpoint_id": row.parent_checkpoint_id}}
+                if row.parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[(w.task_id, w.channel, self.serde.loads_typed((w.type, w.value))) for w in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        configurable = config["configurable"]
+        db = SessionLocal()
+        try:
+            query = db.query(GraphCheckpoint).filter(
+                GraphCheckpoint.thread_id == configurable["thread_id"],
+                GraphCheckpoint.checkpoint_ns == configurable.get("checkpoint_ns", ""),
+            )
+            if checkpoint_id := get_checkpoint_id(config):
+                query = query.filter(GraphCheckpoint.checkpoint_id == checkpoint_id)
+            # Checkpoint ids are time-ordered (uuid6), so the greatest is the latest.
+            row = query.order_by(GraphCheckpoint.checkpoint_id.desc()).first()
+            return self._tuple(db, row) if row else None
+        finally:
+            db.close()
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        db = SessionLocal()
+        try:
+            query = db.query(GraphCheckpoint)
+            if config:
+                configurable = config["configurable"]
+                query = query.filter(GraphCheckpoint.thread_id == configurable["thread_id"])
+                if configurable.get("checkpoint_ns") is not None:
+                    query = query.filter(GraphCheckpoint.checkpoint_ns == configurable["checkpoint_ns"])
+                if checkpoint_id := get_checkpoint_id(config):
+                    query = query.filter(GraphCheckpoint.checkpoint_id == checkpoint_id)
+            if before and (before_id := get_checkpoint_id(before)):
+                query = query.filter(GraphCheckpoint.checkpoint_id < before_id)
+            tuples = []
+            for row in query.order_by(GraphCheckpoint.checkpoint_id.desc()):
+                if limit is not None and len(tuples) >= limit:
+                    break
+                checkpoint_tuple = self._tuple(db, row)
+                if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                tuples.append(checkpoint_tuple)
+        finally:
+            db.close()
+        yield from tuples
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        type_, data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        values = {
+            "parent_checkpoint_id": configurable.get("checkpoint_id"),
+            "type": type_,
+            "checkpoint": data,
+            "metadata_type": metadata_type,
+            "metadata": metadata_data,
+        }
+        db = SessionLocal()
+        try:
+            statement = insert(GraphCheckpoint.__table__).values(
+                thread_id=thread_id, checkpoint_ns=checkpoint_ns, checkpoint_id=checkpoint["id"], **values
+            )
+            db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["thread_id", "checkpoint_ns", "checkpoint_id"], set_=values
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        key = {
+            "thread_id": configurable["thread_id"],
+            "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+            "checkpoint_id": configurable["checkpoint_id"],
+            "task_id": task_id,
+        }
+        db = SessionLocal()
+        try:
+            for idx, (channel, value) in enumerate(writes):
+                type_, data = self.serde.dumps_typed(value)
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                statement = insert(GraphCheckpointWrite.__table__).values(
+                    **key, idx=idx, channel=channel, type=type_, value=data, task_path=task_path
+                )
+                index_elements = ["thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx"]
+                # Regular writes are kept from the first attempt; special ones (errors, interrupts) are replaced.
+                if idx >= 0:
+                    statement = statement.on_conflict_do_nothing(index_elements=index_elements)
+                else:
+                    statement = statement.on_conflict_do_update(
+                        index_elements=index_elements,
+                        set_={"channel": channel, "type": type_, "value": data, "task_path": task_path},
+                    )
+                db.execute(statement)
+            db.commit()
+        finally:
+            db.close()
+
+    def delete_thread(self, thread_id: str) -> None:
+        db = SessionLocal()
+        try:
+            db.query(GraphCheckpointWrite).filter(GraphCheckpointWrite.thread_id == thread_id).delete(
+                synchronize_session=False
+            )
+            db.query(GraphCheckpoint).filter(GraphCheckpoint.thread_id == thread_id).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def prune(self, older_than: timedelta) -> int:
+        """Delete threads whose latest checkpoint is older than ``older_than``; returns how many."""
+        cutoff = datetime.now(timezone.utc) - older_than
+        db = SessionLocal()
+        try:
+            stale = (
+                db.query(GraphCheckpoint.thread_id)
+                .group_by(GraphCheckpoint.thread_id)
+                .having(func.max(GraphCheckpoint.created_at) < cutoff)
+            )
+            thread_ids = [thread_id for (thread_id,) in stale]
+            if thread_ids:
+                db.query(GraphCheckpointWrite).filter(GraphCheckpointWrite.thread_id.in_(thread_ids)).delete(
+                    synchronize_session=False
+                )
+                db.query(GraphCheckpoint).filter(GraphCheckpoint.thread_id.in_(thread_ids)).delete(
+                    synchronize_session=False
+                )
+                db.commit()
+            return len(thread_ids)
+        finally:
+            db.close()
+
+    # The graphs run async; the DB calls run in threads so graph steps never block the event loop.
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """Process-wide checkpoint store: ``GRAPH_CHECKPOINTER`` ("postgres" or "memory") unless ``set_checkpointer`` installed another one."""
+    global _checkpointer
+    if _checkpointer is None:
+        _checkpointer = PostgresCheckpointSaver() if settings.GRAPH_CHECKPOINTER == "postgres" else InMemorySaver()
+    return _checkpointer
+
+
+def set_checkpointer(checkpointer: BaseCheckpointSaver | None) -> None:
+    global _checkpointer
+    _checkpointer = checkpointer
+
+
+def thread_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+async def astream_resumable(graph: Any, initial_state: dict, thread_id: str) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Run ``graph`` on ``thread_id``, yielding (node_name, node_output) as nodes finish.
+    If the thread's last run stopped before END, it is resumed and ``initial_state``
+    is ignored; nodes that already finished do not run (or yield) again.
+    """
+    config = thread_config(thread_id)
+    snapshot = await graph.aget_state(config)
+    if snapshot.next:
+        logger.info(f"Resuming {thread_id} at {', '.join(snapshot.next)}")
+        inputs = None
+    else:
+        inputs = initial_state
+    async for event in graph.astream(inputs, config, stream_mode="updates"):
+        for node_name, node_output in event.items():
+            yield node_name, node_output
+
+
+async def thread_values(graph: Any, thread_id: str) -> dict:
+    """Accumulated state of the thread, including outputs of nodes run before a resume."""
+    snapshot = await graph.aget_state(thread_config(thread_id))
+    return dict(snapshot.values or {})
+
+
+async def delete_thread(thread_id: str) -> None:
+    await get_checkpointer().adelete_thread(thread_id)
+
+
+def prune_checkpoints() -> int:
+    """Drop threads abandoned for longer than GRAPH_CHECKPOINT_TTL_S (their job gave up or the day passed)."""
+    checkpointer = get_checkpointer()
+    if not isinstance(checkpointer, PostgresCheckpointSaver):
+        return 0
+    pruned = checkpointer.prune(timedelta(seconds=settings.GRAPH_CHECKPOINT_TTL_S))
+    if pruned:
+        logger.info(f"Pruned {pruned} abandoned checkpoint threads")
+    return pruned
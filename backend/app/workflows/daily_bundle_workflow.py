@@ -0,0 +1,59 @@
+from functools import lru_cache
+
+from langgraph.graph import StateGraph, START, END
+from app.schemas.agents_schema import DailyBundleState
+from app.workflows.nodes.situation_node import make_situation
+from app.workflows.nodes.lesson_node import make_lesson
+from app.workflows.nodes.vocabs_node import make_vocabs
+from app.workflows.nodes.grammar_node import make_grammar
+from app.workflows.nodes.questions_node import make_question
+from app.workflows.nodes.roleplay_goal_node import make_roleplay_goal
+from app.workflows.nodes.writing_goal_node import make_writing_goal
+from app.core.lazy import on_warm_up
+
+
+def _unless_present(key: str, node):
+    """
+    Skip a node whose output was already stored for the day and preloaded into the
+    state. Presence, not truthiness: a stored lesson may have no grammar ([]).
+    """
+    async def run(state: DailyBundleState):
+        if state.get(key) is not None:
+            return {}
+        return await node(state)
+    return run
+
+
+@on_warm_up
+@lru_cache
+def build_workflow():
+    """
+    situation -> lesson -> vocab
+                        -> grammar -> questions
+                        -> roleplay goal (+ suggested vocab)
+              -> writing goal
+    """
+    workflow = StateGraph(DailyBundleState)
+
+    workflow.add_node("situation_maker", _unless_present("daily_situation", make_situation))
+    workflow.add_node("lesson_maker", _unless_present("lesson", make_lesson))
+    workflow.add_node("vocab_maker", _unless_present("vocabs", make_vocabs))
+    workflow.add_node("grammar_maker", _unless_present("grammar", make_grammar))
+    workflow.add_node("question_maker", _unless_present("questions", make_question))
+    workflow.add_node("roleplay_goal_maker", _unless_present("roleplay_goal", make_roleplay_goal))
+    workflow.add_node("writing_goal_maker", _unless_present("writing_goal", make_writing_goal))
+
+    workflow.add_edge(START, "situation_maker")
+    workflow.add_edge("situation_maker", "lesson_maker")
+    workflow.add_edge("situation_maker", "writing_goal_maker")
+    workflow.add_edge("lesson_maker", "vocab_maker")
+    workflow.add_edge("lesson_maker", "grammar_maker")
+    workflow.add_edge("lesson_maker", "roleplay_goal_maker")
+    # The question prompt builds on the extracted grammar rules.
+    workflow.add_edge("grammar_maker", "question_maker")
+    workflow.add_edge("vocab_maker", END)
+    workflow.add_edge("question_maker", END)
+    workflow.add_edge("roleplay_goal_maker", END)
+    workflow.add_edge("writing_goal_maker", END)
+
+    return workflow.compile()
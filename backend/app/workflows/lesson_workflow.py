@@ -1,18 +1,17 @@
-from typing import Annotated, Literal
+from functools import lru_cache
+
 from langgraph.graph import StateGraph, START, END
-from langgraph.graph.message import add_messages
-from pydantic import BaseModel, Field 
-from typing_extensions import TypedDict 
+from app.core.lazy import on_warm_up
 from app.schemas.agents_schema import State
-from app.schemas.agents_schema import SitationOutput
-from app.models.lesson_model import Lesson
 from app.workflows.nodes.lesson_node import make_lesson
 from app.workflows.nodes.questions_node import make_question
 from app.workflows.nodes.vocabs_node import make_vocabs
 from app.workflows.nodes.grammar_node import make_grammar
-from fastapi import APIRouter
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from app.workflows.checkpoints import get_checkpointer
 
-def build_workflow():
+@lru_cache
+def build_workflow(checkpointer: BaseCheckpointSaver | None = None):
     workflow = StateGraph(State)
 
     workflow.add_node("lesson_maker", make_lesson)
@@ -26,7 +25,10 @@ def build_workflow():
     workflow.add_edge("grammar_maker", "question_maker")
     workflow.add_edge("question_maker", END)
 
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+
+on_warm_up(lambda: build_workflow(get_checkpointer()))
 
 
 
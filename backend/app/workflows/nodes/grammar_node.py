@@ -3,7 +3,7 @@ from app.core.utils import open_yaml
 from app.schemas.agents_schema import State, GrammarOutput
 
 async def make_grammar(state: State):
-    current_user = state["current_user"]
+    user_profile = state["user_profile"]
     
     llm = LLMClient()
     chat = llm.get_client(MODEL_NAME)
@@ -12,8 +12,8 @@ async def make_grammar(state: State):
     yaml_prompts = open_yaml("app/workflows/prompts.yaml")
     p = yaml_prompts['grammar_prompt']
     
-    user_speaking_level = current_user.profile.user_level_speaking
-    user_reading_level = current_user.profile.user_level_reading
+    user_speaking_level = user_profile.user_level_speaking
+    user_reading_level = user_profile.user_level_reading
     
     system_prompt = (
         p.replace("{{ lesson_text }}", lesson)
@@ -5,7 +5,7 @@ from app.core.utils import open_yaml
 from app.schemas.agents_schema import State
 
 async def make_lesson(state:State): 
-    current_user = state["current_user"]
+    user_profile = state["user_profile"]
     daily_situation = state["daily_situation"]
 
     today = date.today()
@@ -15,10 +15,10 @@ async def make_lesson(state:State):
     llm = LLMClient()
     chat = llm.get_client(MODEL_NAME)
     yaml_prompts = open_yaml("app/workflows/prompts.yaml")
-    user_speaking_level = current_user.profile.user_level_speaking
-    user_reading_level = current_user.profile.user_level_reading
-    user_goal = current_user.profile.user_goal
-    user_region = current_user.profile.user_region
+    user_speaking_level = user_profile.user_level_speaking
+    user_reading_level = user_profile.user_level_reading
+    user_goal = user_profile.user_goal
+    user_region = user_profile.user_region
 
     p = yaml_prompts['lesson_prompt']
 
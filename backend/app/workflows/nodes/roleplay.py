@@ -1,19 +1,7 @@
-from app.core.database import get_db 
-from fastapi import APIRouter, Depends, HTTPException
-from app.api.v1.auth import get_current_user
-from app.models.lesson_model import Lesson
-from app.models.user_model import User
-from sqlalchemy.orm import Session
-from datetime import datetime, date,timedelta,timezone
-from app.core.utils import open_yaml
 from app.core.llm import LLMClient, MODEL_NAME
-from app.models.goal_model import Roleplay
 from app.schemas.roleplay_schema import ChatMessage
 from app.schemas.roleplay_schema import RoleplayState
 
-from collections import defaultdict
-from typing import List
-
 def build_system_prompt(title: str, body: str, goal: str,user_role:str,ai_role:str) -> str:
     return f"""
     You are participating in a roleplay conversation.
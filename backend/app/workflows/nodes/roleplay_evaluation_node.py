@@ -1,8 +1,6 @@
 from app.core.llm import LLMClient, MODEL_NAME
 from app.schemas.roleplay_schema import RoleplayState, RoleplayEvaluationOutput
 from app.core.utils import open_yaml
-import json
-import re
 from typing import Any
 
 
@@ -48,21 +46,7 @@ async def evaluate_roleplay(state: RoleplayState | dict):
     llm = LLMClient()
     chat = llm.get_client(MODEL_NAME)
     
-    try:
-        # Primary path: enforce schema via structured output
-        result = await chat.with_structured_output(RoleplayEvaluationOutput).ainvoke(messages)
-    except Exception:
-        # Fallback: ask for raw JSON and parse manually (some free models are flaky with structured output)
-        raw = await chat.ainvoke(messages)
-        text = raw.content if hasattr(raw, "content") else str(raw)
-
-        # Extract first JSON object from the response
-        match = re.search(r"\{[\s\S]*\}", text)
-        if not match:
-            raise
-
-        data = json.loads(match.group(0))
-        result = RoleplayEvaluationOutput(**data)
+    result = await chat.with_structured_output(RoleplayEvaluationOutput).ainvoke(messages)
     
     return {
         "evaluation": result.model_dump(),
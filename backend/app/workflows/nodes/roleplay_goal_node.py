@@ -0,0 +1,69 @@
+from app.core.llm import LLMClient, MODEL_NAME
+from app.core.utils import open_yaml
+from app.schemas.agents_schema import DailyBundleState, Vocabs
+from app.schemas.roleplay_schema import Goal
+
+
+async def make_roleplay_goal(state: DailyBundleState):
+    title = state["lesson"].title
+    text = " ".join(state["lesson"].paragraphs)
+
+    yaml_prompt = open_yaml("app/workflows/prompts.yaml")
+    prompt_block = yaml_prompt["roleplay_goal_generator"]
+
+    system_prompt = prompt_block["system"]
+    human_prompt = prompt_block["human"]
+
+    system_prompt = system_prompt.replace("{{ lesson_title }}", title)
+    system_prompt = system_prompt.replace("{{ lesson_body }}", text)
+
+    human_prompt = human_prompt.replace("{{ lesson_title }}", title)
+    human_prompt = human_prompt.replace("{{ lesson_body }}", text)
+
+    messages = [
+        {
+            "role": "system",
+            "content": system_prompt,
+        },
+        {
+            "role": "user",
+            "content": human_prompt,
+        }
+    ]
+
+    goal_llm = LLMClient()
+    goal_chat = goal_llm.get_client(MODEL_NAME)
+    result = await goal_chat.with_structured_output(Goal).ainvoke(messages)
+
+    vocab_prompt = yaml_prompt.get('vocab_roleplay_prompt', '')
+    vocab_system_prompt = vocab_prompt.replace("{{ goal_text }}", result.goal)
+    vocab_system_prompt = vocab_system_prompt.replace("{{ user_role }}", result.user_role)
+    vocab_system_prompt = vocab_system_prompt.replace("{{ ai_role }}", result.ai_role)
+
+    vocab_messages = [
+        {
+            "role": "system",
+            "content": vocab_system_prompt
+        }
+    ]
+
+    vocab_items = []
+    try:
+        # Malformed or truncated JSON is repaired by the client's structured output, without a re-send.
+        vocab_llm = LLMClient()
+        vocab_chat = vocab_llm.get_client(MODEL_NAME)
+        vocab_result = await vocab_chat.with_structured_output(Vocabs).ainvoke(vocab_messages)
+        vocab_items = vocab_result.vocab
+    except Exception:
+        # The suggested vocab is optional; the goal is kept without it.
+        vocab_items = []
+
+    suggested_vocab = []
+    for vocab_item in vocab_items[:5]:
+        if getattr(vocab_item, "term", None) and getattr(vocab_item, "meaning", None):
+            suggested_vocab.append({
+                "term": vocab_item.term,
+                "meaning": vocab_item.meaning
+            })
+
+    return {"roleplay_goal": result, "roleplay_vocab": suggested_vocab}
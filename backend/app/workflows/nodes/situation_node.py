@@ -0,0 +1,33 @@
+from app.core.lazy import lazy_module
+from app.core.llm import LLMClient, MODEL_NAME
+from app.core.utils import open_yaml
+from app.schemas.agents_schema import DailyBundleState
+from app.schemas.user_schema import SituationOutput
+
+prompts = lazy_module("langchain_core.prompts")
+
+
+async def make_situation(state: DailyBundleState):
+    user_profile = state["user_profile"]
+
+    yaml_prompts = open_yaml("app/workflows/prompts.yaml")
+    p = yaml_prompts['situation_generate']
+    prompt = prompts.ChatPromptTemplate.from_messages([
+        ("system", p["system"]),
+        ("human", p["human"]),
+    ])
+
+    messages = prompt.invoke({
+        "name": state["user_name"],
+        "speaking": user_profile.user_level_speaking,
+        "reading": user_profile.user_level_reading,
+        "goal": user_profile.user_goal,
+        "region": user_profile.user_region,
+        "last_seven_days_situations": state.get("recent_situations", []),
+    })
+
+    llm = LLMClient()
+    chat = llm.get_client(MODEL_NAME)
+    result = await chat.with_structured_output(SituationOutput).ainvoke(messages)
+
+    return {"daily_situation": result.situation}
@@ -0,0 +1,61 @@
+from app.core.llm import LLMClient, MODEL_NAME
+from app.schemas.agents_schema import DailyBundleState
+from app.schemas.writing_schema import Goal
+
+
+def make_prompt(daily_situation: str) -> str:
+    return f"""
+You are a goal-setting assistant for a German learning app.
+
+Your job is to generate a NEW writing goal based ONLY on the provided daily situation.
+
+IMPORTANT:
+- Do NOT reuse or repeat any of the example goals.
+- Do NOT copy example wording.
+- The output must be completely adapted to the given situation.
+- If the situation is different, the goal must also be different.
+
+The goal must:
+- Be written in English
+- Describe WHAT the user should write
+- Specify WHO it is for (if relevant)
+- Explain WHY it is written
+- Mention the TYPE of text
+- Indicate the TONE
+
+Output rules:
+- Output ONLY the goal
+- 1–2 sentences maximum
+- No explanations
+- No formatting
+- No examples
+
+--- EXAMPLES (for structure reference only, DO NOT reuse) ---
+
+Daily situation: I was sick today and missed university.
+Goal: Write a formal email to your professor explaining that you were sick and missed class and politely ask for the materials.
+
+Daily situation: I want to reflect on my first week in Austria.
+Goal: Write a short diary entry about your first week in Austria and describe your feelings and impressions.
+
+--- END OF EXAMPLES ---
+
+Now generate a goal based strictly on this situation:
+
+Daily situation:
+{daily_situation}
+""".strip()
+
+
+async def make_writing_goal(state: DailyBundleState):
+    messages = [
+        {
+            "role": "system",
+            "content": make_prompt(state["daily_situation"]),
+        }
+    ]
+    llm = LLMClient()
+    chat = llm.get_client(MODEL_NAME)
+    result = await chat.with_structured_output(Goal).ainvoke(messages)
+
+    return {"writing_goal": result.goal}
@@ -1,20 +1,24 @@
 from typing import Annotated, Literal
+from functools import lru_cache
+
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from pydantic import BaseModel, Field 
 from typing_extensions import TypedDict 
 from app.schemas.agents_schema import SitationOutput
-from app.models.lesson_model import Lesson
 from app.workflows.nodes.roleplay import chat
 from app.schemas.roleplay_schema import RoleplayState
 from app.workflows.nodes.check_db_end_node import check_db_end_status
 from app.workflows.nodes.roleplay_evaluation_node import evaluate_roleplay
+from app.core.lazy import on_warm_up
 
 def should_evaluate(state: RoleplayState):
     if state.done:
         return "evaluate"
     return "end"
 
+@on_warm_up
+@lru_cache
 def build_workflow():
     workflow = StateGraph(RoleplayState)
 
@@ -0,0 +1,74 @@
+"""
+Compare two benchmark reports and flag regressions.
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json
+
+Exits with status 1 when a scenario's p95 latency grows by more than
+``--latency-threshold`` or when it runs more DB queries or LLM calls per request.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+LATENCY_FLOOR_MS = 5.0
+
+
+def load(path: Path) -> dict:
+    return json.loads(path.read_text())
+
+
+def compare(base: dict, new: dict, latency_threshold: float) -> tuple[list[str], list[str]]:
+    rows: list[str] = []
+    regressions: list[str] = []
+    header = f"{'scenario':<18} {'p95 base':>10} {'p95 new':>10} {'delta':>8} {'db/req':>13} {'llm/req':>13}"
+    rows.append(header)
+
+    for name, new_summary in new["scenarios"].items():
+        base_summary = base["scenarios"].get(name)
+        if base_summary is None:
+            rows.append(f"{name:<18} (new scenario)")
+            continue
+
+        base_p95 = base_summary.get("p95_ms") or 0.0
+        new_p95 = new_summary.get("p95_ms") or 0.0
+        delta = (new_p95 - base_p95) / base_p95 if base_p95 else 0.0
+        base_db, new_db = base_summary.get("db_queries_per_request"), new_summary.get("db_queries_per_request")
+        base_llm, new_llm = base_summary.get("llm_calls_per_request"), new_summary.get("llm_calls_per_request")
+        rows.append(
+            f"{name:<18} {base_p95:>10.1f} {new_p95:>10.1f} {delta:>+8.1%} "
+            f"{str(base_db):>6}->{str(new_db):<6} {str(base_llm):>6}->{str(new_llm):<6}"
+        )
+
+        if delta > latency_threshold and new_p95 - base_p95 > LATENCY_FLOOR_MS:
+            regressions.append(f"{name}: p95 {base_p95:.1f}ms -> {new_p95:.1f}ms ({delta:+.1%})")
+        if base_db is not None and new_db is not None and new_db > base_db:
+            regressions.append(f"{name}: db queries/request {base_db} -> {new_db}")
+        if base_llm is not None and new_llm is not None and new_llm > base_llm:
+            regressions.append(f"{name}: llm calls/request {base_llm} -> {new_llm}")
+        if new_summary.get("errors", 0) > base_summary.get("errors", 0):
+            regressions.append(f"{name}: errors {base_summary.get('errors', 0)} -> {new_summary['errors']}")
+
+    return rows, regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("base", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument("--latency-threshold", type=float, default=0.10, help="allowed relative p95 growth")
+    args = parser.parse_args(argv)
+
+    rows, regressions = compare(load(args.base), load(args.new), args.latency_threshold)
+    print("\n".join(rows))
+    if regressions:
+        print("\nRegressions:")
+        print("\n".join(f"  - {r}" for r in regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
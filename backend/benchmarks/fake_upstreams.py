@@ -0,0 +1,298 @@
+"""
+Fake OpenRouter / Google TTS / Google Translate upstreams for benchmarks.
+
+The LLM endpoint speaks the OpenAI chat-completions protocol. Structured-output
+calls (``response_format: json_schema`` or ``tools``) get a response generated
+from the requested JSON schema, so every pydantic schema in the app parses
+without per-schema fixtures. Plain chat calls get a short German reply. ``GET /v1/subscriptions/{id}`` serves
+the Stripe subscriptions put in ``stripe_subscriptions``.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+FILLER_WORDS = (
+    "heute", "gehst", "du", "zum", "Bahnhof", "und", "kaufst", "eine", "Fahrkarte",
+    "nach", "Berlin", "der", "Zug", "fährt", "um", "neun", "Uhr", "ab", "später",
+    "triffst", "deine", "Freundin", "im", "Café", "ihr", "bestellt", "Kuchen",
+)
+
+# Minimal valid MPEG audio frame header followed by silence.
+FAKE_MP3 = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+@dataclass
+class UpstreamConfig:
+    llm_latency_ms: float = 0.0
+    llm_jitter_ms: float = 0.0
+    # Share of LLM calls that take llm_tail_ms extra, like a free model's latency tail.
+    llm_tail_rate: float = 0.0
+    llm_tail_ms: float = 0.0
+    words_per_string: int = 8
+    items_per_array: int = 4
+    # Concurrent LLM requests beyond this get a 429, like a provider rate limit (0 = unlimited).
+    llm_max_concurrency: int = 0
+    # Models that answer 503, to exercise fallback chains.
+    llm_down_models: tuple[str, ...] = ()
+    # Share of structured replies that come back fenced, wrapped in prose, with
+    # trailing commas or cut off at the token limit, like flaky free models.
+    llm_malformed_rate: float = 0.0
+    seed: int = 0
+
+
+@dataclass
+class UpstreamStats:
+    llm_calls: int = 0
+    llm_structured_calls: int = 0
+    llm_rate_limited: int = 0
+    llm_unavailable: int = 0
+    llm_malformed: int = 0
+    llm_peak_concurrency: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tts_calls: int = 0
+    translate_calls: int = 0
+    stripe_calls: int = 0
+    by_model: dict[str, int] = field(default_factory=dict)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "llm_calls": self.llm_calls,
+            "llm_structured_calls": self.llm_structured_calls,
+            "llm_rate_limited": self.llm_rate_limited,
+            "llm_unavailable": self.llm_unavailable,
+            "llm_malformed": self.llm_malformed,
+            "llm_peak_concurrency": self.llm_peak_concurrency,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tts_calls": self.tts_calls,
+            "translate_calls": self.translate_calls,
+            "stripe_calls": self.stripe_calls,
+            "by_model": dict(self.by_model),
+        }
+
+
+config = UpstreamConfig()
+stats = UpstreamStats()
+_rng = random.Random(config.seed)
+_llm_inflight = 0
+# Stripe subscription id -> its current fields ("status", "current_period_end", ...)
+stripe_subscriptions: dict[str, dict] = {}
+
+
+def llm_inflight() -> int:
+    return _llm_inflight
+
+
+def configure(**kwargs: Any) -> None:
+    global _rng
+    for key, value in kwargs.items():
+        setattr(config, key, value)
+    _rng = random.Random(config.seed)
+
+
+def _sentence(words: int) -> str:
+    return " ".join(_rng.choice(FILLER_WORDS) for _ in range(max(words, 1))).capitalize() + "."
+
+
+def _resolve(schema: dict, defs: dict) -> dict:
+    ref = schema.get("$ref")
+    if ref:
+        return defs.get(ref.split("/")[-1], {})
+    return schema
+
+
+def sample_from_schema(schema: dict, defs: dict | None = None, name: str = "", index: int = 0) -> Any:
+    """Build a plausible instance of ``schema`` (the subset pydantic emits)."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    schema = _resolve(schema, defs)
+
+    if "enum" in schema:
+        return schema["enum"][index % len(schema["enum"])]
+    if "const" in schema:
+        return schema["const"]
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [s for s in schema[key] if _resolve(s, defs).get("type") != "null"]
+            return sample_from_schema(options[0] if options else schema[key][0], defs, name, index)
+
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+
+    if kind == "object" or "properties" in schema:
+        return {
+            prop: sample_from_schema(sub, defs, prop, index)
+            for prop, sub in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        count = max(schema.get("minItems", config.items_per_array), 1)
+        return [sample_from_schema(schema.get("items", {}), defs, name, i) for i in range(count)]
+    if kind == "integer":
+        if name in ("id", "question_id"):
+            return index + 1
+        if name == "correct_option_index":
+            return index % config.items_per_array
+        low = schema.get("minimum", 0)
+        high = schema.get("maximum", 100)
+        return _rng.randint(max(low, min(60, high)), high)
+    if kind == "number":
+        return round(_rng.uniform(0, 1), 3)
+    if kind == "boolean":
+        return index % 2 == 0
+    if kind == "null":
+        return None
+    return _sentence(config.words_per_string)
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+def _plain_reply(messages: list[dict]) -> str:
+    last = str(messages[-1].get("content", "")) if messages else ""
+    if "YES or NO" in last:
+        return "NO"
+    return _sentence(config.words_per_string * 2)
+
+
+def _completion(model: str, message: dict, finish_reason: str, prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+app = FastAPI(title="Jonas fake upstreams")
+
+
+@app.post("/api/v1/chat/completions")
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    global _llm_inflight
+    if config.llm_max_concurrency and _llm_inflight >= config.llm_max_concurrency:
+        stats.llm_rate_limited += 1
+        return JSONResponse(
+            {"error": {"message": "Rate limit exceeded", "code": 429}},
+            status_code=429,
+            headers={"retry-after-ms": "200"},
+        )
+    _llm_inflight += 1
+    stats.llm_peak_concurrency = max(stats.llm_peak_concurrency, _llm_inflight)
+    try:
+        return await _complete(await request.json())
+    finally:
+        _llm_inflight -= 1
+
+
+async def _complete(body: dict) -> JSONResponse:
+    model = body.get("model", "fake")
+    messages = body.get("messages", [])
+    if model in config.llm_down_models:
+        stats.llm_unavailable += 1
+        return JSONResponse({"error": {"message": f"{model} is unavailable", "code": 503}}, status_code=503)
+
+    delay = config.llm_latency_ms + _rng.uniform(-config.llm_jitter_ms, config.llm_jitter_ms)
+    if config.llm_tail_rate and _rng.random() < config.llm_tail_rate:
+        delay += config.llm_tail_ms
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    response_format = body.get("response_format") or {}
+    tools = body.get("tools") or []
+    prompt_tokens = _estimate_tokens(json.dumps(messages, ensure_ascii=False))
+
+    if response_format.get("type") == "json_schema":
+        schema = response_format["json_schema"]["schema"]
+        content = json.dumps(sample_from_schema(schema), ensure_ascii=False)
+        finish_reason = "stop"
+        if config.llm_malformed_rate and _rng.random() < config.llm_malformed_rate:
+            content, finish_reason = _malform(content)
+        message = {"role": "assistant", "content": content}
+        structured = True
+    elif tools:
+        function = tools[0]["function"]
+        arguments = json.dumps(sample_from_schema(function.get("parameters", {})), ensure_ascii=False)
+        content = arguments
+        message = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": function["name"], "arguments": arguments},
+            }],
+        }
+        finish_reason = "tool_calls"
+        structured = True
+    else:
+        content = _plain_reply(messages)
+        message = {"role": "assistant", "content": content}
+        finish_reason = "stop"
+        structured = False
+
+    completion_tokens = _estimate_tokens(content)
+    stats.llm_calls += 1
+    stats.llm_structured_calls += int(structured)
+    stats.prompt_tokens += prompt_tokens
+    stats.completion_tokens += completion_tokens
+    stats.by_model[model] = stats.by_model.get(model, 0) + 1
+
+    return JSONResponse(_completion(model, message, finish_reason, prompt_tokens, completion_tokens))
+
+
+def _malform(content: str) -> tuple[str, str]:
+    """Break a JSON reply the way free models do; returns (content, finish_reason)."""
+    stats.llm_malformed += 1
+    kind = _rng.choice(("fenced", "prose", "trailing_comma", "truncated"))
+    if kind == "fenced":
+        return f"```json\n{content}\n```", "stop"
+    if kind == "prose":
+        return f"Here is the JSON you asked for:\n{content}\nLet me know if you need anything else.", "stop"
+    if kind == "trailing_comma":
+        return content.replace("]", ",]").replace("}", ",}"), "stop"
+    return content[: max(1, int(len(content) * _rng.uniform(0.85, 0.98)))], "length"
+
+
+@app.get("/translate_tts")
+async def translate_tts():
+    stats.tts_calls += 1
+    return Response(content=FAKE_MP3, media_type="audio/mpeg")
+
+
+@app.get("/translate_a/single")
+async def translate(q: str = ""):
+    stats.translate_calls += 1
+    return [[[f"[en] {q}", q, None, None, 10]], None, "de"]
+
+
+@app.get("/v1/subscriptions/{subscription_id}")
+async def stripe_subscription(subscription_id: str):
+    stats.stripe_calls += 1
+    subscription = stripe_subscriptions.get(subscription_id)
+    if subscription is None:
+        error = {"type": "invalid_request_error", "message": f"No such subscription: '{subscription_id}'"}
+        return JSONResponse({"error": error}, status_code=404)
+    return {"id": subscription_id, "object": "subscription", **subscription}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats.snapshot()
@@ -0,0 +1,255 @@
+"""
+Daily-user scenarios driven by the benchmark runner.
+
+Each scenario is one step of a learner's day. The runner executes a scenario for
+every virtual user (bounded by the concurrency limit) before moving on to the
+next one, so DB and LLM counters can be attributed to a single scenario.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+API = "/api/v1"
+
+
+@dataclass
+class VirtualUser:
+    email: str
+    password: str
+    full_name: str
+    token: str | None = None
+    lesson: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+
+@dataclass
+class Recorder:
+    latencies_ms: list[float] = field(default_factory=list)
+    first_event_ms: list[float] = field(default_factory=list)
+    # Submit-to-result time of work answered with 202 (--respond-async).
+    completed_ms: list[float] = field(default_factory=list)
+    errors: int = 0
+    error_samples: list[str] = field(default_factory=list)
+
+    def fail(self, message: str) -> None:
+        self.errors += 1
+        if len(self.error_samples) < 5:
+            self.error_samples.append(message[:300])
+
+
+async def timed_request(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    method: str,
+    url: str,
+    user: VirtualUser | None = None,
+    expect: tuple[int, ...] = (200,),
+    **kwargs: Any,
+) -> httpx.Response:
+    headers = {**(user.headers if user else {}), **kwargs.pop("headers", {})}
+    start = time.perf_counter()
+    response = await client.request(method, url, headers=headers, **kwargs)
+    recorder.latencies_ms.append((time.perf_counter() - start) * 1000)
+    if response.status_code not in expect:
+        recorder.fail(f"{method} {url} -> {response.status_code}: {response.text}")
+    return response
+
+
+async def signup(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    await timed_request(
+        client, recorder, "POST", f"{API}/auth/signup",
+        json={"email": user.email, "password": user.password, "full_name": user.full_name},
+        expect=(201,),
+    )
+
+
+async def login(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    response = await timed_request(
+        client, recorder, "POST", f"{API}/auth/login",
+        json={"email": user.email, "password": user.password},
+    )
+    if response.status_code == 200:
+        user.token = response.json()["access_token"]
+
+
+async def create_profile(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    await timed_request(
+        client, recorder, "POST", f"{API}/users/userprofile", user,
+        json={
+            "user_goal": "Alltag in Deutschland meistern",
+            "user_level_speaking": "A2",
+            "user_level_reading": "B1",
+            "user_region": "Berlin",
+        },
+    )
+
+
+async def daily_situation(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    await timed_request(client, recorder, "GET", f"{API}/users/dailysituation", user)
+
+
+async def stream_until_complete(
+    client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, path: str
+) -> dict[str, Any] | None:
+    """Read an SSE endpoint to the end; returns the `complete` event's data."""
+    start = time.perf_counter()
+    first_event = None
+    final: dict[str, Any] | None = None
+    async with client.stream("GET", f"{API}{path}", headers=user.headers) as response:
+        if response.status_code != 200:
+            await response.aread()
+            recorder.latencies_ms.append((time.perf_counter() - start) * 1000)
+            recorder.fail(f"GET {path} -> {response.status_code}: {response.text}")
+            return None
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            if first_event is None:
+                first_event = (time.perf_counter() - start) * 1000
+            final = json.loads(line[len("data: "):])
+    recorder.latencies_ms.append((time.perf_counter() - start) * 1000)
+    if first_event is not None:
+        recorder.first_event_ms.append(first_event)
+    if not final or final.get("type") != "complete":
+        recorder.fail(f"{path} ended with {final}")
+        return None
+    return final["data"]
+
+
+async def create_lesson(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    data = await stream_until_complete(client, recorder, user, "/agents/create_lesson")
+    if data is not None:
+        user.lesson = data
+
+
+async def daily_bundle(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    data = await stream_until_complete(client, recorder, user, "/agents/daily_bundle")
+    if data is not None:
+        user.lesson = data["lesson"]
+
+
+async def submit_evaluation(
+    client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict, path: str, **kwargs: Any
+) -> None:
+    """POST an evaluation; with --respond-async it is answered with 202 and the job is polled to the end."""
+    if not ctx.get("respond_async"):
+        await timed_request(client, recorder, "POST", f"{API}{path}", user, **kwargs)
+        return
+    start = time.perf_counter()
+    response = await timed_request(
+        client, recorder, "POST", f"{API}{path}", user, headers={"Prefer": "respond-async"}, expect=(200, 202),
+        **kwargs,
+    )
+    if response.status_code != 202:
+        return
+    job_url = response.headers["location"]
+    while True:
+        job = (await client.get(job_url, headers=user.headers)).json()
+        if job["status"] in ("succeeded", "failed"):
+            break
+        await asyncio.sleep(0.05)
+    recorder.completed_ms.append((time.perf_counter() - start) * 1000)
+    if job["status"] != "succeeded":
+        recorder.fail(f"POST {path} job {job['id']} failed: {job['error']}")
+
+
+async def evaluate_lesson(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    answers = []
+    for question in user.lesson.get("questions", []):
+        answer = "0" if question.get("type") == "mcq" else "Ich kaufe eine Fahrkarte am Bahnhof."
+        answers.append({"question_id": question["id"], "answer": answer})
+    await submit_evaluation(client, recorder, user, ctx, "/agents/evaluate_lesson", json={"answers": answers})
+
+
+async def roleplay_goal(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    await timed_request(client, recorder, "GET", f"{API}/roleplay/goal", user)
+
+
+async def roleplay_chat(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    for turn in range(ctx["chat_turns"]):
+        await timed_request(
+            client, recorder, "POST", f"{API}/roleplay/chat", user,
+            json={"user_input": f"Guten Tag! Ich möchte bitte eine Fahrkarte nach Berlin kaufen. ({turn})"},
+        )
+
+
+async def roleplay_finish(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    await submit_evaluation(client, recorder, user, ctx, "/roleplay/finish")
+
+
+async def writing_goal(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    await timed_request(client, recorder, "GET", f"{API}/writing/create_goal", user)
+
+
+async def writing_evaluate(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    await timed_request(
+        client, recorder, "POST", f"{API}/writing/evaluate", user,
+        json={"user_input": "Sehr geehrte Frau Müller, leider kann ich morgen nicht kommen, weil ich krank bin."},
+    )
+
+
+async def teacher_chat(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    await timed_request(
+        client, recorder, "POST", f"{API}/teacher/chat", user,
+        json={"message": "Wann benutze ich den Dativ nach 'mit'?"},
+    )
+
+
+async def stats(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    await timed_request(client, recorder, "GET", f"{API}/stats/me", user)
+    await timed_request(client, recorder, "GET", f"{API}/stats/today-activities", user)
+    await timed_request(client, recorder, "GET", f"{API}/stats/activity-heatmap", user)
+
+
+async def leaderboard(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    await timed_request(client, recorder, "GET", f"{API}/stats/leaderboard", user)
+
+
+async def today(client: httpx.AsyncClient, recorder: Recorder, user: VirtualUser, ctx: dict) -> None:
+    """Dashboard load, then a poll revalidated with If-None-Match."""
+    response = await timed_request(client, recorder, "GET", f"{API}/today", user)
+    etag = response.headers.get("etag")
+    if etag:
+        await timed_request(
+            client, recorder, "GET", f"{API}/today", user, headers={"If-None-Match": etag}, expect=(304,)
+        )
+
+
+ScenarioFn = Callable[[httpx.AsyncClient, Recorder, VirtualUser, dict], Awaitable[None]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: ScenarioFn
+    # Scenarios that change what later ones measure only run when named in --scenarios.
+    default: bool = True
+
+
+SCENARIOS: list[Scenario] = [
+    Scenario("signup", signup),
+    Scenario("login", login),
+    Scenario("profile", create_profile),
+    Scenario("daily_bundle", daily_bundle, default=False),
+    Scenario("daily_situation", daily_situation),
+    Scenario("create_lesson", create_lesson),
+    Scenario("evaluate_lesson", evaluate_lesson),
+    Scenario("roleplay_goal", roleplay_goal),
+    Scenario("roleplay_chat", roleplay_chat),
+    Scenario("roleplay_finish", roleplay_finish),
+    Scenario("writing_goal", writing_goal),
+    Scenario("writing_evaluate", writing_evaluate),
+    Scenario("teacher_chat", teacher_chat),
+    Scenario("stats", stats),
+    Scenario("leaderboard", leaderboard),
+    Scenario("today", today),
+]
@@ -0,0 +1,94 @@
+"""
+Local SMTP sink for benchmarks: accepts every message and keeps it in memory.
+
+Speaks just enough SMTP for aiosmtplib (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP,
+QUIT; no TLS or AUTH, so run the app with MAIL_STARTTLS and USE_CREDENTIALS off).
+``latency_ms`` delays each accepted message like a real relay, and
+``fail_rate`` answers that share of messages with a temporary 451 error.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class SinkStats:
+    connections: int = 0
+    messages: int = 0
+    rejected: int = 0
+    recipients: list[str] = field(default_factory=list)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"connections": self.connections, "messages": self.messages, "rejected": self.rejected}
+
+
+class SMTPSink:
+    def __init__(self, latency_ms: float = 0.0, fail_rate: float = 0.0, seed: int = 0) -> None:
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.stats = SinkStats()
+        self._rng = random.Random(seed)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats.connections += 1
+
+        async def reply(line: str) -> None:
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 smtp-sink ESMTP")
+        recipients: list[str] = []
+        try:
+            while line := await reader.readline():
+                command = line.decode(errors="replace").strip()
+                verb = command[:4].upper()
+                if verb == "EHLO":
+                    await reply("250-smtp-sink\r\n250-PIPELINING\r\n250-8BITMIME\r\n250 SMTPUTF8")
+                elif verb in ("HELO", "NOOP"):
+                    await reply("250 OK")
+                elif verb == "MAIL" or verb == "RSET":
+                    recipients = []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command.partition(":")[2].strip().strip("<>"))
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    while (await reader.readline()).rstrip(b"\r\n") != b".":
+                        pass
+                    if self.latency_ms:
+                        await asyncio.sleep(self.latency_ms / 1000)
+                    if self._rng.random() < self.fail_rate:
+                        self.stats.rejected += 1
+                        await reply("451 Temporary failure, try again later")
+                    else:
+                        self.stats.messages += 1
+                        self.stats.recipients.extend(recipients)
+                        await reply("250 OK queued")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def start(self, port: int, host: str = "127.0.0.1") -> None:
+        """Serve on ``port`` from a daemon thread; returns once it is listening."""
+        ready = threading.Event()
+
+        async def serve() -> None:
+            server = await asyncio.start_server(self._handle, host, port)
+            ready.set()
+            async with server:
+                await server.serve_forever()
+
+        threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+        if not ready.wait(10):
+            raise RuntimeError(f"SMTP sink on port {port} failed to start")
@@ -1,16 +1,46 @@
-from fastapi import FastAPI
+import asyncio
+import hmac
+import ipaddress
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
-from app.api.v1 import auth, users, agents, stats, roleplay, writing, teacher, subscription
-import stripe
+from app.core.admission import AdmissionMiddleware, REQUESTS_SHED
+from app.core.database import engine
+from app.core.lazy import warm_up
+from app.core.db_tracing import DBQueryMiddleware, QUERIES_HEADER, QUERY_TIME_HEADER, REPEATED_HEADER, instrument_engine
+from app.core.llm import LLMDeadlineExceeded, LLMRequestDeadlineExceeded
+from app.core.llm_tracing import LLMTraceMiddleware, TRACE_HEADER
+from app.core.metrics import REGISTRY
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.api.v1 import auth, users, agents, stats, roleplay, writing, teacher, subscription, jobs, today
+from app.api.v1.jobs import RESPOND_ASYNC, JobPending, prefers_async
+from app.jobs.worker import WorkerThread
 import logging
 
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.WARM_UP_ON_STARTUP:
+        # Not awaited: the app serves (and passes health checks) while the LLM stack loads.
+        app.state.warm_up = asyncio.create_task(asyncio.to_thread(warm_up))
+    worker_thread = None
+    if settings.JOBS_RUN_IN_API:
+        worker_thread = WorkerThread(settings.JOBS_WORKER_CONCURRENCY)
+        worker_thread.start()
+    yield
+    if worker_thread is not None:
+        await asyncio.to_thread(worker_thread.shutdown)
+
+
 app = FastAPI(
     title="Jonas API",
     description="German Language Learning Platform API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 logger.info(f"OpenRouter key loaded: {bool(settings.OPENROUTER_API_KEY)}")
@@ -20,18 +50,26 @@ if settings.OPENROUTER_API_KEY:
 else:
     logger.warning("OPENROUTER_API_KEY not set - LLM features will not work")
 
+# The stripe module itself is imported and configured on first use (app/services/subscription_service.py).
 if settings.STRIPE_SECRET_KEY:
-    stripe.api_key = settings.STRIPE_SECRET_KEY
     logger.info("Stripe API key configured")
 else:
     logger.warning("STRIPE_SECRET_KEY not set - subscription features will not work")
 
+instrument_engine(engine)
+app.add_middleware(DBQueryMiddleware)
+app.add_middleware(LLMTraceMiddleware)
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        TRACE_HEADER, QUERIES_HEADER, QUERY_TIME_HEADER, REPEATED_HEADER,
+        "Server-Timing", "Retry-After", "Location", "ETag", NEXT_CURSOR_HEADER,
+    ],
 )
 
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
@@ -42,6 +80,36 @@ app.include_router(roleplay.router, prefix="/api/v1/roleplay", tags=["roleplay"]
 app.include_router(writing.router, prefix="/api/v1/writing", tags=["writing"])
 app.include_router(teacher.router, prefix="/api/v1/teacher", tags=["teacher"])
 app.include_router(subscription.router, prefix="/api/v1/subscription", tags=["subscription"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["jobs"])
+app.include_router(today.router, prefix="/api/v1/today", tags=["today"])
+
+@app.exception_handler(LLMDeadlineExceeded)
+async def llm_deadline_exceeded(request: Request, exc: LLMDeadlineExceeded):
+    REQUESTS_SHED.inc(route=request.url.path, reason="llm_deadline")
+    retry_after = settings.ADMISSION_RETRY_AFTER_S
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly.", "reason": "llm_deadline", "retry_after": retry_after},
+        headers={"Retry-After": str(retry_after)},
+    )
+
+@app.exception_handler(LLMRequestDeadlineExceeded)
+async def llm_request_deadline_exceeded(request: Request, exc: LLMRequestDeadlineExceeded):
+    return JSONResponse(
+        status_code=504,
+        content={"detail": "The model took too long to answer, please try again.", "reason": "llm_request_deadline"},
+    )
+
+@app.exception_handler(JobPending)
+async def job_pending(request: Request, exc: JobPending):
+    headers = {"Location": f"/api/v1/jobs/{exc.job.id}"}
+    if prefers_async(request.headers.get("prefer")):
+        headers["Preference-Applied"] = RESPOND_ASYNC
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": exc.job.id, "status": exc.job.status, "events": f"/api/v1/jobs/{exc.job.id}/events"},
+        headers=headers,
+    )
 
 @app.get("/")
 async def root():
@@ -50,3 +118,24 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+METRICS_NETWORKS = [ipaddress.ip_network(network) for network in settings.METRICS_ALLOWED_NETWORKS]
+
+
+def metrics_allowed(request: Request) -> bool:
+    if settings.METRICS_TOKEN and hmac.compare_digest(
+        request.headers.get("authorization", "").encode(), f"Bearer {settings.METRICS_TOKEN}".encode()
+    ):
+        return True
+    try:
+        client = ipaddress.ip_address(request.client.host) if request.client else None
+    except ValueError:
+        return False
+    return client is not None and any(client in network for network in METRICS_NETWORKS)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    # Per-route traffic, latencies and LLM spend; not for the public.
+    if not metrics_allowed(request):
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
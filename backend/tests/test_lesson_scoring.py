@@ -0,0 +1,79 @@
+import pytest
+
+from app.schemas.agents_schema import EvaluateLessonOutput, QuestionFeedback
+from app.services.lesson_service import _chosen_option, has_answer_key, merge_evaluation, score_mcq
+
+
+def mcq(question_id, options, correct, question="Pick one"):
+    return {"id": question_id, "type": "mcq", "question": question, "options": options, "correct_option_index": correct}
+
+
+@pytest.mark.parametrize(
+    ("options", "answer", "chosen"),
+    [
+        (["Paris", "Rome"], "1", 1),
+        (["Paris", "Rome"], "rome", 1),
+        (["Paris", "Rome"], "ROME", 1),
+        (["1989", "1990", "1991"], "1990", 1),
+        (["1", "2", "3"], "3", 2),
+        (["3", "2", "1"], "1", 2),
+        (["Paris", "Rome"], "2", None),
+        (["Paris", "Rome"], "Berlin", None),
+        (["Paris", "Rome"], "", None),
+    ],
+)
+def test_chosen_option_prefers_option_text_over_an_index(options, answer, chosen):
+    assert _chosen_option(mcq(1, options, 0), answer) == chosen
+
+
+def test_score_mcq():
+    question = mcq(4, ["1989", "1990", "1991"], 1)
+    assert score_mcq(question, "1990").correct
+    assert score_mcq(question, "1").correct
+    assert not score_mcq(question, "2").correct
+    assert score_mcq(question, "0").correct_option_index == 1
+
+
+def test_has_answer_key():
+    assert has_answer_key(mcq(1, ["a", "b"], 1))
+    assert not has_answer_key(mcq(1, ["a", "b"], 2))
+    assert not has_answer_key(mcq(1, ["a", "b"], None))
+    assert not has_answer_key({"id": 1, "type": "open", "question": "Why?"})
+
+
+QUESTIONS = [
+    mcq(1, ["a", "b"], 0, "Q1"),
+    mcq(2, ["a", "b"], 1, "Q2"),
+    {"id": 3, "type": "open", "question": "Q3"},
+]
+LOCAL = [
+    QuestionFeedback(question_id=1, correct=True, correct_option_index=0),
+    QuestionFeedback(question_id=2, correct=False, correct_option_index=1),
+]
+
+
+def test_merge_evaluation_without_the_llm_scores_mcqs_only():
+    result = merge_evaluation(QUESTIONS[:2], LOCAL, None)
+    assert result.score == 50
+    assert result.summary.startswith("You answered 1 of 2 questions correctly.")
+    assert result.focus_areas == ["Review: Q2"]
+    assert [f.question_id for f in result.per_question] == [1, 2]
+
+
+def test_merge_evaluation_weights_the_llm_score_by_its_questions():
+    remote = EvaluateLessonOutput(
+        score=130,
+        summary="Nice work",
+        focus_areas=["Articles"],
+        per_question=[QuestionFeedback(question_id=3, correct=True, ideal_answer="Because")],
+    )
+    result = merge_evaluation(QUESTIONS, LOCAL, remote)
+    # One MCQ right out of two, plus the open question clamped to 100.
+    assert result.score == round((100 + 100) / 3)
+    assert result.summary == "Nice work"
+    assert result.focus_areas == ["Articles"]
+    assert [f.question_id for f in result.per_question] == [1, 2, 3]
+
+
+def test_merge_evaluation_with_no_questions():
+    assert merge_evaluation([], [], None).score == 0
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.core.pagination import NEXT_CURSOR_HEADER, Page, decode_cursor, encode_cursor, finish_page, keyset, page_params
+from app.models.lesson_model import Lesson
+
+NOW = datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(NOW, 42)) == (NOW, 42)
+
+
+def test_cursor_keeps_rows_with_equal_timestamps_apart():
+    first, second = encode_cursor(NOW, 7), encode_cursor(NOW, 8)
+    assert first != second
+    assert decode_cursor(first) < decode_cursor(second)
+
+
+def test_cursor_keeps_the_utc_offset():
+    local = NOW.astimezone(timezone(timedelta(hours=-5)))
+    created_at, _ = decode_cursor(encode_cursor(local, 1))
+    assert created_at.utcoffset() == timedelta(hours=-5)
+    assert created_at == NOW
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor(NOW, 1)[:-4], "bm9waXBl"])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_page_params_without_cursor_or_limit_returns_the_whole_list():
+    dependency = page_params(default_limit=30)
+    assert dependency(cursor=None, limit=None) == Page(limit=None)
+    assert dependency(cursor=None, limit=5) == Page(limit=5)
+    assert dependency(cursor=encode_cursor(NOW, 3), limit=None) == Page(limit=30, after=(NOW, 3))
+
+
+def _rows(count):
+    # Equal timestamps: only the id orders them.
+    return [SimpleNamespace(created_at=NOW, id=row_id) for row_id in range(count, 0, -1)]
+
+
+def test_finish_page_drops_the_look_ahead_row():
+    response = Response()
+    rows = finish_page(_rows(4), Page(limit=3), response)
+    assert [row.id for row in rows] == [4, 3, 2]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER]) == (NOW, 2)
+
+
+def test_finish_page_on_the_last_page_has_no_cursor():
+    response = Response()
+    assert len(finish_page(_rows(3), Page(limit=3), response)) == 3
+    assert NEXT_CURSOR_HEADER not in response.headers
+    assert len(finish_page(_rows(50), Page(limit=None), response)) == 50
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def _sql(query):
+    return str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_keyset_continues_after_the_cursor_by_created_at_then_id():
+    sql = _sql(keyset(select(Lesson.id), Lesson.created_at, Lesson.id, Page(limit=10, after=(NOW, 5))))
+    assert "(lesson.created_at, lesson.id) < (" in sql
+    assert "ORDER BY lesson.created_at DESC, lesson.id DESC" in sql
+    assert "LIMIT 11" in sql
+
+
+def test_keyset_oldest_first_and_unbounded():
+    sql = _sql(keyset(select(Lesson.id), Lesson.created_at, Lesson.id, Page(limit=None), newest_first=False))
+    assert "ORDER BY lesson.created_at ASC, lesson.id ASC" in sql
+    assert "LIMIT" not in sql
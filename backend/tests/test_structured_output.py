@@ -0,0 +1,82 @@
+import pytest
+
+from app.core.structured_output import FIELD_ALIASES, close_truncated_json, extract_json, repair
+from app.schemas.agents_schema import Vocabs
+from app.schemas.roleplay_schema import RoleplayEvaluationOutput
+
+
+@pytest.mark.parametrize(
+    ("text", "closed"),
+    [
+        ('{"a": [1, 2', '{"a": [1, 2]}'),
+        ('{"a": "hel', '{"a": "hel"}'),
+        ('{"a": "x\\', '{"a": "x"}'),
+        ('{"a": 1, "b":', '{"a": 1}'),
+        ('{"a": 1, "b"', '{"a": 1}'),
+        ('{"a": 1.', '{"a": 1}'),
+        ('{"a": tr', "{}"),
+        ('{"a": [1, 2]}', '{"a": [1, 2]}'),
+    ],
+)
+def test_close_truncated_json(text, closed):
+    assert close_truncated_json(text) == closed
+
+
+def test_extract_json_ignores_fences_prose_and_trailing_commas():
+    assert extract_json('Sure!\n```json\n{"a": [1, 2,],}\n```\nDone.') == {"a": [1, 2]}
+
+
+def test_extract_json_closes_a_truncated_reply():
+    assert extract_json('{"vocab": [{"term": "a"}, {"term": "b",') == {"vocab": [{"term": "a"}, {"term": "b"}]}
+
+
+def test_extract_json_without_json_raises():
+    with pytest.raises(ValueError):
+        extract_json("I cannot help with that.")
+
+
+def test_repair_maps_aliased_keys():
+    reply = '{"vocab": [{"word": "gaze", "definition": "a long look", "exampleSentence": "Her gaze fell."}]}'
+    vocabs = repair(reply, Vocabs)
+    assert vocabs.vocab[0].model_dump() == {"term": "gaze", "meaning": "a long look", "example": "Her gaze fell."}
+
+
+def test_repair_unwraps_a_bare_list_and_an_extra_key():
+    item = '{"term": "gaze", "meaning": "a long look", "example": "Her gaze fell."}'
+    assert len(repair(f"[{item}]", Vocabs).vocab) == 1
+    assert len(repair(f'{{"result": {{"vocab": [{item}]}}}}', Vocabs).vocab) == 1
+
+
+def test_repair_drops_the_cut_off_last_item():
+    reply = (
+        '{"vocab": [{"term": "gaze", "meaning": "a long look", "example": "Her gaze fell."}, '
+        '{"term": "glance", "mean'
+    )
+    vocabs = repair(reply, Vocabs)
+    assert [v.term for v in vocabs.vocab] == ["gaze"]
+
+
+def test_repair_maps_nested_aliases():
+    reply = """{
+        "grammarScore": 7, "clarityScore": 8, "naturalnessScore": 6,
+        "keyMistake": {"wrong": "I goed", "correction": "I went", "why": "irregular past"},
+        "improvedSentence": {"original": "I want coffee", "native": "I'd love a coffee", "reason": "softer"},
+        "vocabularyUpgrade": {"used": "good", "betterAlternative": "delightful", "explanation": "more vivid"}
+    }"""
+    evaluation = repair(reply, RoleplayEvaluationOutput)
+    assert evaluation.keyMistake.corrected == "I went"
+    assert evaluation.improvedSentence.improved == "I'd love a coffee"
+    assert evaluation.vocabularyUpgrade.upgraded == "delightful"
+
+
+def test_repair_gives_up_on_unrepairable_text():
+    assert repair("no json here", Vocabs) is None
+    assert repair('{"vocab": "none"}', Vocabs) is None
+
+
+def test_each_alias_belongs_to_one_field():
+    seen: dict[str, str] = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            assert alias not in seen, f"{alias!r} is an alias of both {seen[alias]!r} and {field!r}"
+            seen[alias] = field
@@ -2,10 +2,9 @@
 
 import { useAuth } from "@/contexts/AuthContext";
 import { useRouter } from "next/navigation";
-import { useEffect, useState, useCallback } from "react";
+import { useEffect, useState, useCallback, useRef } from "react";
 import { apiClient } from "@/lib/api";
-import { SituationOutput, ActivityHeatmapItem, LeaderboardData } from "@/types/api";
-import { UserStats } from "@/types/user";
+import { TodayResponse } from "@/types/api";
 import { Navbar } from "@/components/layout/Navbar";
 import { Sidebar } from "@/components/layout/Sidebar";
 import { TodaySituationHeader } from "@/components/features/dashboard/TodaySituationHeader";
@@ -13,14 +12,28 @@ import { DashboardActions } from "@/components/features/dashboard/DashboardActio
 import { useStats } from "@/lib/hooks/useStats";
 import { Sparkles } from "lucide-react";
 
+// While the tab is visible /today is revalidated with If-None-Match; unchanged days cost a bodiless 304.
+const TODAY_POLL_INTERVAL_MS = 60_000;
+
 export default function DashboardPage() {
   const { user, loading, logout, isAuthenticated } = useAuth();
   const router = useRouter();
   const [checkingProfile, setCheckingProfile] = useState(true);
-  const [dailySituation, setDailySituation] = useState<SituationOutput | null>(null);
+  const [today, setToday] = useState<TodayResponse | null>(null);
   const [loadingSituation, setLoadingSituation] = useState(true);
-  
-  const { userStats, practiceData, leaderboardData, loading: loadingStats, fetchStats } = useStats();
+  const etag = useRef<string | null>(null);
+
+  const { practiceData, leaderboardData, loading: loadingStats, fetchStats } = useStats();
+
+  const refreshToday = useCallback(async (): Promise<TodayResponse | null> => {
+    const fresh = await apiClient.getToday(etag.current);
+    if (fresh) {
+      etag.current = fresh.etag;
+      setToday(fresh.today);
+      return fresh.today;
+    }
+    return null;
+  }, []);
 
   useEffect(() => {
     const checkAuthAndProfile = async () => {
@@ -32,9 +45,14 @@ export default function DashboardPage() {
             return;
           }
 
-          const situation = await apiClient.getDailySituation();
-          setDailySituation(situation);
           fetchStats();
+          const data = await refreshToday();
+          if (data && !data.situation) {
+            // The first visit of the day generates the situation; /today only reads it.
+            setCheckingProfile(false);
+            await apiClient.getDailySituation();
+            await refreshToday();
+          }
         } catch (error) {
           console.error("Error loading dashboard:", error);
         } finally {
@@ -45,7 +63,22 @@ export default function DashboardPage() {
     };
 
     checkAuthAndProfile();
-  }, [loading, isAuthenticated, router, fetchStats]);
+  }, [loading, isAuthenticated, router, fetchStats, refreshToday]);
+
+  useEffect(() => {
+    if (!isAuthenticated) return;
+    const poll = () => {
+      if (document.visibilityState === "visible") {
+        refreshToday().catch((error) => console.error("Error refreshing today:", error));
+      }
+    };
+    const timer = setInterval(poll, TODAY_POLL_INTERVAL_MS);
+    document.addEventListener("visibilitychange", poll);
+    return () => {
+      clearInterval(timer);
+      document.removeEventListener("visibilitychange", poll);
+    };
+  }, [isAuthenticated, refreshToday]);
 
   if (loading || checkingProfile) {
     return (
@@ -76,13 +109,16 @@ export default function DashboardPage() {
         <Sidebar 
           practiceData={practiceData} 
           leaderboardData={leaderboardData}
-          userStats={userStats}
-          loading={loadingStats}
+          userStats={today?.stats ?? null}
+          loading={loadingStats || !today}
         />
 
         <main className="flex-1 flex flex-col overflow-hidden">
-          <TodaySituationHeader loadingSituation={loadingSituation} dailySituation={dailySituation} />
-          <DashboardActions />
+          <TodaySituationHeader
+            loadingSituation={loadingSituation}
+            dailySituation={today?.situation ? { situation: today.situation } : null}
+          />
+          <DashboardActions today={today} loading={!today} />
         </main>
       </div>
     </div>
@@ -23,6 +23,7 @@ export default function WritingPage() {
   const [error, setError] = useState<string | null>(null);
   const [history, setHistory] = useState<WritingHistoryItem[]>([]);
   const [selectedWritingId, setSelectedWritingId] = useState<number | null>(null);
+  const [selectedText, setSelectedText] = useState<string | null>(null);
   const [sidebarHidden, setSidebarHidden] = useState(false);
 
   useEffect(() => {
@@ -69,6 +70,22 @@ export default function WritingPage() {
     [history, selectedWritingId]
   );
 
+  // The history list carries no text; load it for the selected completed entry.
+  useEffect(() => {
+    setSelectedText(null);
+    if (!selectedWriting?.completed) return;
+    let cancelled = false;
+    apiClient
+      .getWriting(selectedWriting.id)
+      .then((item) => {
+        if (!cancelled) setSelectedText(item.user_input ?? null);
+      })
+      .catch(() => {});
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedWriting?.id, selectedWriting?.completed]);
+
   const isTodaySelected = useMemo(
     () =>
       selectedWriting ? formatDate(selectedWriting.created_at) === "Today" : true,
@@ -81,8 +98,8 @@ export default function WritingPage() {
   );
 
   const currentUserText = useMemo(
-    () => selectedWriting?.user_input ?? userInput,
-    [selectedWriting, userInput]
+    () => selectedText ?? userInput,
+    [selectedText, userInput]
   );
 
   const handleSubmit = async () => {
@@ -321,13 +338,13 @@ export default function WritingPage() {
               {!isTodaySelected && selectedWriting && (
                 <div className="space-y-4 max-w-3xl">
                   <GoalCard goal={selectedWriting.goal} />
-                  {selectedWriting.user_input && (
+                  {selectedText && (
                     <div className="bg-white rounded-2xl border-2 border-cream-dark px-6 py-5">
                       <p className="font-[family-name:var(--font-fraunces)] text-sm font-bold text-foreground mb-2">
                         Your writing
                       </p>
                       <p className="font-[family-name:var(--font-dm-sans)] text-sm text-gray-700 whitespace-pre-wrap leading-relaxed">
-                        {selectedWriting.user_input}
+                        {selectedText}
                       </p>
                     </div>
                   )}
@@ -1,14 +1,10 @@
 "use client";
 
 import { useRouter } from "next/navigation";
-import { useEffect, useState } from "react";
+import { useState } from "react";
 import { BookOpen, MessageSquare, PenTool, GraduationCap, Lock } from "lucide-react";
-import { apiClient } from "@/lib/api";
-import { ActivityCompletion } from "@/types/api";
+import { TodayResponse } from "@/types/api";
 import { ROUTES } from "@/lib/config/routes";
-import { LessonHistoryItem } from "@/types/lesson";
-import { RoleplayHistoryItem } from "@/types/roleplay";
-import { formatDate } from "@/lib/utils/format";
 import { useSubscription } from "@/contexts/SubscriptionContext";
 import { UpgradePrompt } from "@/components/common/UpgradePrompt";
 
@@ -94,15 +90,21 @@ function DashboardActionCard({
   );
 }
 
-export function DashboardActions() {
+type DashboardActionsProps = {
+  today: TodayResponse | null;
+  loading: boolean;
+};
+
+export function DashboardActions({ today, loading }: DashboardActionsProps) {
   const router = useRouter();
   const { isPremium, refetch } = useSubscription();
-  const [activities, setActivities] = useState<ActivityCompletion | null>(null);
-  const [lessonInProgress, setLessonInProgress] = useState(false);
-  const [roleplayInProgress, setRoleplayInProgress] = useState(false);
-  const [loading, setLoading] = useState(true);
   const [showUpgradeModal, setShowUpgradeModal] = useState(false);
 
+  const activities = today?.activities ?? null;
+  // Started today but not finished; free users have no lessons or roleplays.
+  const lessonInProgress = isPremium && Boolean(today?.lesson && !today.lesson.completed);
+  const roleplayInProgress = isPremium && Boolean(today?.roleplay && !today.roleplay.completed);
+
   const handlePremiumFeatureClick = (route: string) => {
     if (!isPremium) {
       setShowUpgradeModal(true);
@@ -116,44 +118,6 @@ export function DashboardActions() {
     refetch();
   };
 
-  useEffect(() => {
-    const fetchActivities = async () => {
-      try {
-        const data = await apiClient.getTodayActivities();
-        setActivities(data);
-
-        // Only fetch premium features history if user is premium
-        if (isPremium) {
-          try {
-            const [lessonsHistory, roleplayHistory] = await Promise.all([
-              apiClient.getLessonsHistory(),
-              apiClient.getRoleplayHistory(),
-            ]);
-
-            const todayLesson = lessonsHistory.find((l) => formatDate(l.created_at) === "Today");
-            setLessonInProgress(Boolean(todayLesson && !todayLesson.completed));
-
-            const todayRoleplay = roleplayHistory.find((r) => formatDate(r.created_at) === "Today");
-            setRoleplayInProgress(Boolean(todayRoleplay && !todayRoleplay.completed));
-          } catch (error) {
-            // Silently fail for premium features if user loses premium during session
-            console.error("Error fetching premium features history:", error);
-          }
-        } else {
-          // Free users don't have lesson/roleplay history
-          setLessonInProgress(false);
-          setRoleplayInProgress(false);
-        }
-      } catch (error) {
-        console.error("Error fetching today's activities:", error);
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchActivities();
-  }, [isPremium]);
-
   if (loading) {
     return (
       <div className="flex-1 overflow-y-auto p-8">
@@ -17,6 +17,7 @@ import {
   ActivityHeatmapItem,
   LeaderboardData,
   ActivityCompletion,
+  TodayResponse,
 } from '@/types/api';
 import {
   EvaluateLessonRequest,
@@ -52,6 +53,47 @@ import {
 import { API_ENDPOINTS } from './endpoints';
 import { getApiBaseUrl } from '@/lib/config/env';
 
+// 202 answer to a request sent with `Prefer: respond-async`.
+interface PendingJob {
+  job_id: number;
+  status: string;
+  events: string;
+}
+
+interface JobStatus<T> {
+  id: number;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  result: T | null;
+  error: string | null;
+}
+
+const JOB_POLL_INTERVAL_MS = 500;
+const JOB_POLL_MAX_INTERVAL_MS = 5000;
+const JOB_TIMEOUT_MS = 5 * 60 * 1000;
+
+function abortError(signal: AbortSignal): unknown {
+  return signal.reason ?? new DOMException('The operation was aborted.', 'AbortError');
+}
+
+// setTimeout that rejects as soon as `signal` aborts.
+function sleep(ms: number, signal?: AbortSignal | null): Promise<void> {
+  return new Promise((resolve, reject) => {
+    if (signal?.aborted) {
+      reject(abortError(signal));
+      return;
+    }
+    const onAbort = () => {
+      clearTimeout(timer);
+      reject(abortError(signal!));
+    };
+    const timer = setTimeout(() => {
+      signal?.removeEventListener('abort', onAbort);
+      resolve();
+    }, ms);
+    signal?.addEventListener('abort', onAbort, { once: true });
+  });
+}
+
 class ApiClient {
   private baseUrl: string;
 
@@ -100,6 +142,30 @@ class ApiClient {
     return response.json();
   }
 
+  // Submit work that runs as a background job: the POST returns at once, then the job is polled.
+  private async submitJob<T>(endpoint: string, options: RequestInit = {}): Promise<T> {
+    const response = await this.request<T | PendingJob>(endpoint, {
+      ...options,
+      headers: { ...(options.headers as Record<string, string> || {}), Prefer: 'respond-async' },
+    });
+    if (!response || typeof response !== 'object' || !('job_id' in response)) {
+      return response as T;
+    }
+
+    // Poll with backoff until the job is done, `options.signal` aborts, or JOB_TIMEOUT_MS passes.
+    const signal = options.signal;
+    const deadline = Date.now() + JOB_TIMEOUT_MS;
+    let interval = JOB_POLL_INTERVAL_MS;
+    while (true) {
+      await sleep(Math.min(interval, Math.max(deadline - Date.now(), 0)), signal);
+      const job = await this.request<JobStatus<T>>(API_ENDPOINTS.JOBS.BY_ID(response.job_id), { signal });
+      if (job.status === 'succeeded') return job.result as T;
+      if (job.status === 'failed') throw new Error(job.error || 'Evaluation failed');
+      if (Date.now() >= deadline) throw new Error('Timed out waiting for the result, please try again');
+      interval = Math.min(interval * 1.5, JOB_POLL_MAX_INTERVAL_MS);
+    }
+  }
+
   private handleAuthError(): void {
     if (typeof window === 'undefined') return;
     
@@ -195,6 +261,31 @@ class ApiClient {
     });
   }
 
+  // Today's dashboard data. Pass the ETag of the last response to revalidate; null means it is unchanged (304).
+  async getToday(etag?: string | null): Promise<{ today: TodayResponse; etag: string | null } | null> {
+    const token = this.getToken();
+    const headers: Record<string, string> = {};
+    if (token) {
+      headers['Authorization'] = `Bearer ${token}`;
+    }
+    if (etag) {
+      headers['If-None-Match'] = etag;
+    }
+
+    // no-store: the browser must not answer from (or turn the 304 into) its own cache.
+    const response = await fetch(`${this.baseUrl}${API_ENDPOINTS.TODAY}`, { headers, cache: 'no-store' });
+    if (response.status === 304) {
+      return null;
+    }
+    if (!response.ok) {
+      if (response.status === 401 || response.status === 403) {
+        this.handleAuthError();
+      }
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return { today: await response.json(), etag: response.headers.get('ETag') };
+  }
+
   async getDailySituation(): Promise<SituationOutput> {
     return this.request<SituationOutput>(API_ENDPOINTS.USERS.DAILY_SITUATION, {
       method: 'GET',
@@ -285,10 +376,11 @@ class ApiClient {
     return result;
   }
 
-  async evaluateLesson(data: EvaluateLessonRequest): Promise<EvaluateLessonOutput> {
-    return this.request<EvaluateLessonOutput>(API_ENDPOINTS.AGENTS.EVALUATE_LESSON, {
+  async evaluateLesson(data: EvaluateLessonRequest, signal?: AbortSignal): Promise<EvaluateLessonOutput> {
+    return this.submitJob<EvaluateLessonOutput>(API_ENDPOINTS.AGENTS.EVALUATE_LESSON, {
       method: 'POST',
       body: JSON.stringify(data),
+      signal,
     });
   }
 
@@ -350,9 +442,10 @@ class ApiClient {
     return this.request<RoleplayHistoryResponse[]>(API_ENDPOINTS.ROLEPLAY.HISTORY);
   }
 
-  async finishRoleplaySession(): Promise<RoleplayFinishResponse> {
-    return this.request<RoleplayFinishResponse>(API_ENDPOINTS.ROLEPLAY.FINISH, {
+  async finishRoleplaySession(signal?: AbortSignal): Promise<RoleplayFinishResponse> {
+    return this.submitJob<RoleplayFinishResponse>(API_ENDPOINTS.ROLEPLAY.FINISH, {
       method: 'POST',
+      signal,
     });
   }
 
@@ -414,6 +507,10 @@ class ApiClient {
   async getWritingHistory(): Promise<WritingHistoryItem[]> {
     return this.request<WritingHistoryItem[]>(API_ENDPOINTS.WRITING.HISTORY);
   }
+
+  async getWriting(writingId: number): Promise<WritingHistoryItem> {
+    return this.request<WritingHistoryItem>(API_ENDPOINTS.WRITING.BY_ID(writingId));
+  }
 }
 
 export const apiClient = new ApiClient(getApiBaseUrl());
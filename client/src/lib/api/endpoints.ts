@@ -22,6 +22,7 @@ export const API_ENDPOINTS = {
     EXPLAIN: '/api/v1/agents/explain',
     TTS: '/api/v1/agents/tts',
   },
+  TODAY: '/api/v1/today',
   STATS: {
     ME: '/api/v1/stats/me',
     ACTIVITY_HEATMAP: '/api/v1/stats/activity-heatmap',
@@ -49,9 +50,13 @@ export const API_ENDPOINTS = {
     STATUS: '/api/v1/subscription/status',
     CANCEL: '/api/v1/subscription/cancel',
   },
+  JOBS: {
+    BY_ID: (id: number) => `/api/v1/jobs/${id}`,
+  },
   WRITING: {
     CREATE_GOAL: '/api/v1/writing/create_goal',
     EVALUATE: '/api/v1/writing/evaluate',
     HISTORY: '/api/v1/writing/history',
+    BY_ID: (id: number) => `/api/v1/writing/history/${id}`,
   },
 } as const;
@@ -1,12 +1,10 @@
 import { useState, useCallback } from 'react';
 import { apiClient } from '@/lib/api';
-import { UserStats } from '@/types/user';
 import { ActivityHeatmapItem, LeaderboardData } from '@/types/api';
 import { useSubscription } from '@/contexts/SubscriptionContext';
 
 export function useStats() {
   const { isPremium } = useSubscription();
-  const [userStats, setUserStats] = useState<UserStats | null>(null);
   const [practiceData, setPracticeData] = useState<ActivityHeatmapItem[]>([]);
   const [leaderboardData, setLeaderboardData] = useState<LeaderboardData | null>(null);
   const [loading, setLoading] = useState(false);
@@ -25,12 +23,8 @@ export function useStats() {
   const fetchStats = useCallback(async () => {
     try {
       setLoading(true);
-      
-      // Always fetch user stats (available for all users)
-      const stats = await apiClient.getMyStats();
-      setUserStats(stats);
 
-      // Only fetch premium features if user is premium
+      // The user's own stats come with /today; the heatmap and leaderboard are premium features.
       if (isPremium) {
         try {
           const [heatmap, leaderboard] = await Promise.all([
@@ -60,7 +54,6 @@ export function useStats() {
   }, [isPremium, createEmptyHeatmap]);
 
   return {
-    userStats,
     practiceData,
     leaderboardData,
     loading,
@@ -1,4 +1,4 @@
-import { User } from './user';
+import { User, UserStats } from './user';
 import { LessonStreamEvent, AgentOutput } from './lesson';
 import { RoleplayEvaluation } from './roleplay';
 
@@ -57,6 +57,17 @@ export interface ActivityCompletion {
   writing_completed: boolean;
 }
 
+// GET /today: everything the dashboard shows for the day, in one response.
+export interface TodayResponse {
+  date: string;
+  situation: string | null;
+  lesson: { id: number; title: string; completed: boolean; score: number | null } | null;
+  roleplay: { goal: string; user_role: string; ai_role: string; completed: boolean; score: number | null } | null;
+  writing: { goal: string; submitted: boolean } | null;
+  stats: UserStats;
+  activities: ActivityCompletion;
+}
+
 export type { LessonStreamEvent, AgentOutput };
 
 export interface RoleplaySessionResponse {